@@ -0,0 +1,306 @@
+import asyncio
+import collections
+import contextvars
+import math
+import threading
+import time
+from fastapi import Request
+from exceptions import CustomError, CustomException
+import config
+import metrics
+
+
+# 当前请求的截止时间（time.monotonic()），由admit依赖设置，None表示没有截止时间
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class _Waiter:
+    """排队等待执行位置的请求"""
+    __slots__ = ("future", "loop", "granted", "abandoned")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+        self.abandoned = False
+
+
+class AdmissionController:
+    """识别请求准入控制
+    功能：
+    1. 最多max_active个请求同时执行（下载+推理），最多max_queue个请求排队；队列满时立即拒绝并给出建议重试时间
+    2. 每个客户端最多per_client个进行中（执行+排队）的请求
+    3. 排队中的请求超过截止时间后直接出队并返回错误，不再占用执行位置
+    4. 排队在事件循环中等待，不占用线程池线程
+    """
+
+    def __init__(self, max_active: int, max_queue: int, per_client: int = 0):
+        """
+        Args:
+            max_active: 同时执行的请求数，<=0时不限制
+            max_queue: 排队的请求数上限
+            per_client: 每个客户端进行中的请求数上限，<=0时不限制
+        """
+        self.max_active = max_active
+        self.max_queue = max(0, max_queue)
+        self.per_client = per_client
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = collections.deque()
+        self._clients = collections.Counter()
+        # 每个请求占用执行位置的平均时间（秒，指数滑动平均），用于估算Retry-After
+        self._hold_seconds = 1.0
+
+        # 统计信息
+        self._admitted = 0
+        self._rejected = collections.Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_active > 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, client: str, deadline: float = None):
+        """
+        等待执行位置
+
+        Args:
+            client: 客户端标识
+            deadline: 截止时间（time.monotonic()），None表示一直等待
+
+        Raises:
+            CustomException: 队列已满、客户端并发超限或排队期间超过截止时间
+        """
+        with self._lock:
+            if self.per_client > 0 and self._clients[client] >= self.per_client:
+                self._reject("client")
+                raise CustomException(CustomError.CLIENT_CONCURRENCY_EXCEEDED, detail=f"limit {self.per_client}",
+                                      headers=self._retry_after(1))
+            if self._active < self.max_active and not self._waiters:
+                self._active += 1
+                self._clients[client] += 1
+                self._admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._reject("queue_full")
+                raise CustomException(CustomError.SERVICE_OVERLOADED, headers=self._retry_after(len(self._waiters) + 1))
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+            self._clients[client] += 1
+
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                waiter.abandoned = True
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+                    self._clients[client] -= 1
+                    if self._clients[client] <= 0:
+                        del self._clients[client]
+            if granted:
+                # 超时的同时已经分配到执行位置，归还给下一个请求
+                self.release(client)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("deadline")
+                raise CustomException(CustomError.DEADLINE_EXCEEDED, detail="queued")
+            raise
+
+        with self._lock:
+            self._admitted += 1
+
+    def release(self, client: str, held_seconds: float = None):
+        """归还执行位置，唤醒队首的请求"""
+        with self._lock:
+            self._clients[client] -= 1
+            if self._clients[client] <= 0:
+                del self._clients[client]
+            if held_seconds is not None:
+                self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+
+            self._active -= 1
+            while self._waiters and self._active < self.max_active:
+                waiter = self._waiters.popleft()
+                if waiter.abandoned:
+                    continue
+                waiter.granted = True
+                self._active += 1
+                waiter.loop.call_soon_threadsafe(_set_result, waiter.future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_active": self.max_active,
+                "max_queue": self.max_queue,
+                "per_client": self.per_client,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "clients": len(self._clients),
+                "admitted": self._admitted,
+                "rejected": dict(self._rejected),
+                "avg_hold_seconds": round(self._hold_seconds, 3),
+            }
+
+    def _reject(self, reason: str):
+        self._rejected[reason] += 1
+        metrics.ADMISSION_REJECTED.labels(reason).inc()
+
+    def _retry_after(self, position: int) -> dict:
+        """按排队位置和平均执行时间估算多久后重试（秒）"""
+        seconds = math.ceil(position * self._hold_seconds / max(self.max_active, 1))
+        return {"Retry-After": str(min(max(seconds, 1), config.ADMISSION_MAX_RETRY_AFTER))}
+
+
+def _set_result(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# 当前进程的准入控制器
+controller = AdmissionController(config.ADMISSION_MAX_ACTIVE, config.ADMISSION_MAX_QUEUE, per_client=config.ADMISSION_PER_CLIENT)
+
+metrics.QUEUE_DEPTH.labels("admission").set_function(lambda: controller.queued)
+metrics.ADMISSION_ACTIVE.set_function(lambda: controller.active)
+
+
+async def admit(request: Request):
+    """
+    识别接口的依赖：设置请求截止时间，并在准入控制器中占用一个执行位置直到请求处理完成
+
+    截止时间由客户端通过X-Request-Timeout（秒）指定，未指定时使用ADMISSION_DEFAULT_TIMEOUT（0表示没有截止时间）
+    """
+    deadline = parse_deadline(request.headers.get("X-Request-Timeout"))
+    token = request_deadline.set(deadline)
+    try:
+        if not controller.enabled:
+            yield
+            return
+
+        client = _client(request)
+        await controller.acquire(client, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            controller.release(client, time.monotonic() - started)
+    finally:
+        request_deadline.reset(token)
+
+async def admit_stream(request: Request):
+    """
+    流式响应接口（如/asr/bulk）的依赖：占用一个执行位置直到响应体生成完毕
+
+    依赖在响应体生成之前就已退出，接口需要用StreamHold.wrap把执行位置交给响应体；没有交出（例如参数错误）时请求结束即归还。
+    X-Request-Timeout只限制排队时间，不作为响应体生成过程中的截止时间
+    """
+    hold = StreamHold()
+    if controller.enabled:
+        client = _client(request)
+        await controller.acquire(client, parse_deadline(request.headers.get("X-Request-Timeout")))
+        hold = StreamHold(client)
+    try:
+        yield hold
+    finally:
+        if not hold.transferred:
+            hold.release()
+
+
+class StreamHold:
+    """流式响应占用的执行位置，只归还一次"""
+
+    def __init__(self, client: str = None):
+        """
+        Args:
+            client: 占用执行位置的客户端标识，None表示没有占用（准入控制未启用）
+        """
+        self.client = client
+        self.transferred = False
+        self._started = time.monotonic()
+        self._released = client is None
+        self._lock = threading.Lock()
+
+    def wrap(self, iterable):
+        """把执行位置交给响应体：响应体生成完毕、出错、被关闭或被丢弃（客户端断开）时归还"""
+        self.transferred = True
+        return _HeldIterator(iter(iterable), self)
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        controller.release(self.client, time.monotonic() - self._started)
+
+
+class _HeldIterator:
+    """迭代结束时归还执行位置的迭代器（响应体没有开始生成就被丢弃时，在回收时归还）"""
+
+    def __init__(self, iterator, hold: StreamHold):
+        self._iterator = iterator
+        self._hold = hold
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._hold.release()
+
+    def __del__(self):
+        self.close()
+
+
+def _client(request: Request) -> str:
+    """客户端标识：ADMISSION_CLIENT_HEADER请求头，未携带时使用客户端IP"""
+    return request.headers.get(config.ADMISSION_CLIENT_HEADER) or (request.client.host if request.client else "")
+
+def parse_deadline(timeout: str = None) -> float:
+    """X-Request-Timeout（秒）转为截止时间，无效或未指定时使用默认值"""
+    try:
+        seconds = float(timeout) if timeout else config.ADMISSION_DEFAULT_TIMEOUT
+    except ValueError:
+        seconds = config.ADMISSION_DEFAULT_TIMEOUT
+    return time.monotonic() + seconds if seconds > 0 else None
+
+def remaining(default: float = None) -> float:
+    """
+    当前请求剩余的时间（秒），与default取较小值；没有截止时间时返回default
+
+    Raises:
+        CustomException: 已经超过截止时间
+    """
+    deadline = request_deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise CustomException(CustomError.DEADLINE_EXCEEDED)
+    return left if default is None else min(default, left)
+
+def check_deadline(stage: str):
+    """进入耗时阶段（如推理）之前检查截止时间，已经超过时放弃处理"""
+    deadline = request_deadline.get()
+    if deadline is not None and time.monotonic() >= deadline:
+        metrics.ADMISSION_REJECTED.labels("expired").inc()
+        raise CustomException(CustomError.DEADLINE_EXCEEDED, detail=stage)
@@ -0,0 +1,208 @@
+import io
+import os
+import struct
+import subprocess
+import numpy as np
+from logger import logger
+import config
+
+
+# 模型输入采样率
+SAMPLE_RATE = 16000
+
+
+def decode_audio(source) -> np.ndarray:
+    """
+    解码音频并重采样为16kHz单声道
+
+    1. 优先用soundfile在进程内解码（wav/flac/ogg等）
+    2. soundfile不支持的格式（mp3/m4a等）通过ffmpeg解码，内存中的内容经管道传入，不落盘
+
+    Args:
+        source: 音频文件的原始字节，或音频文件路径
+
+    Returns:
+        samples: float32音频数组，取值范围[-1, 1]
+
+    Raises:
+        RuntimeError: 解码失败
+    """
+    try:
+        return _decode_soundfile(source)
+    except Exception as e:
+        logger.debug(f"soundfile decode failed, fallback to ffmpeg: {str(e)}")
+    return _decode_ffmpeg(source)
+
+def _decode_soundfile(source) -> np.ndarray:
+    import soundfile
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    samples, sample_rate = soundfile.read(source, dtype="float32", always_2d=True)
+    samples = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    return resample(samples, sample_rate)
+
+def _decode_ffmpeg(source) -> np.ndarray:
+    in_memory = isinstance(source, (bytes, bytearray))
+    cmd = [
+        config.FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0" if in_memory else source,
+        "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    proc = subprocess.run(cmd, input=source if in_memory else None, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.float32).copy()
+
+def resample(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """将单声道音频重采样到16kHz"""
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    if sample_rate == SAMPLE_RATE:
+        return samples
+
+    import torch
+    import torchaudio
+
+    waveform = torchaudio.functional.resample(torch.from_numpy(samples), sample_rate, SAMPLE_RATE)
+    return waveform.numpy()
+
+
+# MP3（Layer III）帧头：码率（kbps，按MPEG1 / MPEG2和2.5区分）、采样率（按MPEG1/2/2.5区分）
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+
+def probe_duration(source) -> float:
+    """
+    从容器头部读取音频时长（秒），不解码音频数据
+
+    支持WAV、FLAC、MP3（Xing/Info/VBRI头，没有时按首帧码率估算）、MP4/M4A（mvhd），
+    其它格式尝试soundfile读取头部信息
+
+    Args:
+        source: 音频文件的原始字节，或音频文件路径
+
+    Returns:
+        duration: 时长（秒），无法识别时返回None
+    """
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            return _probe(io.BytesIO(source), len(source))
+        with open(source, "rb") as f:
+            return _probe(f, os.fstat(f.fileno()).st_size)
+    except Exception as e:
+        logger.debug(f"probe duration failed: {str(e)}")
+        return None
+
+def _probe(f, size: int) -> float:
+    head = f.read(12)
+    f.seek(0)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _probe_wav(f, size)
+    if head[:4] == b"fLaC":
+        return _probe_flac(f)
+    if head[4:8] == b"ftyp":
+        return _probe_mp4(f, size)
+    if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return _probe_mp3(f, size)
+
+    import soundfile
+    return soundfile.info(f).duration
+
+def _probe_wav(f, size: int) -> float:
+    f.seek(12)
+    byte_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", f.read(16)[8:12])[0]
+            f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+        elif chunk_id == b"data":
+            # 流式写入的WAV数据块大小可能为0或0xFFFFFFFF，按文件大小计算
+            if chunk_size in (0, 0xFFFFFFFF):
+                chunk_size = size - f.tell()
+            return chunk_size / byte_rate if byte_rate else None
+        else:
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+def _probe_flac(f) -> float:
+    # STREAMINFO是第一个元数据块：采样率20位，总采样数36位
+    info = f.read(4 + 4 + 34)[8:]
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    total = ((info[13] & 0x0F) << 32) | struct.unpack(">I", info[14:18])[0]
+    return total / sample_rate if sample_rate and total else None
+
+def _probe_mp4(f, size: int) -> float:
+    # 顶层box中找到moov，再在其中找mvhd；mdat等大box直接seek跳过
+    end = size
+    position = 0
+    while position + 8 <= end:
+        f.seek(position)
+        box_size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - position
+        if box_size < header:
+            return None
+        if box_type == b"moov":
+            position, end = position + header, position + box_size
+            continue
+        if box_type == b"mvhd":
+            version = f.read(4)[0]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", f.read(28)[16:28])
+            else:
+                timescale, duration = struct.unpack(">II", f.read(16)[8:16])
+            return duration / timescale if timescale else None
+        position += box_size
+    return None
+
+def _probe_mp3(f, size: int) -> float:
+    # 跳过ID3v2标签（长度为synchsafe整数）
+    offset = 0
+    head = f.read(10)
+    if head[:3] == b"ID3":
+        offset = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+        if head[5] & 0x10:
+            offset += 10
+
+    # 在标签之后查找第一个帧头
+    f.seek(offset)
+    data = f.read(64 * 1024)
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+            continue
+        version_bits, layer_bits = (data[i + 1] >> 3) & 0x03, (data[i + 1] >> 1) & 0x03
+        bitrate_index, rate_index = data[i + 2] >> 4, (data[i + 2] >> 2) & 0x03
+        # 只支持Layer III；跳过无效的帧头
+        if layer_bits != 0x01 or version_bits == 0x01 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        version = {3: 1, 2: 2, 0: 2.5}[version_bits]
+        sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+        bitrate = _MP3_BITRATES[1 if version == 1 else 2][bitrate_index] * 1000
+        samples_per_frame = 1152 if version == 1 else 576
+        mono = (data[i + 3] >> 6) == 0x03
+
+        # Xing/Info（VBR）头在边信息之后，VBRI头在帧头之后32字节
+        side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+        xing = data[i + 4 + side_info:i + 4 + side_info + 12]
+        if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 0x01:
+            return struct.unpack(">I", xing[8:12])[0] * samples_per_frame / sample_rate
+        vbri = data[i + 36:i + 36 + 18]
+        if vbri[:4] == b"VBRI":
+            return struct.unpack(">I", vbri[14:18])[0] * samples_per_frame / sample_rate
+
+        # 固定码率：按音频数据大小估算
+        return (size - offset - i) * 8 / bitrate
+    return None
+
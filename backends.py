@@ -0,0 +1,116 @@
+import os
+import re
+import numpy as np
+from logger import logger
+import audio
+
+
+# 推理后端：PyTorch fp32（funasr.AutoModel）、PyTorch动态int8量化、ONNX Runtime
+BACKEND_TORCH = "torch"
+BACKEND_INT8 = "int8"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_TORCH, BACKEND_INT8, BACKEND_ONNX)
+
+# 英文单词/数字作为一个词，其它非空白字符（中文）逐字切分
+WORD_PATTERN = re.compile(r"[A-Za-z0-9']+|\S")
+
+
+def load(auto_model, source: str, backend: str = BACKEND_TORCH, onnx_dir: str = "", onnx_quantize: bool = False, onnx_threads: int = 0):
+    """
+    按后端加载识别模型，返回的对象都提供与AutoModel一致的generate(input, **kwargs)接口
+
+    Args:
+        auto_model: funasr.AutoModel
+        source: 模型名称或本地快照目录
+        backend: torch / int8 / onnx
+        onnx_dir: 已导出的ONNX模型目录，为空时从source导出（导出到模型目录，之后直接复用）
+        onnx_quantize: 使用ONNX int8量化模型（model_quant.onnx）
+        onnx_threads: ONNX Runtime算子内线程数，0时使用CPU核数
+
+    Returns:
+        model: 识别模型
+    """
+    if backend == BACKEND_TORCH:
+        return auto_model(model=source, disable_update=True)
+    if backend == BACKEND_INT8:
+        return quantize_dynamic(auto_model(model=source, disable_update=True))
+    if backend == BACKEND_ONNX:
+        return OnnxModel(onnx_dir or export_onnx(auto_model, source, quantize=onnx_quantize),
+                         quantize=onnx_quantize, threads=onnx_threads)
+    raise ValueError(f"unknown inference backend: {backend}, expected one of {', '.join(BACKENDS)}")
+
+def quantize_dynamic(model):
+    """Linear层权重动态量化为int8（激活在推理时量化），原地替换AutoModel内部的模型"""
+    import torch
+
+    model.model = torch.ao.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+    logger.info("Model dynamically quantized to int8")
+    return model
+
+def export_onnx(auto_model, source: str, quantize: bool = False) -> str:
+    """用funasr把PyTorch模型导出为ONNX，返回导出目录"""
+    logger.info(f"Export {source} to ONNX, quantize: {quantize}")
+    export_dir = auto_model(model=source, disable_update=True).export(type="onnx", quantize=quantize)
+    logger.info(f"ONNX model exported to {export_dir}")
+    return export_dir
+
+
+class OnnxModel:
+    """基于funasr-onnx（ONNX Runtime）的识别模型
+    功能：
+    1. 加载导出的Paraformer ONNX模型（SeACo-Paraformer额外导出model_eb.onnx，自动识别）
+    2. generate接口与AutoModel一致：输入文件路径、16kHz音频数组或它们的列表，
+       返回 [{"key", "text", "timestamp"}, ...]，text以空格分隔、与timestamp（毫秒）一一对应
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, threads: int = 0):
+        try:
+            from funasr_onnx import Paraformer, SeacoParaformer
+        except ImportError as e:
+            raise RuntimeError("onnx backend requires funasr-onnx and onnxruntime: uv pip install funasr-onnx onnxruntime") from e
+
+        threads = threads or os.cpu_count() or 1
+        self.seaco = os.path.exists(os.path.join(model_dir, "model_eb.onnx"))
+        model_class = SeacoParaformer if self.seaco else Paraformer
+        self.model = model_class(model_dir, batch_size=1, quantize=quantize, intra_op_num_threads=threads)
+        logger.info(f"ONNX model loaded from {model_dir}, quantize: {quantize}, threads: {threads}")
+
+    def generate(self, input, **kwargs):
+        inputs = input if isinstance(input, list) else [input]
+        results = []
+        for index, item in enumerate(inputs):
+            output = self.model(item, hotwords="") if self.seaco else self.model(item)
+            output = output[0] if output else {}
+            seconds = len(item) / audio.SAMPLE_RATE if isinstance(item, np.ndarray) else None
+            results.append(_to_funasr_result(f"onnx_{index}", output, seconds))
+        return results
+
+
+def _to_funasr_result(key: str, output: dict, seconds: float = None) -> dict:
+    """funasr-onnx的输出（preds/timestamp/raw_tokens）转为AutoModel的结果格式"""
+    text = output.get("preds", "")
+    if isinstance(text, (list, tuple)):
+        text = text[0] if text else ""
+    timestamps = [list(span) for span in output.get("timestamp") or []]
+
+    # AutoModel的text以空格分隔，每个词对应一个时间戳；funasr-onnx合并了中文字符
+    words = text.split()
+    if len(words) != len(timestamps):
+        tokens = WORD_PATTERN.findall(text)
+        if len(tokens) == len(timestamps) or not output.get("raw_tokens"):
+            words = tokens
+        else:
+            words = [token.replace("@@", "") for token in output["raw_tokens"]]
+
+    # funasr-onnx的时间戳单位可能是秒，统一转为毫秒（音频时长已知时按最大值判断，否则按是否有小数判断）
+    values = [value for span in timestamps for value in span]
+    if seconds is not None:
+        in_seconds = bool(values) and max(values) <= seconds + 1
+    else:
+        in_seconds = any(isinstance(value, float) and not value.is_integer() for value in values)
+    if in_seconds:
+        timestamps = [[int(round(value * 1000)) for value in span] for span in timestamps]
+    else:
+        timestamps = [[int(round(value)) for value in span] for span in timestamps]
+
+    return {"key": key, "text": " ".join(words), "timestamp": timestamps}
@@ -0,0 +1,247 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from logger import logger
+from scheduling import POLICY_FIFO, RequestQueue
+
+
+class _BatchItem:
+    """队列中的单个推理请求"""
+    __slots__ = ("input", "future", "enqueued_at", "deadline")
+
+    def __init__(self, audio_input, deadline: float = None):
+        self.input = audio_input
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.deadline = deadline
+
+
+class BatchScheduler:
+    """动态微批处理调度器
+    功能：
+    1. 请求进入队列，由后台线程按最大批大小、最长等待时间组批
+    2. 每批只调用一次generate_fn（列表输入），再把结果逐个分发给调用方
+    3. 记录批大小、等待时间和每批推理耗时
+    4. 请求可以携带截止时间，组批后已经超过截止时间的请求不参与推理，以TimeoutError结束
+       多个请求的一批推理失败时逐个重新推理，只有出错的输入失败，不影响同批的其它请求
+    5. 排队顺序由调度策略决定（scheduling.RequestQueue）：默认先来先服务，sjf时短音频优先并按等待时间老化，可按接口分通道
+    6. concurrency大于1时（例如多个模型副本），最多同时执行concurrency批；所有批都在执行时新请求继续排队，
+       下一批在有空闲位置时才开始组批，因此负载越高批越大
+    """
+
+    def __init__(self, generate_fn, max_batch_size: int = 8, max_wait_ms: float = 30.0, history: int = 100, concurrency: int = 1,
+                 policy: str = POLICY_FIFO, aging: float = 1.0, lanes: bool = False):
+        """
+        Args:
+            generate_fn: 批量推理函数，输入列表，返回等长的结果列表
+            max_batch_size: 每批最多包含的请求数
+            max_wait_ms: 第一个请求入队后最多等待多久（毫秒）就开始推理
+            history: 保留最近多少批的耗时记录
+            concurrency: 同时执行的批数
+            policy: 调度策略（fifo / sjf）
+            aging: sjf策略下每等待1秒抵消的音频时长（秒）
+            lanes: 是否按通道（接口）分别排队、轮流出队
+        """
+        self.generate_fn = generate_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.concurrency = max(1, int(concurrency))
+
+        self._queue = RequestQueue(policy=policy, aging=aging, lanes=lanes)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.concurrency)
+        self._executor = None
+
+        # 统计信息
+        self._batches = 0
+        self._items = 0
+        self._failed_batches = 0
+        self._expired = 0
+        self._retried_items = 0
+        self._recent = collections.deque(maxlen=history)
+
+    def start(self):
+        """启动后台调度线程"""
+        if self._running:
+            return
+        self._running = True
+        if self.concurrency > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="asr-batch")
+        self._thread = threading.Thread(target=self._loop, name="asr-batcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Batch scheduler started, max_batch_size: {self.max_batch_size}, max_wait_ms: {self.max_wait_ms}, concurrency: {self.concurrency}")
+
+    def stop(self, timeout: float = 5.0):
+        """停止后台调度线程，队列中剩余的请求会被处理完"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        logger.info("Batch scheduler stopped")
+
+    def submit(self, audio_input, timeout: float = None, deadline: float = None, cost: float = None, lane: str = None):
+        """
+        提交一个推理请求并等待结果
+
+        Args:
+            audio_input: 单个模型输入（文件路径或音频数组）
+            timeout: 等待结果的超时时间（秒），None表示一直等待
+            deadline: 截止时间（time.monotonic()），推理开始前已经超过时不再推理
+            cost: 作业大小（音频时长，秒），sjf策略按它排序
+            lane: 调度通道，默认为当前请求的通道
+
+        Returns:
+            该输入对应的单条识别结果
+
+        Raises:
+            TimeoutError: 等待超时或推理开始前已经超过截止时间
+        """
+        item = _BatchItem(audio_input, deadline)
+        self._queue.put(item, cost=cost, lane=lane)
+        return item.future.result(timeout=timeout)
+
+    def qsize(self) -> int:
+        """当前排队中的请求数"""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """批处理统计信息"""
+        with self._lock:
+            recent = list(self._recent)
+            batches = self._batches
+            items = self._items
+            failed = self._failed_batches
+            expired = self._expired
+            retried = self._retried_items
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "concurrency": self.concurrency,
+            "queue_size": self.qsize(),
+            "scheduling": self._queue.stats(),
+            "batches": batches,
+            "items": items,
+            "failed_batches": failed,
+            "expired_items": expired,
+            "retried_items": retried,
+            "avg_batch_size": round(items / batches, 2) if batches else 0,
+            "recent": recent,
+        }
+
+    def _collect(self, first: _BatchItem) -> list:
+        """以first为首组一批请求，直到达到最大批大小或等待窗口结束"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000
+        # 分通道调度时同一批只包含first所在通道的请求
+        lane = self._queue.last_lane if self._queue.lanes else None
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining, lane=lane) if remaining > 0 else self._queue.get_nowait(lane=lane)
+            except queue.Empty:
+                break
+            if item is None:
+                # 收到停止信号，处理完这一批后退出
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _loop(self):
+        while True:
+            # 先占用一个执行位置再组批：所有批都在执行时请求留在队列中，等待下一批
+            self._slots.acquire()
+            first = self._queue.get()
+            if first is None:
+                self._slots.release()
+                if not self._running:
+                    break
+                continue
+
+            batch = self._collect(first)
+            if self._executor is None:
+                self._run_batch(batch)
+            else:
+                self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: list):
+        try:
+            self._infer_batch(batch)
+        finally:
+            self._slots.release()
+
+    def _infer_batch(self, batch: list):
+        # 0. 丢弃已经超过截止时间的请求
+        now = time.monotonic()
+        expired = [item for item in batch if item.deadline is not None and item.deadline <= now]
+        if expired:
+            for item in expired:
+                item.future.set_exception(TimeoutError("deadline exceeded before inference"))
+            with self._lock:
+                self._expired += len(expired)
+            batch = [item for item in batch if item.deadline is None or item.deadline > now]
+            if not batch:
+                return
+
+        # 1. 记录组批等待时间（以最早入队的请求为准）
+        started = time.perf_counter()
+        wait_ms = (started - batch[0].enqueued_at) * 1000
+
+        # 2. 执行一次批量推理
+        try:
+            results = self.generate_fn([item.input for item in batch])
+            if not isinstance(results, list) or len(results) != len(batch):
+                raise RuntimeError(f"batch result size mismatch: expected {len(batch)}, got {len(results) if isinstance(results, list) else type(results)}")
+        except Exception as e:
+            logger.error(f"Batch inference failed, size: {len(batch)}, error: {str(e)}")
+            with self._lock:
+                self._failed_batches += 1
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # 一个损坏的输入会让整批失败，逐个重新推理找出出错的输入
+            self._infer_each(batch)
+            return
+
+        # 3. 分发结果
+        infer_ms = (time.perf_counter() - started) * 1000
+        for item, result in zip(batch, results):
+            item.future.set_result(result)
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._recent.append({
+                "size": len(batch),
+                "wait_ms": round(wait_ms, 2),
+                "infer_ms": round(infer_ms, 2),
+            })
+
+    def _infer_each(self, batch: list):
+        """批量推理失败后逐个推理，每个请求只收到自己的结果或异常"""
+        failed = 0
+        for item in batch:
+            try:
+                results = self.generate_fn([item.input])
+                if not isinstance(results, list) or len(results) != 1:
+                    raise RuntimeError(f"batch result size mismatch: expected 1, got {len(results) if isinstance(results, list) else type(results)}")
+            except Exception as e:
+                failed += 1
+                item.future.set_exception(e)
+                continue
+            item.future.set_result(results[0])
+        logger.info(f"Batch retried item by item, size: {len(batch)}, failed: {failed}")
+        with self._lock:
+            self._retried_items += len(batch)
+            self._items += len(batch) - failed
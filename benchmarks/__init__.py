@@ -0,0 +1 @@
+# 性能基准测试，在项目根目录执行：python -m benchmarks run（完整套件）或 python -m benchmarks.<模块名>
@@ -0,0 +1,110 @@
+"""
+基准测试套件入口（纯CPU、无网络）
+
+运行微基准和端到端压测，结果写入JSON：
+    python -m benchmarks run --output results.json [--quick]
+
+对比两次结果（例如两个提交），延迟变长或吞吐下降超过阈值时以非0状态码退出：
+    python -m benchmarks compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+from benchmarks.report import environment, write_json
+
+
+# 值越小越好 / 越大越好的指标后缀
+LOWER_IS_BETTER = ("_ms",)
+HIGHER_IS_BETTER = ("_rps", "_mbps")
+
+
+def run(args) -> dict:
+    # 压测需要导入应用（依赖funasr等），只在run时导入，compare不需要
+    from benchmarks import bench_load, bench_micro
+
+    if args.quick:
+        tokens, sizes_kb, repeat = [1000], [64, 1024], 3
+        levels, requests = [1, 8], 40
+    else:
+        tokens, sizes_kb, repeat = [1000, 10000], [64, 1024, 16384], 5
+        levels, requests = [1, 8, 32], 200
+
+    result = {"environment": environment(), "quick": args.quick}
+    result["micro"] = bench_micro.run(tokens, sizes_kb, repeat)
+    result["load"] = {endpoint: bench_load.run(levels, requests, endpoint=endpoint) for endpoint in ("text", "srt")}
+    write_json(result, args.output)
+    return result
+
+def flatten(value, prefix: str = "") -> dict:
+    """嵌套结果展开为 {路径: 数值}"""
+    items = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            items.update(flatten(child, f"{prefix}[{index}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix] = value
+    return items
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    对比两次结果中的延迟和吞吐指标
+
+    Returns:
+        changes: [{"metric", "baseline", "current", "change", "regression"}, ...]，只包含变化超过阈值的指标
+    """
+    old = flatten({k: v for k, v in baseline.items() if k != "environment"})
+    new = flatten({k: v for k, v in current.items() if k != "environment"})
+    changes = []
+    for metric in sorted(old.keys() & new.keys()):
+        lower = metric.endswith(LOWER_IS_BETTER)
+        higher = metric.endswith(HIGHER_IS_BETTER)
+        if not (lower or higher) or not old[metric]:
+            continue
+        change = (new[metric] - old[metric]) / old[metric]
+        if abs(change) < threshold:
+            continue
+        changes.append({
+            "metric": metric,
+            "baseline": old[metric],
+            "current": new[metric],
+            "change": round(change, 4),
+            "regression": change > 0 if lower else change < 0,
+        })
+    return changes
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="AutoSubRT offline benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run micro-benchmarks and load tests")
+    run_parser.add_argument("--quick", action="store_true", help="fewer sizes, levels and requests")
+    run_parser.add_argument("--output", default=None, help="write JSON results to this file")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="relative change to report")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    changes = compare(baseline, current, args.threshold)
+    write_json({
+        "baseline": baseline.get("environment", {}).get("commit"),
+        "current": current.get("environment", {}).get("commit"),
+        "changes": changes,
+    })
+    if any(change["regression"] for change in changes):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+推理运行时自动调优：在本机上对比多组（槽位数, 每槽位线程数, 算子间线程数, CPU绑定）的识别吞吐，写出最优配置
+
+每组配置在独立的spawn子进程中加载模型（torch算子间线程数只能在进程第一次并行计算之前设置），
+concurrency个客户端线程持续提交合成语料（或--corpus目录中的音频），统计每秒识别的音频秒数和请求延迟。
+基线为不限制槽位、torch默认线程数（服务的默认行为）。吞吐最高的配置写入--output，
+服务设置 RUNTIME_PROFILE=<该文件> 后在加载模型时应用。
+
+需要真实模型（funasr），--stub只用来检查流程（桩模型不占用CPU，结果不反映CPU争用）。
+
+用法：python -m benchmarks.autotune --output data/runtime.json --concurrency 8 --requests 48
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.report import environment, summarize, write_json
+
+
+def candidates(cpus: int, slots_options: list, inter_options: list, affinity: bool) -> list:
+    """
+    待测配置：每个槽位数使用 cpus/槽位数 个线程（以及一半线程），多个槽位时分别测试绑定和不绑定CPU
+
+    Returns:
+        settings: [RuntimeSettings参数字典, ...]，第一个是基线
+    """
+    settings = [{"intra_op_threads": 0, "inter_op_threads": 0, "slots": 0, "affinity": ""}]
+    for slots in slots_options:
+        if slots > cpus:
+            continue
+        threads = sorted({max(1, cpus // slots), max(1, cpus // slots // 2)}, reverse=True)
+        for intra in threads:
+            for inter in inter_options:
+                for pinned in ((False, True) if affinity and slots > 1 else (False,)):
+                    settings.append({"intra_op_threads": intra, "inter_op_threads": inter, "slots": slots,
+                                     "affinity": "auto" if pinned else ""})
+    return settings
+
+def default_slots(cpus: int) -> list:
+    """1、2、4、8…… 直到CPU数"""
+    slots, value = [], 1
+    while value <= cpus:
+        slots.append(value)
+        value *= 2
+    return slots
+
+def load_corpus(args) -> list:
+    """语料：--corpus目录中的音频，或按--seconds生成的合成音频"""
+    if args.corpus:
+        import audio
+        from benchmarks.bench_backends import list_corpus
+        return [audio.decode_audio(path) for path in list_corpus(args.corpus, args.limit)]
+    from benchmarks.synthetic import speech_like
+    return [speech_like(seconds, seed=i) for i, seconds in enumerate(args.seconds)]
+
+def run_candidate(settings: dict, args) -> dict:
+    """在当前（子）进程中按settings加载模型并压测"""
+    import runtime
+
+    options = runtime.RuntimeSettings(**settings)
+    runtime.apply_process(options)
+    if args.stub:
+        from benchmarks.stub_model import StubModel
+        model = StubModel(fixed_ms=20, per_item_ms=0, per_second_ms=5)
+    else:
+        import backends
+        from funasr import AutoModel
+        model = backends.load(AutoModel, args.model, args.backend)
+
+    slots = runtime.InferenceSlots(model, options.slots, threads=options.intra_op_threads,
+                                   cpu_sets=options.cpu_sets()) if options.slots else None
+    engine = slots or model
+    corpus = load_corpus(args)
+    # 预热：每个槽位（或模型）先识别一次，不计入耗时
+    if slots is not None:
+        slots.broadcast(corpus[0])
+    else:
+        model.generate(input=corpus[0])
+
+    def one(index):
+        clip = corpus[index % len(corpus)]
+        started = time.perf_counter()
+        engine.generate(input=clip)
+        return (time.perf_counter() - started) * 1000, len(clip) / 16000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    if slots is not None:
+        slots.shutdown()
+
+    audio_seconds = sum(seconds for _, seconds in results)
+    summary = summarize([latency for latency, _ in results], elapsed)
+    return {
+        "settings": settings,
+        "audio_seconds_per_second": round(audio_seconds / elapsed, 3),
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "elapsed_s": round(elapsed, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune torch threads, CPU affinity and inference slots for this host")
+    parser.add_argument("--output", default=os.path.join("data", "runtime.json"), help="where to write the best settings")
+    parser.add_argument("--model", default=os.getenv("MODEL_DIR") or "paraformer-zh", help="model name or local snapshot directory")
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "torch"), choices=["torch", "int8"])
+    parser.add_argument("--corpus", default="", help="directory of audio files, synthetic clips when empty")
+    parser.add_argument("--limit", type=int, default=8, help="only use the first N corpus files")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 15, 30], help="synthetic clip durations")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads submitting requests")
+    parser.add_argument("--requests", type=int, default=48, help="requests per candidate")
+    parser.add_argument("--slots", type=int, nargs="+", default=None, help="slot counts to try, default 1 2 4 ... up to the CPU count")
+    parser.add_argument("--inter-op", type=int, nargs="+", default=[1], help="torch inter-op thread counts to try")
+    parser.add_argument("--no-affinity", action="store_true", help="do not try pinning slots to CPU sets")
+    parser.add_argument("--stub", action="store_true", help="use the stub model (checks the harness only)")
+    args = parser.parse_args()
+
+    from runtime import RuntimeSettings, available_cpus
+
+    cpus = len(available_cpus())
+    settings = candidates(cpus, args.slots or default_slots(cpus), args.inter_op, not args.no_affinity)
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for index, candidate in enumerate(settings, 1):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_candidate, (candidate, args))
+        results.append(result)
+        print(f"[{index}/{len(settings)}] {candidate} -> {result['audio_seconds_per_second']} audio s/s, p95 {result['p95_ms']} ms", flush=True)
+
+    baseline = results[0]
+    # 吞吐最高者胜出，吞吐相差不到2%时取p95延迟更低的
+    top = max(result["audio_seconds_per_second"] for result in results)
+    best = min((result for result in results if result["audio_seconds_per_second"] >= top * 0.98), key=lambda result: result["p95_ms"])
+    speedup = round(best["audio_seconds_per_second"] / baseline["audio_seconds_per_second"], 2) if baseline["audio_seconds_per_second"] else 0
+
+    RuntimeSettings(**best["settings"]).save(args.output, extra={
+        "tuned": {"environment": environment(), "cpus": cpus, "backend": args.backend, "speedup_vs_default": speedup,
+                  "audio_seconds_per_second": best["audio_seconds_per_second"], "p95_ms": best["p95_ms"]},
+    })
+    write_json({"environment": environment(), "cpus": cpus, "best": best, "baseline": baseline,
+                "speedup_vs_default": speedup, "output": args.output, "results": results})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+推理后端对比：本地音频语料分别用各后端（torch/int8/onnx）识别，统计实时率、内存和相对fp32基线的字错误率（CER）
+
+需要真实模型（funasr；onnx后端还需要funasr-onnx和onnxruntime），不使用桩模型。
+语料目录中的音频文件（wav/flac/mp3/m4a等）逐个识别；存在同名.txt文件时作为参考文本，额外统计相对参考文本的CER。
+每个后端在独立的子进程中运行，内存峰值互不影响。
+
+用法：python -m benchmarks.bench_backends --corpus ./corpus --backends torch int8 onnx --output backends.json
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+import unicodedata
+from benchmarks.report import environment, write_json
+
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".m4a", ".aac", ".opus")
+
+
+def list_corpus(directory: str, limit: int = 0) -> list:
+    """语料目录中的音频文件（按文件名排序）"""
+    files = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+    return files[:limit] if limit else files
+
+def read_reference(path: str) -> str:
+    reference = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(reference):
+        return None
+    with open(reference, encoding="utf-8") as f:
+        return f.read()
+
+def normalize(text: str) -> str:
+    """计算CER前去掉空白和标点，英文统一小写"""
+    return "".join(
+        c for c in (text or "").lower()
+        if not c.isspace() and not unicodedata.category(c).startswith("P")
+    )
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """字符级编辑距离（两行滚动数组）"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, r in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, h in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1]
+
+def cer(references: list, hypotheses: list) -> float:
+    """整个语料的字错误率：编辑距离之和 / 参考文本字数之和"""
+    errors = chars = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        reference, hypothesis = normalize(reference), normalize(hypothesis)
+        errors += edit_distance(reference, hypothesis)
+        chars += len(reference)
+    return round(errors / chars, 4) if chars else 0.0
+
+def _rss_mb() -> float:
+    """当前进程的常驻内存（MB）"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+def _peak_rss_mb() -> float:
+    # Linux下ru_maxrss单位为KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def run_backend(backend: str, source: str, files: list, onnx_dir: str = "", onnx_quantize: bool = False, threads: int = 0) -> dict:
+    """在当前进程中加载一个后端并识别全部语料（由子进程调用）"""
+    import audio
+    import backends
+    import service
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+    started = time.perf_counter()
+    from funasr import AutoModel
+    model = backends.load(AutoModel, source, backend, onnx_dir=onnx_dir, onnx_quantize=onnx_quantize, onnx_threads=threads)
+    load_seconds = time.perf_counter() - started
+    rss_after_load = _rss_mb()
+
+    samples = [audio.decode_audio(path) for path in files]
+    # 第一条音频先识别一次（预热），不计入耗时
+    model.generate(input=samples[0])
+
+    texts = []
+    infer_seconds = 0.0
+    for item in samples:
+        started = time.perf_counter()
+        result = model.generate(input=item)
+        infer_seconds += time.perf_counter() - started
+        text, _ = service.extract_asr_result(result)
+        texts.append(text or "")
+
+    audio_seconds = sum(len(item) for item in samples) / audio.SAMPLE_RATE
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": _peak_rss_mb(),
+        "audio_seconds": round(audio_seconds, 3),
+        "infer_seconds": round(infer_seconds, 3),
+        "rtf": round(infer_seconds / audio_seconds, 4) if audio_seconds else 0,
+        "texts": texts,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends: real-time factor, memory and CER against fp32")
+    parser.add_argument("--corpus", required=True, help="directory of audio files, optional <name>.txt references")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--model", default=os.getenv("MODEL_DIR") or "paraformer-zh", help="model name or local snapshot directory")
+    parser.add_argument("--onnx-dir", default="", help="exported ONNX model directory (exported from --model when empty)")
+    parser.add_argument("--onnx-quantize", action="store_true", help="use the int8 ONNX model")
+    parser.add_argument("--threads", type=int, default=0, help="torch / ONNX Runtime threads, 0 for default")
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N files")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    files = list_corpus(args.corpus, args.limit)
+    if not files:
+        parser.error(f"no audio files in {args.corpus}")
+    references = [read_reference(path) for path in files]
+
+    # fp32 PyTorch是CER的基线，总是第一个运行
+    backend_names = ["torch"] + [name for name in args.backends if name != "torch"]
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backend_names:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_backend, (backend, args.model, files, args.onnx_dir, args.onnx_quantize, args.threads))
+        results.append(result)
+
+    baseline = results[0]
+    baseline_texts = baseline["texts"]
+    for result in results:
+        texts = result.pop("texts")
+        result["cer_vs_fp32"] = cer(baseline_texts, texts)
+        scored = [(reference, text) for reference, text in zip(references, texts) if reference is not None]
+        result["cer_vs_reference"] = cer(*zip(*scored)) if scored else None
+        result["speedup_vs_fp32"] = round(baseline["infer_seconds"] / result["infer_seconds"], 2) if result["infer_seconds"] else 0
+
+    write_json({"environment": environment(), "args": vars(args), "files": len(files), "results": results}, args.output)
+
+if __name__ == "__main__":
+    main()
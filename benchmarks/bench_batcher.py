@@ -0,0 +1,65 @@
+"""
+批处理调度器吞吐对比：逐个调用model.generate vs BatchScheduler合批
+
+用法：python -m benchmarks.bench_batcher --requests 200 --concurrency 16
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batcher import BatchScheduler
+from benchmarks.stub_model import StubModel
+
+
+def run(call, requests: int, concurrency: int) -> dict:
+    """并发执行requests次call，返回吞吐和延迟"""
+    latencies = []
+
+    def one(i):
+        started = time.perf_counter()
+        call(f"audio_{i}.wav")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="BatchScheduler benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=30.0)
+    parser.add_argument("--fixed-ms", type=float, default=40.0, help="stub model per-call overhead")
+    parser.add_argument("--per-item-ms", type=float, default=5.0, help="stub model per-item cost")
+    args = parser.parse_args()
+
+    # 1. 当前路径：每个请求单独调用generate
+    model = StubModel(fixed_ms=args.fixed_ms, per_item_ms=args.per_item_ms)
+    single = run(lambda x: model.generate(input=x), args.requests, args.concurrency)
+    single["generate_calls"] = model.calls
+
+    # 2. 批处理路径
+    model = StubModel(fixed_ms=args.fixed_ms, per_item_ms=args.per_item_ms)
+    scheduler = BatchScheduler(lambda inputs: model.generate(input=inputs, batch_size=len(inputs)),
+                               max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    scheduler.start()
+    try:
+        batched = run(scheduler.submit, args.requests, args.concurrency)
+    finally:
+        scheduler.stop()
+    batched["generate_calls"] = model.calls
+    batched["avg_batch_size"] = scheduler.stats()["avg_batch_size"]
+
+    print(json.dumps({"args": vars(args), "single": single, "batched": batched}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+批量识别对比：逐个调用/asr/srt vs 一次调用/asr/bulk（下载和识别流水线执行）
+
+源站设置响应延迟模拟网络耗时，桩模型模拟推理耗时；逐个调用时下载和推理串行，批量接口中两者重叠。
+
+用法：python -m benchmarks.bench_bulk --items 50 --origin-delay 0.1
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import httpx
+from benchmarks.bench_load import AppServer, prepare_audio
+from benchmarks.fileserver import LocalFileServer
+from benchmarks.stub_model import StubModel
+
+
+def sequential(client: httpx.Client, urls: list) -> dict:
+    """逐个调用/asr/srt"""
+    started = time.perf_counter()
+    errors = 0
+    for url in urls:
+        if client.post("/openapi/v1/asr/srt", json={"audio_url": url}).json().get("code") != 0:
+            errors += 1
+    return {"elapsed_s": round(time.perf_counter() - started, 3), "errors": errors}
+
+def bulk(client: httpx.Client, urls: list) -> dict:
+    """一次调用/asr/bulk，记录第一项结果返回的时间"""
+    started = time.perf_counter()
+    first_ms = None
+    errors = 0
+    with client.stream("POST", "/openapi/v1/asr/bulk", json={"audio_urls": urls}) as response:
+        for line in response.iter_lines():
+            item = json.loads(line)
+            if item.get("done"):
+                continue
+            if first_ms is None:
+                first_ms = round((time.perf_counter() - started) * 1000, 3)
+            if item["code"] != 0:
+                errors += 1
+    return {"elapsed_s": round(time.perf_counter() - started, 3), "first_item_ms": first_ms, "errors": errors}
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk endpoint vs sequential /asr/srt calls")
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--origin-delay", type=float, default=0.1, help="origin server response delay (seconds)")
+    parser.add_argument("--fixed-ms", type=float, default=40.0, help="stub model fixed cost per call")
+    parser.add_argument("--per-second-ms", type=float, default=20.0, help="stub model cost per second of audio")
+    args = parser.parse_args()
+
+    logging.getLogger("logger").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        origin = os.path.join(workdir, "origin")
+        os.makedirs(origin)
+        # 两种方式使用内容不同的音频，避免命中结果缓存
+        names = prepare_audio(origin, args.items * 2, args.audio_seconds)
+
+        model = StubModel(fixed_ms=args.fixed_ms, per_item_ms=0, per_second_ms=args.per_second_ms)
+        with LocalFileServer(origin, delay=args.origin_delay) as origin_server, AppServer(model, workdir) as app_server:
+            urls = [origin_server.url(name) for name in names]
+            with httpx.Client(base_url=app_server.base_url, timeout=600) as client:
+                results = {
+                    "sequential": sequential(client, urls[:args.items]),
+                    "bulk": bulk(client, urls[args.items:]),
+                }
+
+    results["speedup"] = round(results["sequential"]["elapsed_s"] / results["bulk"]["elapsed_s"], 2)
+    print(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+实时识别（WebSocket）延迟：按实时速度发送合成语音，统计从语音结束到收到对应字幕条目的延迟
+
+桩模型（StubStreamingModel）替代流式模型，应用在进程内通过TestClient运行，不需要WebSocket服务器依赖。
+字幕条目的延迟 = 收到条目的时间 - 包含条目结束时刻的音频消息的发送时间（按实时速度发送，第n条消息在n * message_ms时发送）。
+
+用法：python -m benchmarks.bench_live --seconds 30 --connections 1 4
+"""
+import argparse
+import json
+import logging
+import tempfile
+import threading
+import time
+import numpy as np
+from benchmarks.report import percentile
+from benchmarks.stub_model import StubModel, StubStreamingModel
+from benchmarks.synthetic import speech_like
+
+
+def stream(client, samples: np.ndarray, message_ms: int, sample_rate: int = 16000) -> dict:
+    """一个连接：按实时速度发送音频，返回各字幕条目和中间结果的延迟（毫秒）"""
+    step = sample_rate * message_ms // 1000
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    cue_latencies, partial_latencies = [], []
+
+    with client.websocket_connect("/openapi/v1/asr/live") as ws:
+        started = time.perf_counter()
+
+        def send():
+            for i, offset in enumerate(range(0, len(pcm), step)):
+                delay = started + i * message_ms / 1000 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                ws.send_bytes(pcm[offset:offset + step].tobytes())
+            ws.send_text("end")
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        while True:
+            event = ws.receive_json()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if event["type"] in ("cue", "partial"):
+                sent_ms = max(event["end"] - 1, 0) // message_ms * message_ms
+                (cue_latencies if event["type"] == "cue" else partial_latencies).append(elapsed_ms - sent_ms)
+            elif event["type"] in ("done", "error"):
+                break
+        sender.join()
+    return {"cues": cue_latencies, "partials": partial_latencies, "last": event}
+
+def _summary(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50), 1),
+        "p95_ms": round(percentile(values, 0.95), 1),
+        "max_ms": round(values[-1], 1) if values else 0,
+    }
+
+def run(client, samples: np.ndarray, connections: int, message_ms: int) -> dict:
+    results = [None] * connections
+
+    def one(i):
+        results[i] = stream(client, samples, message_ms)
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    errors = [r["last"] for r in results if r["last"]["type"] == "error"]
+    return {
+        "connections": connections,
+        "errors": len(errors),
+        "cue_latency": _summary([v for r in results for v in r["cues"]]),
+        "partial_latency": _summary([v for r in results for v in r["partials"]]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Live WebSocket recognition cue latency with a stub streaming model")
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio length per connection")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--message-ms", type=int, default=100, help="audio per WebSocket message")
+    parser.add_argument("--chunk-frames", type=int, default=10, help="60 ms frames per streaming chunk")
+    parser.add_argument("--per-second-ms", type=float, default=20.0, help="stub model cost per second of audio")
+    args = parser.parse_args()
+
+    logging.getLogger("logger").setLevel(logging.WARNING)
+
+    import config
+    config.LIVE_CHUNK_FRAMES = args.chunk_frames
+    config.LIVE_MAX_CONNECTIONS = max(args.connections)
+    with tempfile.TemporaryDirectory() as workdir:
+        config.TEMP_DIR = f"{workdir}/temp"
+        config.VIDEO_OUTPUT_DIR = f"{workdir}/output/video"
+        config.SRT_OUTPUT_DIR = f"{workdir}/output/srt"
+        config.CACHE_DIR = f"{workdir}/cache"
+
+        from fastapi.testclient import TestClient
+        import main
+        import service
+        import startup
+        # 模型已设置时load_model不会再加载模型
+        service.model = StubModel()
+        service.live_model = StubStreamingModel(per_second_ms=args.per_second_ms)
+
+        samples = speech_like(args.seconds)
+        with TestClient(main.app) as client:
+            startup.wait(30)
+            report = [run(client, samples, connections, args.message_ms) for connections in args.connections]
+
+    print(json.dumps({"args": vars(args), "results": report}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+端到端压测：在本进程中用uvicorn启动FastAPI应用（桩模型替代AutoModel），
+从本地文件服务器提供音频，按固定并发数发送请求，统计吞吐和p50/p95/p99延迟
+
+每个请求默认使用内容不同的音频，避免命中结果缓存；--reuse-audio时所有请求使用同一个文件（测量缓存命中路径）。
+
+用法：python -m benchmarks.bench_load --concurrency 1 8 32 --requests 200 --endpoint srt --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import httpx
+import uvicorn
+import config
+from benchmarks.fileserver import LocalFileServer
+from benchmarks.report import environment, summarize, write_json
+from benchmarks.stub_model import StubModel
+from benchmarks.synthetic import speech_like, write_wav
+
+
+ENDPOINTS = {
+    "text": "/openapi/v1/asr/text",
+    "srt": "/openapi/v1/asr/srt",
+    "transcripts": "/openapi/v1/transcripts",
+}
+
+
+class AppServer:
+    """在后台线程中运行的uvicorn服务，输出目录和缓存目录都放在workdir下"""
+
+    def __init__(self, model, workdir: str):
+        config.TEMP_DIR = os.path.join(workdir, "temp")
+        config.VIDEO_OUTPUT_DIR = os.path.join(workdir, "output", "video")
+        config.SRT_OUTPUT_DIR = os.path.join(workdir, "output", "srt")
+        config.CACHE_DIR = os.path.join(workdir, "cache")
+
+        # 导入应用之前完成配置；模型已设置时load_model不会再加载AutoModel
+        import main
+        import service
+        import storage
+        service.model = model
+        # 多次运行共用同一个进程时，结果缓存和存储目录重新创建在本次的workdir下
+        service.result_cache = None
+        storage.manager = storage.from_config()
+
+        self.port = _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on"))
+        self._thread = threading.Thread(target=self.server.run, name="bench-uvicorn", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.05)
+        # 模型在后台加载和预热，就绪后再开始压测
+        import startup
+        if not startup.wait(30):
+            raise RuntimeError(f"app not ready: {startup.state.snapshot()}")
+        return self
+
+    def __exit__(self, *args):
+        self.server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# 音频编号在进程内递增，多次运行生成的音频内容也互不相同
+_audio_ids = itertools.count(1)
+
+def prepare_audio(directory: str, count: int, seconds: float) -> list:
+    """生成count个内容互不相同的WAV文件，返回文件名列表"""
+    base = speech_like(seconds)
+    names = []
+    for i in range(count):
+        samples = base.copy()
+        # 改动两个采样点即可让内容哈希不同
+        audio_id = next(_audio_ids)
+        samples[0], samples[1] = (audio_id % 32767) / 32767, (audio_id // 32767) / 32767
+        name = f"audio_{i}.wav"
+        write_wav(os.path.join(directory, name), samples)
+        names.append(name)
+    return names
+
+async def load(base_url: str, path: str, urls: list, concurrency: int) -> dict:
+    """closed-loop压测：concurrency个并发客户端依次发送len(urls)个请求"""
+    latencies = []
+    errors = 0
+    pending = iter(urls)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+        async def worker():
+            nonlocal errors
+            for url in pending:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, json={"audio_url": url})
+                    ok = response.status_code == 200 and response.json().get("code") == 0
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - started) * 1000)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed, errors)
+
+def run(concurrency_levels: list, requests: int, endpoint: str = "srt", audio_seconds: float = 3.0, reuse_audio: bool = False,
+        fixed_ms: float = 40.0, per_item_ms: float = 5.0, per_second_ms: float = 0.0) -> list:
+    """
+    按各并发级别压测一个接口
+
+    Returns:
+        results: 每个并发级别的吞吐和延迟分布，以及服务端批处理、缓存统计
+    """
+    # 请求日志会显著影响吞吐，压测时只保留警告
+    logging.getLogger("logger").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        origin = os.path.join(workdir, "origin")
+        os.makedirs(origin)
+        total = 1 if reuse_audio else requests * len(concurrency_levels) + 1
+        names = prepare_audio(origin, total, audio_seconds)
+
+        model = StubModel(fixed_ms=fixed_ms, per_item_ms=per_item_ms, per_second_ms=per_second_ms)
+        with LocalFileServer(origin) as origin_server, AppServer(model, workdir) as app_server:
+            urls = [origin_server.url(name) for name in names]
+            path = ENDPOINTS[endpoint]
+
+            # 预热（建立连接、首次导入等）
+            asyncio.run(load(app_server.base_url, path, urls[:1], 1))
+
+            for level, concurrency in enumerate(concurrency_levels):
+                batch = [urls[0]] * requests if reuse_audio else urls[1 + level * requests:1 + (level + 1) * requests]
+                summary = asyncio.run(load(app_server.base_url, path, batch, concurrency))
+                summary["concurrency"] = concurrency
+                summary["server"] = _server_stats(app_server.base_url)
+                results.append(summary)
+    return results
+
+def _server_stats(base_url: str) -> dict:
+    data = httpx.get(f"{base_url}/openapi/v1/stats", timeout=30).json().get("data", {})
+    batcher = data.get("batcher") or {}
+    cache = data.get("cache") or {}
+    return {
+        "avg_batch_size": batcher.get("avg_batch_size"),
+        "cache_hit_rate": cache.get("hit_rate"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test against the FastAPI app with a stub model")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="srt")
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--reuse-audio", action="store_true", help="send the same audio every time (cache-hit path)")
+    parser.add_argument("--fixed-ms", type=float, default=40.0, help="stub model per-call overhead")
+    parser.add_argument("--per-item-ms", type=float, default=5.0, help="stub model per-item cost")
+    parser.add_argument("--per-second-ms", type=float, default=0.0, help="stub model cost per second of audio")
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.concurrency, args.requests, endpoint=args.endpoint, audio_seconds=args.audio_seconds, reuse_audio=args.reuse_audio,
+                  fixed_ms=args.fixed_ms, per_item_ms=args.per_item_ms, per_second_ms=args.per_second_ms)
+    write_json({"environment": environment(), "args": vars(args), "load": results}, args.output)
+
+if __name__ == "__main__":
+    main()
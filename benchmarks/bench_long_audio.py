@@ -0,0 +1,55 @@
+"""
+长音频流水线对比：整段单次识别 vs VAD切分+多进程并行识别
+
+用法：python -m benchmarks.bench_long_audio --minutes 5 --workers 4
+"""
+import argparse
+import json
+import time
+from longaudio import LongAudioPipeline
+from benchmarks.stub_model import StubModel, StubVadModel
+from benchmarks.synthetic import speech_like
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long audio pipeline benchmark")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-segment-seconds", type=int, default=30)
+    parser.add_argument("--per-second-ms", type=float, default=20.0, help="stub model CPU cost per second of audio")
+    args = parser.parse_args()
+
+    # 桩模型空转CPU，多进程并行才能体现多核收益
+    model = StubModel(fixed_ms=5, per_item_ms=0, per_second_ms=args.per_second_ms, busy=True)
+    pipeline = LongAudioPipeline(model, StubVadModel(), workers=args.workers, worker_threads=0,
+                                 max_segment_ms=args.max_segment_seconds * 1000)
+
+    report = []
+    try:
+        for minutes in args.minutes:
+            samples = speech_like(minutes * 60)
+
+            started = time.perf_counter()
+            model.generate(input=samples)
+            single = time.perf_counter() - started
+
+            started = time.perf_counter()
+            pipeline.recognize(samples)
+            parallel = time.perf_counter() - started
+
+            report.append({
+                "minutes": minutes,
+                "single_seconds": round(single, 3),
+                "single_rtf": round(single / (minutes * 60), 4),
+                "pipeline_seconds": round(parallel, 3),
+                "pipeline_rtf": round(parallel / (minutes * 60), 4),
+                "speedup": round(single / parallel, 2),
+                "segments": pipeline.stats()["recent"][-1]["segments"],
+            })
+    finally:
+        pipeline.shutdown()
+
+    print(json.dumps({"args": vars(args), "results": report}, indent=2))
+
+if __name__ == "__main__":
+    main()
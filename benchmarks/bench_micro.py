@@ -0,0 +1,80 @@
+"""
+微基准：字幕分段（split_text_by_timestamp）、SRT条目构造（create_srt_entries）和文件下载（helper.download）
+
+下载使用本地文件服务器，不依赖网络。
+
+用法：python -m benchmarks.bench_micro --tokens 1000 10000 --sizes-kb 64 1024 16384 --output micro.json
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import helper
+import service
+from benchmarks.fileserver import LocalFileServer
+from benchmarks.report import best_of, environment, summarize, write_json
+from benchmarks.synthetic import transcript
+
+
+def bench_subtitles(tokens_list: list, repeat: int) -> list:
+    """split_text_by_timestamp和create_srt_entries在不同文本长度下的耗时"""
+    # create_srt_entries会把整段文本打到日志里，基准测试时关闭
+    logging.getLogger("logger").setLevel(logging.WARNING)
+
+    results = []
+    for tokens in tokens_list:
+        text, timestamps = transcript(tokens)
+        results.append({
+            "tokens": tokens,
+            "split_text_by_timestamp_ms": round(best_of(lambda: service.split_text_by_timestamp(text, timestamps), repeat), 3),
+            "create_srt_entries_ms": round(best_of(lambda: service.create_srt_entries(text, timestamps), repeat), 3),
+        })
+    return results
+
+def bench_download(sizes_kb: list, repeat: int, ranges: bool = True, delay: float = 0.0) -> list:
+    """helper.download从本地源站下载不同大小文件的耗时和吞吐"""
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        origin = os.path.join(root, "origin")
+        target = os.path.join(root, "target")
+        os.makedirs(origin)
+        os.makedirs(target)
+        for size_kb in sizes_kb:
+            with open(os.path.join(origin, f"{size_kb}.bin"), "wb") as f:
+                f.write(os.urandom(size_kb * 1024))
+
+        with LocalFileServer(origin, ranges=ranges, delay=delay) as server:
+            for size_kb in sizes_kb:
+                url = server.url(f"{size_kb}.bin")
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    request_started = time.perf_counter()
+                    path = helper.download(url, target, limit=(size_kb + 1) * 1024)
+                    latencies.append((time.perf_counter() - request_started) * 1000)
+                    os.remove(path)
+                summary = summarize(latencies, time.perf_counter() - started)
+                summary["size_kb"] = size_kb
+                summary["throughput_mbps"] = round(size_kb / 1024 / (summary["p50_ms"] / 1000), 2) if summary["p50_ms"] else 0
+                results.append(summary)
+    return results
+
+def run(tokens_list: list, sizes_kb: list, repeat: int) -> dict:
+    return {
+        "subtitles": bench_subtitles(tokens_list, repeat),
+        "download": bench_download(sizes_kb, repeat),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for segmentation, SRT entries and download")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[64, 1024, 16384])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="write JSON results to this file")
+    args = parser.parse_args()
+
+    write_json({"environment": environment(), "args": vars(args), "micro": run(args.tokens, args.sizes_kb, args.repeat)}, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+统一响应格式的每请求开销对比：
+legacy（BaseHTTPMiddleware读回响应体 + json.loads + 重新序列化，每个请求三次makedirs）
+vs 当前实现（纯ASGI中间件 + EnvelopeJSONResponse一次序列化 + 异常处理器）
+
+两个应用注册相同的路由，通过ASGITransport在进程内调用，不经过网络，只比较框架和中间件的开销。
+legacy中间件按改造前的middlewares.py原样复制在本文件中。
+
+用法：python -m benchmarks.bench_middleware --requests 2000 --concurrency 16 --items 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.middleware.base import BaseHTTPMiddleware
+from exceptions import CustomError, CustomException
+from responses import EnvelopeJSONResponse
+import middlewares
+
+
+class Item(BaseModel):
+    start_ms: int
+    end_ms: int
+    text: str
+
+class Payload(BaseModel):
+    text: str
+    items: list[Item]
+
+class Query(BaseModel):
+    audio_url: str
+
+
+class LegacyPrepareMiddleware(BaseHTTPMiddleware):
+    """改造前的PrepareMiddleware：每个请求创建目录"""
+
+    def __init__(self, app, dirs: list):
+        super().__init__(app)
+        self.dirs = dirs
+
+    async def dispatch(self, request: Request, call_next):
+        for d in self.dirs:
+            os.makedirs(d, exist_ok=True)
+        return await call_next(request)
+
+
+class LegacyResponseMiddleware(BaseHTTPMiddleware):
+    """改造前的ResponseMiddleware：读回响应体、解析后重新序列化"""
+
+    async def dispatch(self, request: Request, call_next):
+        lang = request.headers.get('Accept-Language', 'zh').split(',')[0].split('-')[0]
+        lang = lang if lang in ['zh', 'en'] else 'zh'
+        try:
+            response = await call_next(request)
+            if response.status_code != 200:
+                body = b""
+                async for chunk in response.body_iterator:
+                    body += chunk
+                body_str = body.decode()
+                if response.status_code == 422:
+                    error_data = json.loads(body_str)
+                    messages = [".".join(str(p) for p in e["loc"] if p != "body") + f": {e['msg']}" for e in error_data["detail"]]
+                    return JSONResponse(status_code=200, content=CustomError.PARAM_VALIDATION_FAILED.as_dict(detail="; ".join(messages), lang=lang))
+                return JSONResponse(status_code=200, content={"code": response.status_code, "message": f"HTTP Error {response.status_code}", "data": {"detail": body_str}})
+            if response.headers.get('content-type') == 'application/json':
+                body = [section async for section in response.body_iterator]
+                if not body:
+                    return response
+                data = json.loads(b''.join(body).decode())
+                if 'code' in data and 'message' in data:
+                    return response
+                return JSONResponse(status_code=response.status_code, content={
+                    'code': CustomError.SUCCESS.code,
+                    'message': CustomError.SUCCESS.as_dict(lang=lang)['message'],
+                    'data': data,
+                })
+            return response
+        except CustomException as e:
+            return JSONResponse(status_code=200, content=e.err.as_dict(detail=e.detail, lang=lang))
+        except Exception as e:
+            return JSONResponse(status_code=200, content=CustomError.INTERNAL_SERVER_ERROR.as_dict(detail=str(e), lang=lang))
+
+
+def add_routes(app: FastAPI, payload: Payload):
+    @app.post("/json", response_model=Payload)
+    def json_route(query: Query):
+        return payload
+
+    @app.post("/error")
+    def error_route(query: Query):
+        raise CustomException(CustomError.DOWNLOAD_FILE_FAILED)
+
+    @app.get("/stream")
+    def stream_route():
+        return StreamingResponse((b"x" * 1024 for _ in range(64)), media_type="application/octet-stream")
+
+def legacy_app(payload: Payload, dirs: list) -> FastAPI:
+    app = FastAPI()
+    add_routes(app, payload)
+    app.add_middleware(LegacyPrepareMiddleware, dirs=dirs)
+    app.add_middleware(LegacyResponseMiddleware)
+    return app
+
+def current_app(payload: Payload) -> FastAPI:
+    app = FastAPI(default_response_class=EnvelopeJSONResponse)
+    add_routes(app, payload)
+    app.add_middleware(middlewares.ResponseMiddleware)
+    middlewares.register_exception_handlers(app)
+    return app
+
+async def run(app: FastAPI, method: str, path: str, body: dict, requests: int, concurrency: int) -> dict:
+    """并发执行requests次请求，返回每请求耗时分布"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 预热
+        await client.request(method, path, json=body)
+
+        queue = asyncio.Queue()
+        for _ in range(requests):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Response envelope middleware benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--items", type=int, default=50, help="entries in the JSON response body")
+    args = parser.parse_args()
+
+    payload = Payload(text="多 谢 请 入 席 吧", items=[Item(start_ms=i * 100, end_ms=i * 100 + 80, text="字幕") for i in range(args.items)])
+    cases = {
+        "json": ("POST", "/json", {"audio_url": "http://example.com/a.wav"}),
+        "custom_error": ("POST", "/error", {"audio_url": "http://example.com/a.wav"}),
+        "validation_error": ("POST", "/json", {}),
+        "streaming": ("GET", "/stream", None),
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = [os.path.join(tmp, name) for name in ("temp", "video", "srt")]
+        apps = {"legacy": legacy_app(payload, dirs), "current": current_app(payload)}
+        for case, (method, path, body) in cases.items():
+            results[case] = {name: asyncio.run(run(app, method, path, body, args.requests, args.concurrency)) for name, app in apps.items()}
+            legacy, current = results[case]["legacy"]["mean_ms"], results[case]["current"]["mean_ms"]
+            results[case]["mean_overhead_saved_ms"] = round(legacy - current, 3)
+
+    print(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
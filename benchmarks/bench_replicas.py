@@ -0,0 +1,74 @@
+"""
+模型副本池对比：服务进程内单个模型 vs 多进程副本池，并发客户端下的吞吐和延迟
+
+用法：python -m benchmarks.bench_replicas --replicas 2 4 --concurrency 16 --requests 200
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batcher import BatchScheduler
+from replicas import ReplicaPool
+from benchmarks.report import summarize
+from benchmarks.stub_model import StubModel
+from benchmarks.synthetic import speech_like
+
+
+def load(generate, audio, requests: int, concurrency: int) -> dict:
+    """concurrency个线程共发送requests个识别请求"""
+    def one(_):
+        started = time.perf_counter()
+        generate(audio)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(one, range(requests)))
+    return summarize(latencies, time.perf_counter() - started)
+
+def batched(generate_fn, args, concurrency: int = 1):
+    batcher = BatchScheduler(generate_fn, max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms, concurrency=concurrency)
+    batcher.start()
+    return batcher
+
+def main():
+    parser = argparse.ArgumentParser(description="Model replica pool benchmark")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=float, default=30.0)
+    parser.add_argument("--per-second-ms", type=float, default=10.0, help="stub model CPU cost per second of audio")
+    args = parser.parse_args()
+
+    # 桩模型空转CPU，多进程并行才能体现多核收益
+    model = StubModel(fixed_ms=20, per_item_ms=2, per_second_ms=args.per_second_ms, busy=True)
+    audio = speech_like(args.audio_seconds)
+
+    batcher = batched(lambda inputs: model.generate(input=inputs, batch_size=len(inputs)), args)
+    try:
+        baseline = load(batcher.submit, audio, args.requests, args.concurrency)
+        baseline["replicas"] = 0
+        baseline["avg_batch_size"] = batcher.stats()["avg_batch_size"]
+        report = [baseline]
+    finally:
+        batcher.stop()
+
+    for replicas in args.replicas:
+        pool = ReplicaPool(model, replicas, threads=0)
+        batcher = batched(lambda inputs: pool.generate(inputs, batch_size=len(inputs)), args, concurrency=replicas)
+        try:
+            summary = load(batcher.submit, audio, args.requests, args.concurrency)
+            summary["replicas"] = replicas
+            summary["avg_batch_size"] = batcher.stats()["avg_batch_size"]
+            summary["speedup"] = round(summary["throughput_rps"] / report[0]["throughput_rps"], 2)
+            report.append(summary)
+        finally:
+            batcher.stop()
+            pool.shutdown()
+
+    print(json.dumps({"args": vars(args), "results": report}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+推理调度策略对比：短音频和长音频混合到达时，fifo / sjf / sjf+分通道下各类请求的延迟
+
+开环压测：请求按泊松过程到达（不等待前一个请求完成），短音频和长音频按比例混合，
+分别统计两类请求的p50/p95延迟。短音频的p50是主要指标：fifo下短音频排在长音频之后，延迟被长音频拖长。
+
+用法：python -m benchmarks.bench_scheduling --rate 8 --requests 300 --long-ratio 0.2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batcher import BatchScheduler
+from scheduling import POLICY_FIFO, POLICY_SJF
+from benchmarks.report import summarize
+from benchmarks.stub_model import StubModel
+from benchmarks.synthetic import speech_like
+
+
+# 对比的调度配置：(名称, 策略, 是否分通道)
+VARIANTS = (
+    ("fifo", POLICY_FIFO, False),
+    ("sjf", POLICY_SJF, False),
+    ("sjf+lanes", POLICY_SJF, True),
+)
+
+
+def run(model, policy: str, lanes: bool, arrivals: list, clips: dict, args) -> dict:
+    """按arrivals（[(到达时间, 类别), ...]）提交请求，返回每类请求的延迟汇总"""
+    batcher = BatchScheduler(lambda inputs: model.generate(input=inputs, batch_size=len(inputs)),
+                             max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms,
+                             policy=policy, aging=args.aging, lanes=lanes)
+    batcher.start()
+
+    latencies = {kind: [] for kind in clips}
+    lock = threading.Lock()
+
+    def one(kind):
+        audio, seconds = clips[kind]
+        started = time.perf_counter()
+        # 分通道时短音频和长音频模拟来自不同接口（text / srt）
+        batcher.submit(audio, cost=seconds, lane="text" if kind == "short" else "srt")
+        with lock:
+            latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(arrivals)) as executor:
+            for at, kind in arrivals:
+                delay = started + at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(one, kind)
+        elapsed = time.perf_counter() - started
+    finally:
+        batcher.stop()
+
+    return {kind: summarize(values, elapsed) for kind, values in latencies.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference scheduling policy benchmark with mixed short/long clips")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=8.0, help="mean arrivals per second (Poisson)")
+    parser.add_argument("--long-ratio", type=float, default=0.2, help="fraction of long clips")
+    parser.add_argument("--short-seconds", type=float, default=3.0)
+    parser.add_argument("--long-seconds", type=float, default=60.0)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--batch-wait-ms", type=float, default=10.0)
+    parser.add_argument("--aging", type=float, default=1.0, help="seconds of audio offset per second waited (sjf)")
+    parser.add_argument("--per-second-ms", type=float, default=6.0, help="stub model cost per second of audio")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = StubModel(fixed_ms=20, per_item_ms=2, per_second_ms=args.per_second_ms)
+    clips = {
+        "short": (speech_like(args.short_seconds), args.short_seconds),
+        "long": (speech_like(args.long_seconds), args.long_seconds),
+    }
+
+    # 所有策略使用相同的到达序列
+    rng = random.Random(args.seed)
+    arrivals, at = [], 0.0
+    for _ in range(args.requests):
+        at += rng.expovariate(args.rate)
+        arrivals.append((at, "long" if rng.random() < args.long_ratio else "short"))
+
+    report = []
+    for name, policy, lanes in VARIANTS:
+        result = run(model, policy, lanes, arrivals, clips, args)
+        result["policy"] = name
+        report.append(result)
+
+    fifo_p50 = report[0]["short"]["p50_ms"]
+    for result in report:
+        result["short_p50_speedup"] = round(fifo_p50 / result["short"]["p50_ms"], 2) if result["short"]["p50_ms"] else 0
+
+    print(json.dumps({"args": vars(args), "results": report}, indent=2))
+
+if __name__ == "__main__":
+    main()
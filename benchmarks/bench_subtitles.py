@@ -0,0 +1,60 @@
+"""
+字幕生成对比：pysrt路径（split_text_by_timestamp + create_srt_entries + SubRipFile.save）
+vs 向量化分段 + 直接序列化（subtitles.segment + subtitles.to_srt）
+
+两条路径生成的SRT逐字节一致由tests/test_subtitles.py校验
+
+用法：python -m benchmarks.bench_subtitles --tokens 1000 10000 50000
+"""
+import argparse
+import io
+import json
+import logging
+import time
+import service
+import subtitles
+from benchmarks.synthetic import transcript
+
+
+def pysrt_path(text: str, timestamps: list) -> str:
+    subs = service.create_srt_entries(text, timestamps)
+    buffer = io.StringIO()
+    subs.write_into(buffer)
+    return buffer.getvalue()
+
+def fast_path(text: str, timestamps: list) -> str:
+    return subtitles.to_srt(subtitles.segment(text, timestamps))
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Subtitle segmentation/serialization benchmark")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # create_srt_entries会把整段文本打到日志里，基准测试时关闭
+    logging.getLogger("logger").setLevel(logging.WARNING)
+
+    results = []
+    for tokens in args.tokens:
+        text, timestamps = transcript(tokens)
+        pysrt_ms = best_of(lambda: pysrt_path(text, timestamps), args.repeat)
+        fast_ms = best_of(lambda: fast_path(text, timestamps), args.repeat)
+        results.append({
+            "tokens": tokens,
+            "pysrt_ms": round(pysrt_ms, 3),
+            "fast_ms": round(fast_ms, 3),
+            "speedup": round(pysrt_ms / fast_ms, 2),
+        })
+
+    print(json.dumps({"results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import functools
+import http.server
+import os
+import re
+import threading
+
+
+# 完整文件响应的Content-Length行为：如实声明 / 不声明（关闭连接结束响应体）/
+# 声明一半大小但用chunked编码发送完整文件 / 如实声明但只发送一半后关闭连接
+LENGTH_EXACT = "exact"
+LENGTH_OMIT = "omit"
+LENGTH_UNDERSTATE = "understate"
+LENGTH_TRUNCATE = "truncate"
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    """在SimpleHTTPRequestHandler基础上支持单段Range请求、可选的响应延迟和异常的源站行为"""
+
+    ranges = True
+    ignore_ranges = False
+    length = LENGTH_EXACT
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path.split("?", 1)[0])
+        if not os.path.isfile(path):
+            return super().send_head()
+        range_header = self.headers.get("Range")
+        if not self.ranges or self.ignore_ranges or not range_header:
+            if self.length == LENGTH_EXACT:
+                return super().send_head()
+            return self._send_full(path)
+
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header.strip())
+        size = os.path.getsize(path)
+        if not match or int(match.group(1)) >= size:
+            self.send_error(416)
+            return None
+
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        return _Slice(f, end - start + 1)
+
+    def _send_full(self, path: str):
+        """按length的设置返回完整文件"""
+        f = open(path, "rb")
+        size = os.path.getsize(path)
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        if self.length == LENGTH_OMIT:
+            self.close_connection = True
+        elif self.length == LENGTH_UNDERSTATE:
+            self.send_header("Content-Length", str(size // 2))
+            self.send_header("Transfer-Encoding", "chunked")
+        elif self.length == LENGTH_TRUNCATE:
+            self.send_header("Content-Length", str(size))
+            self.close_connection = True
+            f = _Slice(f, size // 2)
+        self.end_headers()
+        return f
+
+    def end_headers(self):
+        # 完整文件的响应（HEAD或不带Range的GET）声明支持Range，206响应在send_head中已经声明
+        if self.ranges and not self.headers.get("Range"):
+            self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+    def copyfile(self, source, outputfile):
+        if self.delay:
+            threading.Event().wait(self.delay)
+        try:
+            if self.length == LENGTH_UNDERSTATE and not isinstance(source, _Slice):
+                _copy_chunked(source, outputfile)
+            else:
+                super().copyfile(source, outputfile)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端读完响应头后关闭连接（例如下载器改用并行分段下载）
+            pass
+
+
+def _copy_chunked(source, outputfile, chunk_size: int = 64 * 1024):
+    """以chunked传输编码发送"""
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        outputfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+    outputfile.write(b"0\r\n\r\n")
+
+
+class _Slice:
+    """只读取文件中指定长度的内容"""
+
+    def __init__(self, f, length: int):
+        self.f = f
+        self.remaining = length
+
+    def read(self, n: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        n = self.remaining if n < 0 else min(n, self.remaining)
+        data = self.f.read(n)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+class LocalFileServer:
+    """本地HTTP文件服务器，替代audio_url的源站
+    功能：
+    1. 在后台线程中提供directory目录下的文件，支持HEAD和Range请求
+    2. 可关闭Range支持、设置响应延迟，模拟不同的源站
+    3. 可模拟异常的源站：声明支持Range但忽略Range请求头（ignore_ranges），Content-Length缺失、偏小或响应体被截断（length）
+    """
+
+    def __init__(self, directory: str, ranges: bool = True, delay: float = 0.0, ignore_ranges: bool = False, length: str = LENGTH_EXACT):
+        handler = type("Handler", (_Handler,), {"ranges": ranges, "delay": delay, "ignore_ranges": ignore_ranges, "length": length})
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=directory))
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
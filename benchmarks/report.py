@@ -0,0 +1,72 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """已排序数据的分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize(latencies_ms: list, elapsed: float, errors: int = 0) -> dict:
+    """
+    汇总一组请求的吞吐和延迟分布
+
+    Args:
+        latencies_ms: 每个请求的耗时（毫秒）
+        elapsed: 整体耗时（秒）
+        errors: 失败的请求数
+
+    Returns:
+        summary: requests / errors / throughput_rps / mean_ms / p50_ms / p95_ms / p99_ms / max_ms
+    """
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0,
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0,
+    }
+
+def best_of(fn, repeat: int) -> float:
+    """执行repeat次，返回最短耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def environment() -> dict:
+    """记录结果对应的代码版本和运行环境，便于跨提交对比"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def write_json(result: dict, path: str = None):
+    """输出结果：指定path时写入文件，否则打印到标准输出"""
+    content = json.dumps(result, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content + "\n")
+    else:
+        print(content)
@@ -0,0 +1,118 @@
+import threading
+import time
+import numpy as np
+
+
+class StubModel:
+    """模拟AutoModel的桩模型，不依赖funasr/torch
+    功能：
+    1. generate接口与AutoModel一致，支持单个输入和列表输入
+    2. 每次调用耗时 = fixed_ms + per_item_ms * 输入个数 + per_second_ms * 音频秒数，
+       用来模拟批处理摊薄固定开销、推理耗时随音频时长增长
+    3. 同一时刻只允许一个generate执行，模拟单个模型实例占满CPU；busy=True时空转CPU而不是sleep
+    """
+
+    def __init__(self, fixed_ms: float = 40.0, per_item_ms: float = 5.0, per_second_ms: float = 0.0,
+                 busy: bool = False, text: str = "多 谢 请 入 席 吧", sample_rate: int = 16000):
+        self.fixed_ms = fixed_ms
+        self.per_item_ms = per_item_ms
+        self.per_second_ms = per_second_ms
+        self.busy = busy
+        self.text = text
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, input, **kwargs):
+        inputs = input if isinstance(input, list) else [input]
+        seconds = sum(len(item) / self.sample_rate for item in inputs if isinstance(item, np.ndarray))
+        with self._lock:
+            self.calls += 1
+            self._work((self.fixed_ms + self.per_item_ms * len(inputs) + self.per_second_ms * seconds) / 1000)
+        return [self._result(i, item) for i, item in enumerate(inputs)]
+
+    def _work(self, seconds: float):
+        if not self.busy:
+            time.sleep(seconds)
+            return
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def _result(self, index, item):
+        words = self.text.split()
+        # 音频数组输入时，时间戳均匀分布在整段音频上
+        span = len(item) * 1000 // self.sample_rate if isinstance(item, np.ndarray) else 300 * len(words)
+        step = max(span // max(len(words), 1), 1)
+        timestamps = [[i * step, i * step + step * 2 // 3] for i in range(len(words))]
+        return {"key": f"stub_{index}", "text": self.text, "timestamp": timestamps}
+
+
+class StubStreamingModel:
+    """模拟paraformer-zh-streaming的桩模型
+    功能：
+    1. generate接口与流式AutoModel一致：每次输入一个音频块和连接自己的cache，is_final时清空cache
+    2. 块中有语音（10ms帧平均幅度高于threshold）时按chars_per_second输出字，跨块累计，不足一个字的部分留到下一块
+    3. 每次调用耗时 = fixed_ms + per_second_ms * 块时长，同一时刻只允许一个generate执行
+    """
+
+    def __init__(self, fixed_ms: float = 5.0, per_second_ms: float = 20.0, chars_per_second: float = 4.0,
+                 threshold: float = 0.01, text: str = "多谢请入席吧曹操谢座列位", sample_rate: int = 16000):
+        self.fixed_ms = fixed_ms
+        self.per_second_ms = per_second_ms
+        self.chars_per_second = chars_per_second
+        self.threshold = threshold
+        self.text = text
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+
+    def generate(self, input, cache: dict = None, is_final: bool = False, **kwargs):
+        cache = cache if cache is not None else {}
+        frame = self.sample_rate // 100
+        frames = len(input) // frame
+        voiced = int((np.abs(input[:frames * frame]).reshape(frames, frame).mean(axis=1) > self.threshold).sum())
+
+        with self._lock:
+            time.sleep((self.fixed_ms + self.per_second_ms * len(input) / self.sample_rate) / 1000)
+
+        cache["voiced_ms"] = cache.get("voiced_ms", 0) + voiced * 10
+        total = int(cache["voiced_ms"] * self.chars_per_second / 1000)
+        if is_final and cache["voiced_ms"] and total == cache.get("emitted", 0):
+            total += 1
+        emitted = cache.get("emitted", 0)
+        chars = [self.text[i % len(self.text)] for i in range(emitted, total)]
+        cache["emitted"] = total
+        # 语音结束（块中没有语音）后下一段语音重新计数
+        if not voiced:
+            cache["voiced_ms"] = cache["emitted"] = 0
+        if is_final:
+            cache.clear()
+        return [{"key": "stub_streaming", "text": " ".join(chars)}]
+
+
+class StubVadModel:
+    """模拟fsmn-vad的桩模型：按10ms帧能量判断语音，返回[[start_ms, end_ms], ...]"""
+
+    def __init__(self, threshold: float = 0.01, min_silence_ms: int = 300, sample_rate: int = 16000):
+        self.threshold = threshold
+        self.min_silence_ms = min_silence_ms
+        self.sample_rate = sample_rate
+
+    def generate(self, input, **kwargs):
+        frame = self.sample_rate // 100
+        frames = len(input) // frame
+        energy = np.abs(input[:frames * frame].reshape(frames, frame)).mean(axis=1)
+        voiced = energy > self.threshold
+
+        segments = []
+        silence = 0
+        for i, v in enumerate(voiced):
+            if v:
+                if segments and silence * 10 < self.min_silence_ms and segments[-1][1] == (i - silence) * 10:
+                    segments[-1][1] = (i + 1) * 10
+                else:
+                    segments.append([i * 10, (i + 1) * 10])
+                silence = 0
+            else:
+                silence += 1
+        return [{"key": "vad", "value": segments}]
@@ -0,0 +1,61 @@
+import wave
+import numpy as np
+
+
+def speech_like(seconds: float, sample_rate: int = 16000, speech_ms: tuple = (800, 4000), silence_ms: tuple = (200, 1500), seed: int = 0) -> np.ndarray:
+    """
+    生成类语音的合成音频：带包络的噪声片段与静音交替
+
+    Args:
+        seconds: 音频时长（秒）
+        sample_rate: 采样率
+        speech_ms: 语音片段时长范围（毫秒）
+        silence_ms: 静音片段时长范围（毫秒）
+        seed: 随机种子
+
+    Returns:
+        samples: float32音频数组
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    samples = np.zeros(total, dtype=np.float32)
+
+    pos = 0
+    while pos < total:
+        pos += int(rng.integers(*silence_ms) * sample_rate / 1000)
+        length = min(int(rng.integers(*speech_ms) * sample_rate / 1000), total - pos)
+        if length <= 0:
+            break
+        envelope = np.sin(np.linspace(0, np.pi, length)) * 0.3
+        samples[pos:pos + length] = (rng.standard_normal(length) * envelope).astype(np.float32)
+        pos += length
+    return samples
+
+def transcript(tokens: int, seed: int = 0, gap_ratio: float = 0.1) -> tuple:
+    """
+    生成模拟的识别结果：以空格分隔的中文单字和对应的时间戳，约gap_ratio比例的词之后有超过断句阈值的停顿
+
+    Returns:
+        (text, timestamps)
+    """
+    rng = np.random.default_rng(seed)
+    chars = "多谢请入席吧曹操谢座列位欢迎大家来体验语音识别模型"
+    words = [chars[i] for i in rng.integers(0, len(chars), tokens)]
+
+    timestamps = []
+    pos = int(rng.integers(0, 3000))
+    for _ in range(tokens):
+        duration = int(rng.integers(60, 400))
+        timestamps.append([pos, pos + duration])
+        gap = int(rng.integers(300, 2000)) if rng.random() < gap_ratio else int(rng.integers(0, 250))
+        pos += duration + gap
+    return " ".join(words), timestamps
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = 16000):
+    """把float32音频写为16位PCM的WAV文件（只用标准库）"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
@@ -0,0 +1,92 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+
+class BulkPipeline:
+    """批量识别流水线（下载和识别重叠执行）
+    功能：
+    1. 下载线程池（download_concurrency个线程）提前下载后面的音频，同时识别线程池处理已经下载完成的音频
+    2. 最多prefetch个音频处于下载中或已下载待识别状态，限制临时文件和内存占用
+    3. 每一项按完成顺序返回 (序号, 结果, 异常)，某一项失败不影响其它项
+    4. 调用方提前停止迭代（例如客户端断开）时不再开始新的下载和识别，已下载的资源照常清理
+    """
+
+    def __init__(self, fetch, process, download_concurrency: int = 4, recognize_concurrency: int = 2, prefetch: int = 8):
+        """
+        Args:
+            fetch: fetch(item) -> 上下文管理器，在下载线程中进入（例如service.use_audio），识别完成后退出
+            process: process(item, resource) -> 结果，在识别线程中执行
+            download_concurrency: 同时下载的数量
+            recognize_concurrency: 同时识别的数量
+            prefetch: 下载中和已下载待识别的数量上限（不小于download_concurrency）
+        """
+        self.fetch = fetch
+        self.process = process
+        self.download_concurrency = max(1, download_concurrency)
+        self.recognize_concurrency = max(1, recognize_concurrency)
+        self.prefetch = max(prefetch, self.download_concurrency)
+
+    def run(self, items: list):
+        """
+        执行流水线
+
+        Args:
+            items: 输入列表
+
+        Yields:
+            (index, result, error): 按完成顺序，成功时error为None，失败时result为None
+        """
+        results = queue.Queue()
+        slots = threading.BoundedSemaphore(self.prefetch)
+        stopped = threading.Event()
+        downloader = ThreadPoolExecutor(max_workers=self.download_concurrency, thread_name_prefix="bulk-download")
+        recognizer = ThreadPoolExecutor(max_workers=self.recognize_concurrency, thread_name_prefix="bulk-recognize")
+
+        def download(index, item):
+            # 占用一个预取位置，识别完成（或失败）后归还
+            slots.acquire()
+            if stopped.is_set():
+                slots.release()
+                return
+            stack = ExitStack()
+            try:
+                resource = stack.enter_context(self.fetch(item))
+            except Exception as e:
+                stack.close()
+                slots.release()
+                results.put((index, None, e))
+                return
+            try:
+                recognizer.submit(recognize, index, item, stack, resource)
+            except RuntimeError:
+                # 迭代已经停止，识别线程池已关闭
+                stack.close()
+                slots.release()
+
+        def recognize(index, item, stack, resource):
+            try:
+                if stopped.is_set():
+                    return
+                result = self.process(item, resource)
+            except Exception as e:
+                results.put((index, None, e))
+            else:
+                results.put((index, result, None))
+            finally:
+                try:
+                    stack.close()
+                finally:
+                    slots.release()
+
+        try:
+            for index, item in enumerate(items):
+                downloader.submit(download, index, item)
+            for _ in range(len(items)):
+                yield results.get()
+        finally:
+            stopped.set()
+            # 不等待剩余的任务：未开始的下载直接返回，已下载的音频由识别任务清理
+            downloader.shutdown(wait=False)
+            recognizer.shutdown(wait=False)
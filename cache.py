@@ -0,0 +1,186 @@
+import collections
+import json
+import os
+import threading
+from logger import logger
+
+
+class ResultCache:
+    """ASR识别结果缓存（按音频内容寻址）
+    功能：
+    1. 一级缓存：内存LRU，按条目数淘汰
+    2. 二级缓存：磁盘JSON文件，按总字节数淘汰最久未访问的条目
+    3. 记录命中/未命中次数
+    """
+
+    def __init__(self, disk_dir: str, memory_items: int = 1024, disk_max_bytes: int = 512*1024*1024):
+        """
+        Args:
+            disk_dir: 磁盘缓存目录
+            memory_items: 内存缓存最多条目数，0表示不使用内存缓存
+            disk_max_bytes: 磁盘缓存最大字节数，0表示不使用磁盘缓存
+        """
+        self.disk_dir = disk_dir
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory = collections.OrderedDict()
+        # 磁盘条目索引：key -> 文件大小，按访问先后排列
+        self._disk = collections.OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._evictions = 0
+
+        if self.disk_max_bytes > 0:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, key: str):
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键（音频内容哈希）
+
+        Returns:
+            (text, timestamps)，未命中返回None
+        """
+        # 1. 查内存
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._hits_memory += 1
+                return value
+            on_disk = key in self._disk
+
+        # 2. 查磁盘，命中后回填内存
+        if on_disk:
+            value = self._read_disk(key)
+            if value is not None:
+                with self._lock:
+                    self._hits_disk += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                self._put_memory(key, value)
+                return value
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, text: str, timestamps: list):
+        """写入缓存"""
+        value = (text, timestamps)
+        self._put_memory(key, value)
+        if self.disk_max_bytes > 0:
+            self._write_disk(key, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits_memory + self._hits_disk + self._misses
+            return {
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": round((self._hits_memory + self._hits_disk) / lookups, 4) if lookups else 0,
+                "evictions": self._evictions,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _put_memory(self, key: str, value: tuple):
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["text"], data["timestamp"]
+        except Exception as e:
+            logger.warning(f"Read cache failed, key: {key}, error: {str(e)}")
+            self._remove_disk(key)
+            return None
+
+    def _write_disk(self, key: str, value: tuple):
+        text, timestamps = value
+        data = json.dumps({"text": text, "timestamp": timestamps}, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.disk_max_bytes:
+            return
+
+        # 先写临时文件再改名，避免并发读到不完整的文件
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Write cache failed, key: {key}, error: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            evicted = self._evict_disk()
+
+        for old_key in evicted:
+            self._unlink(old_key)
+
+    def _evict_disk(self) -> list:
+        """按LRU淘汰磁盘条目直到总大小不超过上限（调用方需持有锁），返回被淘汰的键"""
+        evicted = []
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._evictions += 1
+            evicted.append(old_key)
+        return evicted
+
+    def _remove_disk(self, key: str):
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+        self._unlink(key)
+
+    def _unlink(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _load_disk_index(self):
+        """启动时扫描磁盘缓存目录，按修改时间重建LRU索引"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+        for old_key in self._evict_disk():
+            self._unlink(old_key)
+        logger.info(f"Result cache loaded, disk_items: {len(self._disk)}, disk_bytes: {self._disk_bytes}")
@@ -7,5 +7,155 @@ TEMP_DIR = os.path.join(os.path.dirname(__file__), "temp")
 VIDEO_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output", "video")
 SRT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output", "srt")
 
+# 存储管理：输出文件（字幕、视频）保留时间（秒，从生成开始，0不过期）、输出文件总大小上限（字节，0不限制，超过时按最近访问时间删除最旧的文件）、
+# 临时文件保留时间（秒，请求结束时已删除，这里清理进程崩溃等遗留的文件，应大于最长的请求处理时间）、后台清理间隔（秒，0不清理）、
+# 输出文件分片子目录名的长度（十六进制字符数，2即256个子目录，0不分片）
+OUTPUT_TTL = int(os.getenv("OUTPUT_TTL", str(7*86400)))
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", str(10*1024*1024*1024)))
+TEMP_FILE_TTL = int(os.getenv("TEMP_FILE_TTL", "3600"))
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "300"))
+OUTPUT_SHARD_CHARS = int(os.getenv("OUTPUT_SHARD_CHARS", "2"))
+
+# ffmpeg可执行文件（镜像中位于/app/bin，已加入PATH）
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
 # 将容器内的文件路径转成一个下载路径，执行替换操作，即将/app/ -> https://autosubrt.jcaigc.cn/
 DOWNLOAD_URL = os.getenv("DOWNLOAD_URL", "https://autosubrt.jcaigc.cn/")
+
+# 批量推理配置：BATCH_MAX_SIZE<=1 时关闭批处理（默认），每个请求单独调用model.generate；设为大于1（如8）时启用动态批处理
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1"))
+# 组批等待窗口（毫秒），第一个请求入队后最多等待这么久就开始推理
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "30"))
+
+# 准入控制（同步识别接口，批量接口整体占用一个执行位置；异步任务由JOB_WORKERS和JOB_MAX_PENDING限制，不经过准入控制）：
+# 同时执行的请求数（0不限制）、排队请求数上限、每个客户端进行中的请求数上限（0不限制）、
+# 区分客户端的请求头（未携带时按客户端IP）、未指定X-Request-Timeout时的默认截止时间（秒，0没有截止时间）、Retry-After上限（秒）
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_PER_CLIENT = int(os.getenv("ADMISSION_PER_CLIENT", "0"))
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "X-Client-Id")
+ADMISSION_DEFAULT_TIMEOUT = float(os.getenv("ADMISSION_DEFAULT_TIMEOUT", "0"))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "60"))
+
+# 推理调度（批处理队列，只在启用批处理时生效）：策略fifo（先来先服务，默认）或sjf（短音频优先，按等待时间老化）、
+# 老化系数（每等待1秒抵消的音频时长，秒）、是否按接口（text/srt/transcript/embed）分通道轮流调度
+SCHEDULER_POLICY = os.getenv("SCHEDULER_POLICY", "fifo")
+SCHEDULER_AGING = float(os.getenv("SCHEDULER_AGING", "1.0"))
+SCHEDULER_LANES = os.getenv("SCHEDULER_LANES", "false").lower() in ("1", "true", "yes")
+
+# 异步任务配置：后台工作线程数、最多排队任务数、已完成任务在内存中保留的时间（秒）
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+# 任务存储：memory（进程内，重启丢失）或sqlite（本机SQLite数据库，多个服务进程共用，进程崩溃后任务由其它进程接管）、
+# 数据库文件路径、租约时长和心跳间隔（秒）、没有任务时查询数据库的间隔（秒）、任务最多执行的次数
+JOB_STORE = os.getenv("JOB_STORE", "memory")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "jobs.db"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# 批量识别：每个请求最多的音频数、同时下载数、同时识别数、下载中和已下载待识别的音频数上限
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+BULK_DOWNLOAD_CONCURRENCY = int(os.getenv("BULK_DOWNLOAD_CONCURRENCY", "4"))
+BULK_RECOGNIZE_CONCURRENCY = int(os.getenv("BULK_RECOGNIZE_CONCURRENCY", "2"))
+BULK_PREFETCH = int(os.getenv("BULK_PREFETCH", "8"))
+
+# 识别结果缓存（按音频内容SHA-256寻址）：内存LRU条目数、磁盘缓存目录和容量上限（字节），设为0关闭对应层
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "1024"))
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache"))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(512*1024*1024)))
+
+# 相同请求合并：follower等待leader结果的超时时间（秒）
+COALESCE_WAIT_TIMEOUT = float(os.getenv("COALESCE_WAIT_TIMEOUT", "600"))
+
+# 下载器配置：连接池大小、每个host的最大并发下载数（0不限制）、
+# 并行分段下载的文件大小阈值（字节）和分段数（<2关闭分段下载）
+DOWNLOAD_POOL_SIZE = int(os.getenv("DOWNLOAD_POOL_SIZE", "32"))
+DOWNLOAD_PER_HOST_LIMIT = int(os.getenv("DOWNLOAD_PER_HOST_LIMIT", "8"))
+DOWNLOAD_RANGE_THRESHOLD = int(os.getenv("DOWNLOAD_RANGE_THRESHOLD", str(8*1024*1024)))
+DOWNLOAD_RANGE_PARTS = int(os.getenv("DOWNLOAD_RANGE_PARTS", "4"))
+
+# 内存解码：不超过该大小（字节）的音频只保存在内存中，解码为16kHz单声道数组直接送入模型；
+# 超过的音频写入TEMP_DIR再由模型读取，设为0时总是写入磁盘
+AUDIO_INMEMORY_MAX_BYTES = int(os.getenv("AUDIO_INMEMORY_MAX_BYTES", str(8*1024*1024)))
+
+# 长音频流水线：VAD切分语音片段后多进程并行识别。识别进程数（0关闭）、每个进程的torch线程数、
+# 使用流水线的最短音频时长（秒）、合并后单个片段的最大时长（秒）
+LONG_AUDIO_WORKERS = int(os.getenv("LONG_AUDIO_WORKERS", "0"))
+LONG_AUDIO_WORKER_THREADS = int(os.getenv("LONG_AUDIO_WORKER_THREADS", "1"))
+LONG_AUDIO_MIN_SECONDS = float(os.getenv("LONG_AUDIO_MIN_SECONDS", "60"))
+LONG_AUDIO_MAX_SEGMENT_SECONDS = int(os.getenv("LONG_AUDIO_MAX_SEGMENT_SECONDS", "30"))
+
+# 模型加载：识别模型和VAD模型的本地快照目录（固定版本，启动时不访问模型仓库），为空时按模型名称加载
+MODEL_DIR = os.getenv("MODEL_DIR", "")
+VAD_MODEL_DIR = os.getenv("VAD_MODEL_DIR", "")
+# 识别模型推理后端：torch（PyTorch fp32）、int8（PyTorch动态int8量化）、onnx（ONNX Runtime，需要funasr-onnx和onnxruntime）
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# ONNX后端：已导出的模型目录（为空时启动时从模型导出）、是否使用int8量化模型、算子内线程数（0使用CPU核数）
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "false").lower() in ("1", "true", "yes")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+# 推理运行时：每次推理的torch算子内线程数（0使用torch默认值，即全部CPU核）、算子间线程数（0使用默认值）、
+# 服务进程内同时执行推理的槽位数（0不限制，并发请求各自调用模型、互相抢占CPU）、
+# 槽位绑定的CPU（空不绑定，auto按槽位数平均分配可用CPU，或按槽位用分号分隔的CPU列表如"0-3;4-7"，启用副本池时绑定到副本进程）、
+# autotune生成的配置文件（设置后代替以上各项，见 python -m benchmarks.autotune）
+INFERENCE_INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0"))
+INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", "0"))
+INFERENCE_SLOTS = int(os.getenv("INFERENCE_SLOTS", "0"))
+INFERENCE_AFFINITY = os.getenv("INFERENCE_AFFINITY", "")
+RUNTIME_PROFILE = os.getenv("RUNTIME_PROFILE", "")
+# 启动：是否在后台线程加载模型（进程立即响应存活检查，/ready返回加载进度；启用MODEL_REPLICAS或LONG_AUDIO_WORKERS时
+# 需要在其它线程启动之前fork子进程，总是同步加载）、预热音频时长（秒，0关闭）、
+# 模型未就绪时识别请求最多等待的时间（秒）
+STARTUP_BACKGROUND = os.getenv("STARTUP_BACKGROUND", "true").lower() in ("1", "true", "yes")
+WARMUP_SECONDS = float(os.getenv("WARMUP_SECONDS", "1"))
+MODEL_READY_WAIT_SECONDS = float(os.getenv("MODEL_READY_WAIT_SECONDS", "30"))
+
+# 模型副本池：父进程加载一次模型后fork出多个推理进程（权重写时复制共享），请求分发给负载最低的副本。
+# 副本数（0关闭，在服务进程内推理）、每个副本的torch线程数、健康检查间隔和超时（秒）、
+# 单个推理请求的最长执行时间（秒，超过时判定副本卡住，终止并重启，0不限制）
+MODEL_REPLICAS = int(os.getenv("MODEL_REPLICAS", "0"))
+MODEL_REPLICA_THREADS = int(os.getenv("MODEL_REPLICA_THREADS", "1"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_HEALTH_TIMEOUT = float(os.getenv("REPLICA_HEALTH_TIMEOUT", "10"))
+REPLICA_REQUEST_TIMEOUT = float(os.getenv("REPLICA_REQUEST_TIMEOUT", "600"))
+
+# 实时识别（WebSocket，流式模型paraformer-zh-streaming）：开关、流式模型本地快照目录（为空时按模型名称加载）、
+# 识别线程数、最大连接数（0不限制）、每个块的帧数（60ms/帧）、每个连接待识别音频的上限（秒）、单条字幕的最大时长（秒）
+LIVE_ASR_ENABLED = os.getenv("LIVE_ASR_ENABLED", "false").lower() in ("1", "true", "yes")
+LIVE_MODEL_DIR = os.getenv("LIVE_MODEL_DIR", "")
+LIVE_WORKERS = int(os.getenv("LIVE_WORKERS", "1"))
+LIVE_MAX_CONNECTIONS = int(os.getenv("LIVE_MAX_CONNECTIONS", "8"))
+LIVE_CHUNK_FRAMES = int(os.getenv("LIVE_CHUNK_FRAMES", "10"))
+LIVE_MAX_BUFFER_SECONDS = float(os.getenv("LIVE_MAX_BUFFER_SECONDS", "10"))
+LIVE_MAX_CUE_SECONDS = float(os.getenv("LIVE_MAX_CUE_SECONDS", "15"))
+
+# 识别结果（transcript）在内存中保留的条目数上限和时间（秒）
+TRANSCRIPT_MAX_ITEMS = int(os.getenv("TRANSCRIPT_MAX_ITEMS", "1000"))
+TRANSCRIPT_TTL = int(os.getenv("TRANSCRIPT_TTL", "86400"))
+
+# 视频嵌入字幕：视频文件大小上限（字节）、下载超时（秒）、硬字幕编码预设和线程数（0由ffmpeg自动选择）
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", str(500*1024*1024)))
+VIDEO_DOWNLOAD_TIMEOUT = float(os.getenv("VIDEO_DOWNLOAD_TIMEOUT", "600"))
+EMBED_BURN_PRESET = os.getenv("EMBED_BURN_PRESET", "veryfast")
+EMBED_BURN_THREADS = int(os.getenv("EMBED_BURN_THREADS", "0"))
+
+# 视频边下载边提取音轨并分块识别（识别与下载重叠）：开关、分块时长（秒）、分块识别线程数
+EMBED_STREAM_DEMUX = os.getenv("EMBED_STREAM_DEMUX", "true").lower() in ("1", "true", "yes")
+EMBED_STREAM_CHUNK_SECONDS = float(os.getenv("EMBED_STREAM_CHUNK_SECONDS", "30"))
+EMBED_STREAM_WORKERS = int(os.getenv("EMBED_STREAM_WORKERS", "4"))
+
+# /asr/srt 请求 inline=true 时，字幕内容不超过该大小（字节）直接在响应中返回（不写文件），超过时仍写文件返回URL
+SRT_INLINE_MAX_BYTES = int(os.getenv("SRT_INLINE_MAX_BYTES", str(1024*1024)))
+# 输出文件下载接口（/openapi/v1/files/{srt|video}/{文件名}）：是否生成指向该接口的URL（否则将/app/替换为DOWNLOAD_URL，由外部静态服务器提供）、
+# 客户端/CDN缓存时间（秒）、gzip压缩的文件大小范围（字节，只压缩字幕等文本文件）、内存中缓存的gzip压缩结果总大小（字节）
+FILES_ROUTE_ENABLED = os.getenv("FILES_ROUTE_ENABLED", "false").lower() in ("1", "true", "yes")
+FILES_CACHE_MAX_AGE = int(os.getenv("FILES_CACHE_MAX_AGE", "86400"))
+FILES_GZIP_MIN_BYTES = int(os.getenv("FILES_GZIP_MIN_BYTES", "512"))
+FILES_GZIP_MAX_BYTES = int(os.getenv("FILES_GZIP_MAX_BYTES", str(16*1024*1024)))
+FILES_GZIP_CACHE_BYTES = int(os.getenv("FILES_GZIP_CACHE_BYTES", str(64*1024*1024)))
+
+# 是否在响应头Server-Timing中返回每个请求的各阶段耗时
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,357 @@
+import collections
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from logger import logger
+from exceptions import CustomException, CustomError
+
+
+@dataclass
+class DownloadResult:
+    """下载结果，内容保存在磁盘（path）或内存（data）中
+
+    合并下载时多个请求共享同一个结果，每个使用者持有一个引用（acquire），最后一个释放（release）的负责删除临时文件
+    """
+    path: str | None           # 完整的文件路径，内容在内存中时为None
+    sha256: str                # 文件内容的SHA-256（十六进制）
+    size: int                  # 文件大小（字节）
+    data: bytes | None = None  # 文件内容，保存在磁盘时为None
+    content_type: str = ""     # 源站返回的Content-Type
+    refs: int = field(default=0, repr=False, compare=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def acquire(self, count: int = 1):
+        """增加count个使用者的引用"""
+        with self.lock:
+            self.refs += count
+
+    def release(self) -> bool:
+        """释放一个引用，返回是否是最后一个（调用方负责删除临时文件）"""
+        with self.lock:
+            self.refs -= 1
+            return self.refs <= 0
+
+
+# 下载请求头
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
+    'Referer': 'https://www.jcaigc.cn/',
+    'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+}
+
+# 分块大小范围：按文件大小自适应，未知大小时使用默认值
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class Downloader:
+    """连接池复用的文件下载器
+    功能：
+    1. 共享keep-alive连接池，避免每次下载重新建立连接
+    2. 按GET响应头中的Content-Length判断大小，超限的文件不读取响应体直接拒绝（不额外发送HEAD请求）
+    3. 按文件大小自适应分块；源站支持Range时，大文件可并行分段下载
+    4. 按host限制并发下载数，记录下载吞吐
+    """
+
+    def __init__(self, pool_size: int = 32, per_host_limit: int = 8, range_threshold: int = 8*1024*1024, range_parts: int = 4, session: requests.Session = None):
+        """
+        Args:
+            pool_size: 连接池大小（每个host保持的最大连接数）
+            per_host_limit: 每个host同时进行的最大下载数，0表示不限制
+            range_threshold: 文件大小达到该值且源站支持Range时使用并行分段下载
+            range_parts: 并行分段数，小于2表示不使用分段下载
+            session: 自定义requests.Session，默认新建
+        """
+        self.per_host_limit = per_host_limit
+        self.range_threshold = range_threshold
+        self.range_parts = range_parts
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(HEADERS)
+
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._downloads = 0
+        self._failures = 0
+        self._rejected = 0
+        self._range_downloads = 0
+        self._bytes = 0
+        self._seconds = 0.0
+        self._recent = collections.deque(maxlen=100)
+
+    def download(self, url: str, save_path: str, limit: int = 30*1024*1024, timeout: float = 180, memory_limit: int = 0, on_chunk=None) -> DownloadResult:
+        """
+        下载文件，根据Content-Type补全扩展名
+
+        Args:
+            url: 文件的URL地址
+            save_path: 保存路径（不含扩展名）
+            limit: 文件大小限制（字节）
+            timeout: 整体下载超时时间（秒）
+            memory_limit: 不超过该大小（字节）的文件只保存在内存中，0表示总是写入磁盘
+            on_chunk: 按文件顺序接收每个数据块的回调 on_chunk(chunk)，设置后不使用并行分段下载
+
+        Returns:
+            DownloadResult: 文件路径、SHA-256和文件大小
+
+        Raises:
+            CustomException: 文件超出大小限制（FILE_SIZE_LIMIT_EXCEEDED）或下载失败（DOWNLOAD_FILE_FAILED）
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        path = save_path
+
+        try:
+            with self._host_slot(url):
+                # 1. 可能使用并行分段下载时，从GET响应头获取大小和Range支持情况（不额外发送HEAD请求）
+                result = response = None
+                if on_chunk is None and self._may_use_ranges(limit, memory_limit):
+                    response = self._get(url, deadline)
+                    size, content_type, accept_ranges = _response_info(response)
+                    if accept_ranges and size and size > memory_limit and size >= self.range_threshold:
+                        # 大文件改为并行分段下载，关闭这个响应（超限时不读取响应体直接拒绝）
+                        response.close()
+                        response = None
+                        self._check_limit(url, size, limit)
+                        extension = mimetypes.guess_extension(content_type) if content_type else None
+                        if extension:
+                            path = save_path + extension
+                        result = self._download_ranges(url, path, size, content_type, deadline)
+
+                # 2. 其它情况流式下载（继续读取已经打开的响应），源站实际不支持Range时同样退回流式下载
+                if result is None:
+                    result = self._download_stream(url, save_path, limit, deadline, memory_limit, on_chunk, response=response)
+        except CustomException as e:
+            self._record_failure(e.err == CustomError.FILE_SIZE_LIMIT_EXCEEDED)
+            raise
+        except Exception as e:
+            self._record_failure(False)
+            for p in {path, save_path}:
+                if os.path.exists(p):
+                    os.remove(p)
+            logger.warning(f"Download failed, url: {url}, error: {str(e)}")
+            raise CustomException(CustomError.DOWNLOAD_FILE_FAILED)
+
+        elapsed = time.monotonic() - started
+        self._record_success(result.size, elapsed)
+        logger.info(f"Download success, url: {url}, save_path: {result.path or '<memory>'}, size: {result.size}, elapsed: {elapsed:.3f}s")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "downloads": self._downloads,
+                "failures": self._failures,
+                "rejected_oversize": self._rejected,
+                "range_downloads": self._range_downloads,
+                "bytes": self._bytes,
+                "avg_throughput_bps": round(self._bytes / self._seconds, 2) if self._seconds else 0,
+                "recent": list(self._recent),
+            }
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取host对应的并发信号量"""
+        if self.per_host_limit <= 0:
+            return _NoopSlot()
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return slot
+
+    def _may_use_ranges(self, limit: int, memory_limit: int) -> bool:
+        """大小限制内的文件是否可能使用并行分段下载（否则不需要提前知道文件大小）"""
+        return self.range_parts > 1 and limit >= self.range_threshold and limit > memory_limit
+
+    def _get(self, url: str, deadline: float) -> requests.Response:
+        return self.session.get(url, stream=True, timeout=max(deadline - time.monotonic(), 1))
+
+    def _check_limit(self, url: str, size: int, limit: int):
+        if size is not None and size > limit:
+            logger.info(f"Download failed, url: {url}, error: File size exceeds the limit of {limit/1024/1024:.2f}MB")
+            raise CustomException(CustomError.FILE_SIZE_LIMIT_EXCEEDED, detail=f"{limit/1024/1024:.2f} MB")
+
+    def _download_stream(self, url: str, save_path: str, limit: int, deadline: float, memory_limit: int = 0, on_chunk=None,
+                         response: requests.Response = None) -> DownloadResult:
+        """单连接流式下载，实时检查大小并计算哈希；不超过memory_limit的内容保留在内存中，超过后写入磁盘
+
+        response为已经发出的GET请求的响应（未读取响应体），None时新建请求
+        """
+        if response is None:
+            response = self._get(url, deadline)
+        try:
+            response.raise_for_status()
+
+            # 1. 响应头中的大小超限时，不读取响应体直接拒绝
+            content_length = response.headers.get('Content-Length')
+            expected = int(content_length) if content_length and content_length.isdigit() else None
+            self._check_limit(url, expected, limit)
+
+            # 2. 根据Content-Type补全扩展名
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+            extension = mimetypes.guess_extension(content_type)
+            path = save_path + extension if extension else save_path
+
+            # 3. 下载文件并实时检查大小，同时计算哈希
+            chunk_size = _chunk_size(expected)
+            downloaded_size = 0
+            digest = hashlib.sha256()
+            buffer = bytearray()
+            f = None
+            try:
+                # 已知大小超过内存上限时直接写磁盘
+                if expected is not None and expected > memory_limit:
+                    f = open(path, 'wb')
+
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    downloaded_size += len(chunk)
+
+                    if f is None and downloaded_size > memory_limit:
+                        # 超出内存上限，把已缓冲的内容落盘后继续写磁盘
+                        f = open(path, 'wb')
+                        f.write(buffer)
+                        buffer = bytearray()
+                    if f is None:
+                        buffer += chunk
+                    else:
+                        f.write(chunk)
+
+                    if downloaded_size > limit:
+                        self._check_limit(url, downloaded_size, limit)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"download exceeded deadline after {downloaded_size} bytes")
+
+                # 4. 验证下载完整性（如果服务器提供了Content-Length且未压缩传输）
+                if expected is not None and not response.headers.get('Content-Encoding') and downloaded_size != expected:
+                    logger.warning(f"Download failed, url: {url}, error: File download incomplete: expected {expected} bytes, actual {downloaded_size} bytes")
+                    raise CustomException(CustomError.DOWNLOAD_FILE_FAILED)
+            except BaseException:
+                if f is not None:
+                    f.close()
+                    os.remove(path)
+                raise
+
+            if f is None:
+                return DownloadResult(path=None, sha256=digest.hexdigest(), size=downloaded_size, data=bytes(buffer), content_type=content_type)
+            f.close()
+            return DownloadResult(path=path, sha256=digest.hexdigest(), size=downloaded_size, content_type=content_type)
+        finally:
+            response.close()
+
+    def _download_ranges(self, url: str, path: str, size: int, content_type: str, deadline: float):
+        """并行分段下载，源站实际不支持Range时返回None由调用方退回单连接下载"""
+        part_size = -(-size // self.range_parts)
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download-range") as pool:
+                supported = all(pool.map(lambda r: self._fetch_range(url, fd, r[0], r[1], deadline), ranges))
+        except BaseException:
+            os.close(fd)
+            os.remove(path)
+            raise
+        os.close(fd)
+
+        if not supported:
+            os.remove(path)
+            logger.info(f"Range request not honored, fallback to single stream, url: {url}")
+            return None
+
+        # 分段写入顺序不确定，完成后顺序读一遍计算哈希（文件刚写入，读取命中页缓存）
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(MAX_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        with self._lock:
+            self._range_downloads += 1
+        return DownloadResult(path=path, sha256=digest.hexdigest(), size=size, content_type=content_type)
+
+    def _fetch_range(self, url: str, fd: int, start: int, end: int, deadline: float) -> bool:
+        """下载[start, end]字节写入文件对应位置，源站未返回206时返回False"""
+        headers = {'Range': f'bytes={start}-{end}', 'Accept-Encoding': 'identity'}
+        with self.session.get(url, headers=headers, stream=True, timeout=max(deadline - time.monotonic(), 1)) as response:
+            if response.status_code != 206:
+                return False
+
+            offset = start
+            for chunk in response.iter_content(chunk_size=_chunk_size(end - start + 1)):
+                if not chunk:
+                    continue
+                if offset + len(chunk) > end + 1:
+                    raise IOError(f"range response overflow: {start}-{end}")
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"range download exceeded deadline: {start}-{end}")
+
+            if offset != end + 1:
+                raise IOError(f"range download incomplete: expected {end + 1 - start} bytes, actual {offset - start} bytes")
+        return True
+
+    def _record_success(self, size: int, elapsed: float):
+        with self._lock:
+            self._downloads += 1
+            self._bytes += size
+            self._seconds += elapsed
+            self._recent.append({
+                "bytes": size,
+                "seconds": round(elapsed, 3),
+                "throughput_bps": round(size / elapsed, 2) if elapsed else 0,
+            })
+
+    def _record_failure(self, rejected: bool):
+        with self._lock:
+            self._failures += 1
+            if rejected:
+                self._rejected += 1
+
+
+class _NoopSlot:
+    """不限制并发时使用的空信号量"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def _response_info(response: requests.Response):
+    """响应头中的文件大小、类型和Range支持情况；压缩传输时Content-Length不是文件大小，按未知处理"""
+    if not response.ok:
+        return None, None, False
+    length = response.headers.get('Content-Length')
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+    accept_ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    if response.headers.get('Content-Encoding'):
+        return None, content_type, False
+    return (int(length) if length and length.isdigit() else None), content_type, accept_ranges
+
+def _chunk_size(expected: int) -> int:
+    """按文件大小选择分块大小：约64块读完，限制在[MIN_CHUNK_SIZE, MAX_CHUNK_SIZE]"""
+    if not expected:
+        return DEFAULT_CHUNK_SIZE
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, expected // 64))
@@ -12,6 +12,20 @@ class CustomError(Enum):
     RECOGNIZE_AUDIO_FAILED = (2001, "识别音频失败", "Failed to recognize audio")
     FILE_SIZE_LIMIT_EXCEEDED = (2002, "文件大小超出限制", "File size exceeds the limit")
     DOWNLOAD_FILE_FAILED = (2003, "下载文件失败", "Download file failed")
+    JOB_NOT_FOUND = (2004, "任务不存在或已过期", "Job not found or expired")
+    JOB_NOT_FINISHED = (2005, "任务尚未完成", "Job not finished")
+    JOB_QUEUE_FULL = (2006, "任务队列已满", "Job queue is full")
+    REQUEST_TIMEOUT = (2007, "等待处理结果超时", "Timed out waiting for result")
+    TRANSCRIPT_NOT_FOUND = (2008, "识别结果不存在或已过期", "Transcript not found or expired")
+    VIDEO_PROCESS_FAILED = (2009, "视频处理失败", "Video processing failed")
+    MODEL_NOT_READY = (2010, "模型尚未就绪", "Model is not ready")
+    SERVICE_OVERLOADED = (2011, "服务繁忙，请稍后重试", "Service is overloaded, please retry later")
+    CLIENT_CONCURRENCY_EXCEEDED = (2012, "客户端并发请求数超出限制", "Too many concurrent requests from this client")
+    DEADLINE_EXCEEDED = (2013, "请求已超过截止时间", "Request deadline exceeded")
+    LIVE_BUFFER_OVERFLOW = (2014, "音频发送速度超过识别速度，缓冲区已满", "Audio is arriving faster than it can be recognized, buffer full")
+    JOB_ABANDONED = (2015, "任务多次执行中断，已放弃", "Job was interrupted too many times and abandoned")
+    OUTPUT_FILE_NOT_FOUND = (2016, "文件不存在或已过期", "File not found or expired")
+    JOB_CANCELLED = (2017, "服务关闭，排队中的任务已取消", "Job cancelled because the service shut down")
 
     # ===== 系统错误码 (9000-9999) =====
     INTERNAL_SERVER_ERROR = (9998, "系统内部错误", "Internal server error")
@@ -33,7 +47,9 @@ class CustomError(Enum):
 # 自定义异常类
 class CustomException(Exception):
     """自定义业务异常类"""
-    def __init__(self, err: CustomError, detail: str = None):
+    def __init__(self, err: CustomError, detail: str = None, headers: dict = None):
         self.err = err
         self.detail = detail
+        # 附加的响应头（如Retry-After）
+        self.headers = headers
         super().__init__(err.cn_message)
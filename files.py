@@ -0,0 +1,269 @@
+import collections
+import gzip
+import hashlib
+import os
+import re
+import threading
+from email.utils import formatdate
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from exceptions import CustomError, CustomException
+from logger import logger
+import config
+import metrics
+import storage
+
+
+# 按扩展名确定的媒体类型，未列出的按二进制文件返回
+MEDIA_TYPES = {
+    ".srt": "application/x-subrip; charset=utf-8",
+    ".vtt": "text/vtt; charset=utf-8",
+    ".ass": "text/x-ssa; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+    ".json": "application/json",
+    ".mp4": "video/mp4",
+    ".mkv": "video/x-matroska",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+}
+# 可以gzip压缩的扩展名（视频已经压缩过）
+COMPRESSIBLE = (".srt", ".vtt", ".ass", ".txt", ".json")
+# 分段读取文件的块大小
+CHUNK_SIZE = 256 * 1024
+# 写入输出文件时保存内容哈希的扩展属性，值为 "<大小>:<修改时间ns>:<SHA-256>"
+DIGEST_XATTR = "user.autosubrt.sha256"
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def download_url(path: str) -> str:
+    """输出目录（含分片子目录）中的文件对应的下载接口URL，不在输出目录中时返回None"""
+    kind = storage.manager.kind_of(path)
+    if kind is None:
+        return None
+    return f"{config.DOWNLOAD_URL.rstrip('/')}/openapi/v1/files/{kind}/{os.path.basename(path)}"
+
+def seal(path: str, data: bytes = None):
+    """
+    输出文件写入完成后计算内容的SHA-256并保存到文件的扩展属性中，下载接口直接用作ETag，不在请求时读取整个文件
+    （未启用FILES_ROUTE_ENABLED或文件系统不支持扩展属性时跳过，下载接口改用大小和修改时间生成ETag）
+
+    Args:
+        path: 输出文件路径
+        data: 刚写入的文件内容，None时读取文件计算
+    """
+    if not config.FILES_ROUTE_ENABLED or not hasattr(os, "setxattr"):
+        return
+    try:
+        if data is not None:
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            sha256 = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+        stat = os.stat(path)
+        os.setxattr(path, DIGEST_XATTR, f"{stat.st_size}:{stat.st_mtime_ns}:{digest}".encode("ascii"))
+    except OSError as e:
+        logger.debug(f"Save output digest failed: {path}, error: {str(e)}")
+
+def serve(request: Request, kind: str, name: str) -> Response:
+    """
+    返回输出文件
+    功能：
+    1. 强ETag为写入时保存的内容SHA-256（见seal，没有保存时为文件大小和修改时间；gzip压缩的表示追加-gzip），
+       If-None-Match命中时返回304，不读取文件
+    2. 客户端接受gzip时压缩字幕等文本文件，压缩结果缓存在内存中（总大小不超过FILES_GZIP_CACHE_BYTES）
+    3. 支持单个区间的Range请求（206），If-Range与ETag不一致或多个区间时返回完整文件，区间无效时返回416
+
+    Args:
+        request: 请求
+        kind: 输出类型（srt / video）
+        name: 文件名
+
+    Raises:
+        CustomException: 文件不存在（或已被清理）
+    """
+    path = _resolve(kind, name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise CustomException(CustomError.OUTPUT_FILE_NOT_FOUND, detail=f"{kind}/{name}")
+    # 记录访问时间，超过存储配额时最近访问的文件最后删除
+    storage.manager.touch(path, stat)
+
+    extension = os.path.splitext(name)[1].lower()
+    media_type = MEDIA_TYPES.get(extension, "application/octet-stream")
+    digest = _digest(path, stat)
+    etag = f'"{digest}"'
+    gzip_etag = f'"{digest}-gzip"'
+    compressible = extension in COMPRESSIBLE and config.FILES_GZIP_MIN_BYTES <= stat.st_size <= config.FILES_GZIP_MAX_BYTES
+    range_header = request.headers.get("range")
+    use_gzip = compressible and range_header is None and _accepts_gzip(request.headers.get("accept-encoding"))
+
+    headers = {
+        "ETag": gzip_etag if use_gzip else etag,
+        "Cache-Control": f"public, max-age={config.FILES_CACHE_MAX_AGE}",
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    }
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+
+    # 1. 条件请求：客户端缓存的任一表示（原文或gzip）都与当前内容一致
+    if _matches(request.headers.get("if-none-match"), (etag, gzip_etag)):
+        metrics.FILE_RESPONSES.labels("not_modified").inc()
+        return Response(status_code=304, headers=headers)
+
+    # 2. 区间请求（只针对未压缩的表示）
+    if range_header is not None and request.headers.get("if-range", etag) == etag:
+        span = _parse_range(range_header, stat.st_size)
+        if span is False:
+            metrics.FILE_RESPONSES.labels("unsatisfiable").inc()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+        if span is not None:
+            start, end = span
+            metrics.FILE_RESPONSES.labels("partial").inc()
+            return StreamingResponse(
+                _read_range(path, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{stat.st_size}", "Content-Length": str(end - start + 1)},
+            )
+
+    # 3. 完整文件
+    if use_gzip:
+        metrics.FILE_RESPONSES.labels("gzip").inc()
+        return Response(content=_gzipped(path, stat), media_type=media_type,
+                        headers={**headers, "Content-Encoding": "gzip"})
+    metrics.FILE_RESPONSES.labels("full").inc()
+    return _FullFileResponse(path, media_type=media_type, headers=headers, stat_result=stat,
+                             filename=name, content_disposition_type="inline")
+
+def _resolve(kind: str, name: str) -> str:
+    """文件类型和文件名对应的路径，只允许输出目录中的文件（不允许路径分隔符和隐藏文件）"""
+    path = None
+    if name and not name.startswith(".") and os.path.basename(name) == name and "\\" not in name:
+        path = storage.manager.locate(kind, name)
+    if path is None:
+        raise CustomException(CustomError.OUTPUT_FILE_NOT_FOUND, detail=f"{kind}/{name}")
+    return path
+
+def _digest(path: str, stat: os.stat_result) -> str:
+    """
+    ETag使用的摘要：写入时保存的内容SHA-256（大小和修改时间与保存时一致才使用）；
+    没有保存时使用大小和修改时间（输出文件写入后不再修改，同样可以唯一标识内容），不在请求时计算哈希
+    """
+    try:
+        size, mtime_ns, digest = os.getxattr(path, DIGEST_XATTR).decode("ascii").split(":")
+        if int(size) == stat.st_size and int(mtime_ns) == stat.st_mtime_ns:
+            return digest
+    except (AttributeError, OSError, ValueError):
+        pass
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class _GzipCache:
+    """gzip压缩结果的LRU缓存，按压缩后的总字节数限制大小（单个结果超过上限时不缓存）"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+class _FullFileResponse(FileResponse):
+    """完整文件响应：Range请求已经在serve中处理，这里忽略Range请求头（FileResponse会按多个区间返回multipart或对无效格式返回400）"""
+
+    async def __call__(self, scope, receive, send):
+        scope = {**scope, "headers": [(key, value) for key, value in scope["headers"] if key != b"range"]}
+        await super().__call__(scope, receive, send)
+
+
+_gzip_cache = _GzipCache(config.FILES_GZIP_CACHE_BYTES)
+
+def _gzipped(path: str, stat: os.stat_result) -> bytes:
+    """gzip压缩后的文件内容（按路径、大小和修改时间缓存）；mtime固定为0，相同内容的压缩结果相同"""
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    body = _gzip_cache.get(key)
+    if body is None:
+        with open(path, "rb") as f:
+            body = gzip.compress(f.read(), compresslevel=6, mtime=0)
+        _gzip_cache.put(key, body)
+    return body
+
+def _read_range(path: str, start: int, end: int):
+    """分块读取[start, end]区间"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _parse_range(header: str, size: int):
+    """
+    解析Range请求头
+
+    Returns:
+        span: (start, end)（包含end）；多个区间或格式不支持时返回None（按完整文件返回）；区间无法满足时返回False
+    """
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # 最后N个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+def _matches(if_none_match: str, etags: tuple) -> bool:
+    """If-None-Match是否命中（弱比较，*匹配任意存在的文件）"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") in etags:
+            return True
+    return False
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding是否接受gzip（q=0表示不接受）"""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
@@ -1,83 +1,63 @@
 import os
-import requests
-import mimetypes
 import datetime
 import uuid
-from logger import logger
-from exceptions import CustomException, CustomError
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from downloader import Downloader, DownloadResult
+import config
+
+
+# 共享的下载器（连接池复用）
+downloader = Downloader(
+    pool_size=config.DOWNLOAD_POOL_SIZE,
+    per_host_limit=config.DOWNLOAD_PER_HOST_LIMIT,
+    range_threshold=config.DOWNLOAD_RANGE_THRESHOLD,
+    range_parts=config.DOWNLOAD_RANGE_PARTS,
+)
 
 
 def download(url, save_dir, limit=30*1024*1024, timeout=180) -> str:
     """
-    下载文件并根据Content-Type判断文件类型
+    下载文件并根据Content-Type判断文件类型，返回文件路径
+
+    参数说明见download_file
+    """
+    return download_file(url, save_dir, limit=limit, timeout=timeout).path
+
+def download_file(url, save_dir, limit=30*1024*1024, timeout=180, memory_limit=0, on_chunk=None) -> DownloadResult:
+    """
+    下载文件并根据Content-Type判断文件类型，下载过程中同时计算内容的SHA-256
     
     Args:
         url: 文件的URL地址
         save_dir: 文件保存目录
-        filename: 文件名
-        limit: 文件大小限制（字节），默认512MB
+        limit: 文件大小限制（字节），默认30MB
         timeout: 整体下载超时时间（秒），默认3分钟
+        memory_limit: 不超过该大小（字节）的文件只保存在内存中（path为None），默认0总是写入磁盘
+        on_chunk: 边下载边处理的回调 on_chunk(chunk)，按文件顺序接收每个数据块，可选
     
     Returns:
-        完整的文件路径
+        DownloadResult: 文件路径（或内存中的内容）、SHA-256和文件大小
 
     Raises:
         CustomException: 自定义异常
     """
-    # 1. 生成文件名
+    # 1. 生成文件名（扩展名由下载器根据Content-Type补全）
     save_path = os.path.join(save_dir, gen_unique_id())
 
-    try:
-        # 1. 发送GET请求下载文件
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
-            'Referer': 'https://www.jcaigc.cn/',
-            'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
-        }
-        response = requests.get(url, stream=True, timeout=timeout, headers=headers)
-        response.raise_for_status()
-        
-        # 2. 获取Content-Type，判断文件类型
-        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
-        
-        # 如果没有扩展名，则根据Content-Type猜测扩展名
-        extension = mimetypes.guess_extension(content_type)
-        if extension:
-            save_path += extension
+    # 2. 下载文件
+    return downloader.download(str(url), save_path, limit=limit, timeout=timeout, memory_limit=memory_limit, on_chunk=on_chunk)
+
+def spill(data: bytes, save_dir: str) -> str:
+    """
+    将内存中的内容写入临时文件
 
-        # 3. 下载文件并实时检查大小
-        downloaded_size = 0
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded_size += len(chunk)
-                    
-                    # 检查文件大小是否超过限制
-                    if downloaded_size > limit:
-                        # 删除部分下载的文件
-                        f.close()
-                        os.remove(save_path)
-                        
-                        logger.info(f"Download failed, url: {url}, error: File size exceeds the limit of {limit/1024/1024:.2f}MB")
-                        raise CustomException(CustomError.FILE_SIZE_LIMIT_EXCEEDED, detail=f"{limit/1024/1024:.2f} MB")
-        
-        # 4. 验证下载完整性（如果服务器提供了Content-Length）
-        content_length = response.headers.get('Content-Length')
-        if content_length and os.path.getsize(save_path) != int(content_length):
-            os.remove(save_path)
-            logger.warning(f"Download failed, url: {url}, error: File download incomplete: expected {content_length} bytes, actual {os.path.getsize(save_path)} bytes")
-            raise CustomException(CustomError.DOWNLOAD_FILE_FAILED)
-        
-        logger.info(f"Download success, url: {url}, save_path: {save_path}")
-        return save_path
-    except Exception as e:
-        # 清理可能已部分下载的文件
-        if os.path.exists(save_path):
-            os.remove(save_path)
-        logger.warning(f"Download failed, url: {url}, error: {str(e)}")
-        raise CustomException(CustomError.DOWNLOAD_FILE_FAILED)
+    Returns:
+        完整的文件路径
+    """
+    save_path = os.path.join(save_dir, gen_unique_id())
+    with open(save_path, 'wb') as f:
+        f.write(data)
+    return save_path
 
 def gen_unique_id() -> str:
     """
@@ -86,4 +66,19 @@ def gen_unique_id() -> str:
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
     unique_id = uuid.uuid4().hex[:8]
 
-    return f"{timestamp}{unique_id}"
\ No newline at end of file
+    return f"{timestamp}{unique_id}"
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL，用于判断两个请求是否指向同一个资源
+    1. scheme和host转小写，去掉默认端口
+    2. 去掉fragment
+    3. 查询参数按键排序
+    """
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
@@ -0,0 +1,407 @@
+import collections
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger
+from exceptions import CustomException, CustomError
+from jobstore import TaskStore
+import helper
+import config
+
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+# 任务管理器（应用启动时创建）
+manager = None
+
+
+class Job:
+    """后台识别任务"""
+
+    def __init__(self, kind: str, job_id: str = None):
+        self.job_id = job_id or helper.gen_unique_id()
+        self.kind = kind
+        self.status = STATUS_QUEUED
+        self.stage = STATUS_QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    def set_stage(self, stage: str, progress: float):
+        """更新任务阶段和进度（由service层回调）"""
+        self.stage = stage
+        self.progress = progress
+        self.updated_at = time.time()
+
+    def as_dict(self) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 2),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error_code"] = self.error.err.code
+        return data
+
+
+class JobManager:
+    """异步任务管理器
+    功能：
+    1. 有界线程池在后台执行识别任务，排队任务超过上限时拒绝提交
+    2. 已完成的任务在内存中保留TTL秒，查询为O(1)字典查找，不会触发重复计算
+    3. 提交、查询和统计（指标采集时调用）时清理过期任务，没有新任务提交时过期任务同样会被删除
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, ttl: int):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asr-job")
+        self._jobs = {}
+        # 已完成任务按完成时间排列，用于过期清理
+        self._expiry = collections.deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, **kwargs) -> Job:
+        """
+        提交后台任务
+
+        Args:
+            kind: 任务类型（text / srt）
+            fn: 执行函数，需要支持on_stage回调参数
+            kwargs: 传给fn的参数
+
+        Returns:
+            job: 新建的任务
+
+        Raises:
+            CustomException: 排队任务数超过上限
+        """
+        job = Job(kind)
+        with self._lock:
+            self._purge_expired()
+            if self._pending >= self.max_pending:
+                raise CustomException(CustomError.JOB_QUEUE_FULL, detail=f"{self.max_pending}")
+            self._pending += 1
+            self._jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job, fn, kwargs)
+        logger.info(f"Job submitted, job_id: {job.job_id}, kind: {kind}")
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        查询任务
+
+        Raises:
+            CustomException: 任务不存在或已过期
+        """
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+        if job is None or (job.finished and job.finished_at + self.ttl < time.time()):
+            raise CustomException(CustomError.JOB_NOT_FOUND, detail=job_id)
+        return job
+
+    def shutdown(self):
+        """停止接收新任务，等待正在执行的任务结束；还在排队的任务被取消，标记为失败"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        # 执行过的任务状态都已不是queued，剩下的是被取消、不会再执行的任务
+        now = time.time()
+        with self._lock:
+            cancelled = [job for job in self._jobs.values() if job.status == STATUS_QUEUED]
+            for job in cancelled:
+                job.error = CustomException(CustomError.JOB_CANCELLED)
+                job.status = STATUS_FAILED
+                job.set_stage(STATUS_FAILED, job.progress)
+                job.finished_at = now
+                self._pending -= 1
+                self._expiry.append((job.finished_at + self.ttl, job.job_id))
+        if cancelled:
+            logger.warning(f"{len(cancelled)} queued jobs cancelled on shutdown")
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge_expired()
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "stored": len(self._jobs),
+            }
+
+    def _run(self, job: Job, fn, kwargs: dict):
+        job.status = STATUS_RUNNING
+        try:
+            job.result = fn(on_stage=job.set_stage, **kwargs)
+            job.status = STATUS_SUCCEEDED
+            job.set_stage(STATUS_SUCCEEDED, 1.0)
+        except CustomException as e:
+            job.error = e
+            job.status = STATUS_FAILED
+            job.set_stage(STATUS_FAILED, job.progress)
+        except Exception as e:
+            logger.error(f"Job failed, job_id: {job.job_id}, error: {str(e)}, detail: {traceback.format_exc()}")
+            job.error = CustomException(CustomError.INTERNAL_SERVER_ERROR, detail=str(e))
+            job.status = STATUS_FAILED
+            job.set_stage(STATUS_FAILED, job.progress)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._pending -= 1
+                self._expiry.append((job.finished_at + self.ttl, job.job_id))
+            logger.info(f"Job finished, job_id: {job.job_id}, status: {job.status}")
+
+    def _purge_expired(self):
+        """清理过期任务（调用方需持有锁）"""
+        now = time.time()
+        while self._expiry and self._expiry[0][0] < now:
+            _, job_id = self._expiry.popleft()
+            self._jobs.pop(job_id, None)
+
+
+class DurableJobManager:
+    """持久化异步任务管理器（SQLite任务队列，见jobstore.TaskStore）
+    功能：
+    1. 任务写入本机的SQLite数据库，同一主机上的多个服务进程（uvicorn worker）共用，进程重启不丢失任务
+    2. 每个进程的工作线程从数据库领取任务（租约），心跳线程定期续约；进程崩溃后租约过期，任务由其它进程重新执行
+    3. 反复中断（执行次数达到max_attempts）的任务标记为失败，不再重试
+    4. 任意进程都可以按任务ID查询状态和结果；已完成的任务保留TTL秒
+    5. 服务就绪（模型加载完成）之前不领取任务，重启后恢复的任务不会因为模型未就绪而失败
+    """
+
+    def __init__(self, store: TaskStore, handlers: dict, max_workers: int, max_pending: int, ttl: int,
+                 lease_seconds: float = 60, heartbeat_seconds: float = 10, poll_seconds: float = 1, max_attempts: int = 3,
+                 ready=None):
+        """
+        Args:
+            store: 任务队列
+            handlers: 任务类型 -> 执行函数（需要支持on_stage回调参数），本进程只领取这些类型的任务
+            max_workers: 工作线程数
+            max_pending: 排队和执行中的任务数上限（所有进程合计）
+            ttl: 已完成任务的保留时间（秒）
+            lease_seconds: 租约时长（秒），心跳停止超过这么久的任务会被重新领取
+            heartbeat_seconds: 心跳间隔（秒）
+            poll_seconds: 没有任务时查询数据库的间隔（秒）
+            max_attempts: 任务最多执行的次数
+            ready: 等待服务就绪的函数 ready(timeout) -> bool（如startup.wait），返回True之后才开始领取任务，None不等待
+        """
+        self.store = store
+        self.handlers = dict(handlers)
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.ready = ready
+        # 进程唯一的领取者标识
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._running = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"asr-job-{i}", daemon=True) for i in range(max(1, max_workers))
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="asr-job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Durable job manager started, owner: {self.owner}, db: {store.path}")
+
+    def submit(self, kind: str, fn, **kwargs) -> Job:
+        """
+        提交后台任务（参数写入数据库，由任意进程执行）
+
+        Args:
+            kind: 任务类型（text / srt）
+            fn: 执行函数，同时登记为本进程该类型任务的执行函数
+            kwargs: 传给fn的参数（需要可JSON序列化）
+
+        Returns:
+            job: 新建的任务
+
+        Raises:
+            CustomException: 排队任务数超过上限
+        """
+        self.handlers.setdefault(kind, fn)
+        job = Job(kind)
+        if not self.store.enqueue(job.job_id, kind, kwargs, max_pending=self.max_pending):
+            raise CustomException(CustomError.JOB_QUEUE_FULL, detail=f"{self.max_pending}")
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"Job submitted, job_id: {job.job_id}, kind: {kind}")
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        查询任务（可以是其它进程提交或执行的任务）
+
+        Raises:
+            CustomException: 任务不存在或已过期
+        """
+        task = self.store.get(job_id)
+        if task is None or (task["finished_at"] is not None and task["finished_at"] + self.ttl < time.time()):
+            raise CustomException(CustomError.JOB_NOT_FOUND, detail=job_id)
+        return _job_from_task(task)
+
+    def shutdown(self):
+        """停止领取新任务，等待正在执行的任务结束"""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self) -> dict:
+        counts = self.store.counts()
+        with self._lock:
+            running_here = len(self._running)
+        return {
+            "pending": counts.get(STATUS_QUEUED, 0) + counts.get(STATUS_RUNNING, 0),
+            "max_pending": self.max_pending,
+            "stored": sum(counts.values()),
+            "statuses": counts,
+            "running_here": running_here,
+            "owner": self.owner,
+        }
+
+    def _work(self):
+        while not self._stopping.is_set():
+            # 模型加载期间领取的任务会等待超时后失败，就绪之前不领取（启动失败时同样不领取，任务留给其它进程）
+            if self.ready is not None and not self.ready(self.poll_seconds):
+                self._stopping.wait(self.poll_seconds)
+                continue
+            try:
+                task = self.store.claim(self.owner, tuple(self.handlers), self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Claim job failed: {str(e)}")
+                task = None
+            if task is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_seconds)
+                continue
+            self._run(task)
+
+    def _run(self, task: dict):
+        job_id = task["task_id"]
+        if task["attempts"] > 1:
+            logger.warning(f"Job resumed after an interrupted attempt, job_id: {job_id}, attempt: {task['attempts']}")
+        with self._lock:
+            self._running[job_id] = task
+        fn = self.handlers[task["kind"]]
+
+        def on_stage(stage: str, progress: float):
+            self.store.set_stage(job_id, self.owner, stage, progress)
+
+        result = error = None
+        try:
+            result = fn(on_stage=on_stage, **task["payload"])
+        except CustomException as e:
+            error = e
+        except Exception as e:
+            logger.error(f"Job failed, job_id: {job_id}, error: {str(e)}, detail: {traceback.format_exc()}")
+            error = CustomException(CustomError.INTERNAL_SERVER_ERROR, detail=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+        if error is None:
+            ok = self.store.finish(job_id, self.owner, result=result)
+        else:
+            ok = self.store.finish(job_id, self.owner, error_code=error.err.code, error_detail=error.detail)
+        if not ok:
+            logger.warning(f"Job lease lost before finishing, result discarded, job_id: {job_id}")
+        logger.info(f"Job finished, job_id: {job_id}, status: {STATUS_SUCCEEDED if error is None else STATUS_FAILED}")
+
+    def _heartbeat(self):
+        last_purge = 0.0
+        while not self._stopping.wait(self.heartbeat_seconds):
+            with self._lock:
+                job_ids = list(self._running)
+            try:
+                self.store.heartbeat(self.owner, job_ids, self.lease_seconds)
+                failed = self.store.fail_abandoned(self.max_attempts, CustomError.JOB_ABANDONED.code, f"{self.max_attempts} attempts")
+                if failed:
+                    logger.warning(f"{failed} jobs failed after {self.max_attempts} interrupted attempts")
+                # 过期任务不需要及时清理，每个TTL周期清理一次
+                if time.time() - last_purge > min(self.ttl, 3600):
+                    self.store.purge(time.time() - self.ttl)
+                    last_purge = time.time()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+
+def _job_from_task(task: dict) -> Job:
+    """数据库中的任务记录转为Job"""
+    job = Job(task["kind"], job_id=task["task_id"])
+    job.status = task["status"]
+    job.stage = task["stage"]
+    job.progress = task["progress"]
+    job.result = task["result"]
+    job.created_at = task["created_at"]
+    job.updated_at = task["updated_at"]
+    job.finished_at = task["finished_at"]
+    if task["error_code"] is not None:
+        job.error = CustomException(_error_by_code(task["error_code"]), detail=task["error_detail"])
+    return job
+
+def _error_by_code(code: int) -> CustomError:
+    for err in CustomError:
+        if err.code == code:
+            return err
+    return CustomError.UNKNOWN_ERROR
+
+
+def start(handlers: dict = None, ready=None):
+    """
+    创建任务管理器
+
+    Args:
+        handlers: 任务类型 -> 执行函数，持久化任务队列（JOB_STORE=sqlite）启动后即可执行其它进程提交或遗留的任务
+        ready: 等待服务就绪的函数 ready(timeout) -> bool，持久化任务队列在就绪之后才领取任务
+    """
+    global manager
+    if manager is None:
+        if config.JOB_STORE == "sqlite":
+            manager = DurableJobManager(
+                TaskStore(config.JOB_DB_PATH),
+                handlers or {},
+                max_workers=config.JOB_WORKERS,
+                max_pending=config.JOB_MAX_PENDING,
+                ttl=config.JOB_TTL,
+                lease_seconds=config.JOB_LEASE_SECONDS,
+                heartbeat_seconds=config.JOB_HEARTBEAT_SECONDS,
+                poll_seconds=config.JOB_POLL_SECONDS,
+                max_attempts=config.JOB_MAX_ATTEMPTS,
+                ready=ready,
+            )
+        else:
+            manager = JobManager(max_workers=config.JOB_WORKERS, max_pending=config.JOB_MAX_PENDING, ttl=config.JOB_TTL)
+
+def shutdown():
+    """关闭任务管理器"""
+    global manager
+    if manager is not None:
+        manager.shutdown()
+        manager = None
@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# 任务状态（与jobs中的状态一致）
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error_code INTEGER,
+    error_detail TEXT,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status_created ON tasks (status, created_at);
+CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (finished_at);
+"""
+
+# 可领取的任务：排队中，或执行中但租约已过期（执行的进程已崩溃或失联）且执行次数未达上限
+_CLAIMABLE = f"(status = '{STATUS_QUEUED}' OR (status = '{STATUS_RUNNING}' AND lease_expires < :now AND attempts < :max_attempts))"
+
+
+class TaskStore:
+    """基于SQLite（WAL模式）的持久化任务队列，同一主机上的多个进程共用一个数据库文件
+    功能：
+    1. 任务记录输入参数、状态、阶段、结果（文本或字幕URL）和错误码，进程重启后仍然保留
+    2. 工作进程通过租约领取任务（单条UPDATE ... RETURNING，原子操作），执行期间定期心跳续约；
+       租约过期的任务视为执行它的进程已崩溃，可以被任意进程重新领取
+    3. 完成、失败和心跳都校验任务仍由本进程持有，租约被接管后旧进程的写入无效
+    4. 每个线程使用自己的连接，WAL模式下读写互不阻塞，写冲突时等待busy_timeout
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Args:
+            path: 数据库文件路径（目录不存在时创建）
+            busy_timeout: 等待其它进程写锁的时间（秒）
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def enqueue(self, task_id: str, kind: str, payload: dict, max_pending: int = 0) -> bool:
+        """
+        新增任务
+
+        Args:
+            task_id: 任务ID
+            kind: 任务类型
+            payload: 执行参数（可JSON序列化）
+            max_pending: 排队和执行中的任务数上限（所有进程合计），0不限制
+
+        Returns:
+            ok: 超过上限时返回False
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_pending > 0 and self._count_pending(conn) >= max_pending:
+                return False
+            conn.execute(
+                "INSERT INTO tasks (task_id, kind, payload, status, stage, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (task_id, kind, json.dumps(payload, ensure_ascii=False), STATUS_QUEUED, STATUS_QUEUED, now, now),
+            )
+        return True
+
+    def claim(self, owner: str, kinds: tuple, lease_seconds: float, max_attempts: int = 3) -> dict:
+        """
+        领取最早创建的一个可执行任务
+
+        Args:
+            owner: 领取者标识（进程唯一）
+            kinds: 本进程能执行的任务类型
+            lease_seconds: 租约时长（秒）
+            max_attempts: 任务最多执行的次数，达到后不再重新领取（由fail_abandoned标记为失败）
+
+        Returns:
+            task: 任务记录（attempts已加1），没有可领取的任务时返回None
+        """
+        if not kinds:
+            return None
+        now = time.time()
+        placeholders = ", ".join(f":kind{i}" for i in range(len(kinds)))
+        params = {"now": now, "owner": owner, "expires": now + lease_seconds, "running": STATUS_RUNNING, "max_attempts": max_attempts}
+        params.update({f"kind{i}": kind for i, kind in enumerate(kinds)})
+        conn = self._conn()
+        with conn:
+            row = conn.execute(
+                f"""UPDATE tasks SET status = :running, owner = :owner, lease_expires = :expires,
+                           attempts = attempts + 1, updated_at = :now
+                    WHERE task_id = (
+                        SELECT task_id FROM tasks WHERE {_CLAIMABLE} AND kind IN ({placeholders})
+                        ORDER BY created_at LIMIT 1
+                    )
+                    RETURNING *""",
+                params,
+            ).fetchone()
+        return _task(row)
+
+    def heartbeat(self, owner: str, task_ids: list, lease_seconds: float) -> int:
+        """延长本进程持有的任务的租约，返回续约成功的任务数"""
+        if not task_ids:
+            return 0
+        now = time.time()
+        placeholders = ", ".join("?" for _ in task_ids)
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET lease_expires = ? WHERE owner = ? AND status = ? AND task_id IN ({placeholders})",
+                (now + lease_seconds, owner, STATUS_RUNNING, *task_ids),
+            )
+        return cursor.rowcount
+
+    def set_stage(self, task_id: str, owner: str, stage: str, progress: float):
+        """更新执行阶段和进度"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE tasks SET stage = ?, progress = ?, updated_at = ? WHERE task_id = ? AND owner = ? AND status = ?",
+                (stage, progress, time.time(), task_id, owner, STATUS_RUNNING),
+            )
+
+    def finish(self, task_id: str, owner: str, result: str = None, error_code: int = None, error_detail: str = None) -> bool:
+        """
+        记录执行结果，error_code为None表示成功
+
+        Returns:
+            ok: 任务已不由本进程持有（租约过期被其它进程接管）时返回False
+        """
+        now = time.time()
+        status = STATUS_SUCCEEDED if error_code is None else STATUS_FAILED
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE tasks SET status = ?, stage = ?, progress = CASE WHEN ? = ? THEN 1.0 ELSE progress END,
+                          result = ?, error_code = ?, error_detail = ?, lease_expires = NULL, updated_at = ?, finished_at = ?
+                   WHERE task_id = ? AND owner = ? AND status = ?""",
+                (status, status, status, STATUS_SUCCEEDED, result, error_code, error_detail, now, now, task_id, owner, STATUS_RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def fail_abandoned(self, max_attempts: int, error_code: int, error_detail: str) -> int:
+        """租约过期且执行次数已达max_attempts的任务标记为失败（避免反复导致进程崩溃的任务无限重试）"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE tasks SET status = ?, stage = ?, error_code = ?, error_detail = ?, lease_expires = NULL,
+                          updated_at = ?, finished_at = ?
+                   WHERE status = ? AND lease_expires < ? AND attempts >= ?""",
+                (STATUS_FAILED, STATUS_FAILED, error_code, error_detail, now, now, STATUS_RUNNING, now, max_attempts),
+            )
+        return cursor.rowcount
+
+    def get(self, task_id: str) -> dict:
+        """按ID查询任务，不存在时返回None"""
+        row = self._conn().execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return _task(row)
+
+    def purge(self, before: float) -> int:
+        """删除完成时间早于before的任务"""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?", (before,))
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        """各状态的任务数"""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _count_pending(self, conn) -> int:
+        return conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)", (STATUS_QUEUED, STATUS_RUNNING)
+        ).fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：事务由BEGIN显式开始，with conn在结束时提交或回滚
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def _task(row) -> dict:
+    if row is None:
+        return None
+    task = dict(row)
+    task["payload"] = json.loads(task["payload"])
+    return task
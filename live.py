@@ -0,0 +1,284 @@
+import asyncio
+import collections
+import json
+import time
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+from exceptions import CustomError, CustomException
+from logger import logger
+from responses import parse_language
+from service import segment_sentences_by_intervals
+import backends
+import config
+import metrics
+import subtitles
+
+
+# 流式paraformer每帧60ms（16kHz下960个采样点），块大小以帧为单位
+FRAME_SAMPLES = 960
+# 编码器/解码器回看的块数（模型缓存只保留这么多块的状态）
+ENCODER_LOOK_BACK = 4
+DECODER_LOOK_BACK = 1
+# 10ms帧的平均幅度低于该值视为静音（float32音频，满幅为1）
+SILENCE_LEVEL = 0.01
+# 出错时以1013（稍后重试）关闭连接的错误，识别失败为1011，其它为1008
+_RETRY_LATER_ERRORS = (CustomError.MODEL_NOT_READY, CustomError.SERVICE_OVERLOADED)
+
+
+class LiveSession:
+    """一个连接的实时识别状态
+    功能：
+    1. 接收任意长度的音频片段，凑满一个块（chunk_frames * 60ms）就用流式模型增量识别，模型缓存（cache）按连接保存
+    2. 块内识别出的词按块内有语音的范围均匀分配时间戳
+    3. 按segment_sentences_by_intervals的规则在词间隔超过interval_threshold处断句；
+       最后一句在interval_threshold内没有新词（语音结束）或时长达到max_cue_seconds时确定为字幕条目
+    4. 内存有界：待识别的音频不超过max_buffer_seconds，未确定的词不超过max_cue_seconds，模型缓存只回看固定块数
+    """
+
+    def __init__(self, model, chunk_frames: int = 10, interval_threshold: int = subtitles.DEFAULT_INTERVAL_THRESHOLD,
+                 max_buffer_seconds: float = 10, max_cue_seconds: float = 15, sample_rate: int = 16000):
+        """
+        Args:
+            model: 流式识别模型（paraformer-zh-streaming）
+            chunk_frames: 每个块的帧数（60ms/帧），向后看半个块
+            interval_threshold: 断句时间间隔阈值（毫秒）
+            max_buffer_seconds: 待识别音频的最大时长（秒），客户端发送快于识别速度时超出报错
+            max_cue_seconds: 单条字幕的最大时长（秒），超过时不等停顿直接确定
+            sample_rate: 输入音频采样率
+        """
+        self.model = model
+        self.chunk_size = [0, chunk_frames, chunk_frames // 2]
+        self.chunk_samples = chunk_frames * FRAME_SAMPLES
+        self.interval_threshold = interval_threshold
+        self.max_buffer_samples = int(max_buffer_seconds * sample_rate)
+        self.max_cue_ms = int(max_cue_seconds * 1000)
+        self.sample_rate = sample_rate
+        self.cues = 0
+
+        self._cache = {}
+        self._buffer = np.zeros(0, dtype=np.float32)
+        # 已识别和已接收的采样点数
+        self._offset = 0
+        self._received = 0
+        # 未确定的词和时间戳（毫秒）
+        self._words = []
+        self._timestamps = []
+        # 每个音频片段的 (结束位置, 接收时间)，用来统计字幕条目相对语音到达的延迟
+        self._arrivals = collections.deque()
+
+    @property
+    def audio_ms(self) -> int:
+        """已识别的音频时长（毫秒）"""
+        return self._offset * 1000 // self.sample_rate
+
+    def feed(self, samples: np.ndarray, received_at: float = None) -> list:
+        """
+        追加音频，识别所有完整的块
+
+        Args:
+            samples: 16kHz单声道float32音频
+            received_at: 接收时间（time.perf_counter()），默认当前时间
+
+        Returns:
+            events: partial / cue 消息列表
+
+        Raises:
+            CustomException: 待识别的音频超过max_buffer_seconds
+        """
+        if len(self._buffer) + len(samples) > self.max_buffer_samples:
+            raise CustomException(CustomError.LIVE_BUFFER_OVERFLOW, detail=f"max {self.max_buffer_samples // self.sample_rate}s")
+        self._received += len(samples)
+        self._arrivals.append((self._received, received_at or time.perf_counter()))
+        self._buffer = np.concatenate((self._buffer, samples))
+
+        events = []
+        while len(self._buffer) >= self.chunk_samples:
+            chunk = self._buffer[:self.chunk_samples]
+            self._buffer = self._buffer[self.chunk_samples:]
+            events.extend(self._recognize(chunk, is_final=False))
+        return events
+
+    def finish(self) -> list:
+        """识别剩余音频，确定全部未确定的词"""
+        # 没有剩余音频时送入一帧静音，让模型输出缓存中的结果
+        chunk = self._buffer if len(self._buffer) else np.zeros(FRAME_SAMPLES, dtype=np.float32)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        events = self._recognize(chunk, is_final=True)
+        events.extend(self._finalize(force=True))
+        self._cache = {}
+        return events
+
+    def _recognize(self, chunk: np.ndarray, is_final: bool) -> list:
+        start_ms = self.audio_ms
+        with metrics.stage("live_chunk"):
+            result = self.model.generate(input=chunk, cache=self._cache, is_final=is_final, chunk_size=self.chunk_size,
+                                         encoder_chunk_look_back=ENCODER_LOOK_BACK, decoder_chunk_look_back=DECODER_LOOK_BACK)
+        self._offset += len(chunk)
+
+        text = result[0].get("text", "") if result else ""
+        words = backends.WORD_PATTERN.findall(text)
+        if words:
+            self._words.extend(words)
+            self._timestamps.extend(self._spread(chunk, start_ms, len(words)))
+
+        events = self._finalize(force=False)
+        if words and self._words:
+            events.append({
+                "type": "partial",
+                "start": self._timestamps[0][0],
+                "end": self._timestamps[-1][1],
+                "text": "".join(self._words),
+            })
+        return events
+
+    def _spread(self, chunk: np.ndarray, start_ms: int, count: int) -> list:
+        """在块内有语音的范围（10ms帧）内均匀分配count个词的时间戳，没有检测到语音时使用整个块"""
+        frame = self.sample_rate // 100
+        frames = len(chunk) // frame
+        voiced = np.flatnonzero(np.abs(chunk[:frames * frame]).reshape(frames, frame).mean(axis=1) > SILENCE_LEVEL)
+        if len(voiced):
+            begin, end = start_ms + int(voiced[0]) * 10, start_ms + (int(voiced[-1]) + 1) * 10
+        else:
+            begin, end = start_ms, start_ms + len(chunk) * 1000 // self.sample_rate
+        bounds = np.linspace(begin, end, count + 1).astype(int).tolist()
+        return [[bounds[i], bounds[i + 1]] for i in range(count)]
+
+    def _finalize(self, force: bool) -> list:
+        """确定已经断句的字幕条目；force时剩余的词全部作为最后一条"""
+        sentences, start = segment_sentences_by_intervals(self._words, self._timestamps, self.interval_threshold)
+        if start < len(self._words):
+            first_start, last_end = self._timestamps[start][0], self._timestamps[-1][1]
+            if force or self.audio_ms - last_end > self.interval_threshold or last_end - first_start >= self.max_cue_ms:
+                sentences.append((first_start, last_end, "".join(self._words[start:])))
+                start = len(self._words)
+        del self._words[:start]
+        del self._timestamps[:start]
+
+        events = [self._cue(sentence) for sentence in sentences]
+        # 只保留未确定的词之后到达的片段
+        keep_from = self._timestamps[0][0] * self.sample_rate // 1000 if self._timestamps else self._offset
+        while self._arrivals and self._arrivals[0][0] <= keep_from:
+            self._arrivals.popleft()
+        return events
+
+    def _cue(self, sentence: tuple) -> dict:
+        self.cues += 1
+        start_ms, end_ms, text = sentence
+        # 延迟：从包含该条目最后一个词的音频片段到达，到条目确定
+        end_sample = end_ms * self.sample_rate // 1000
+        while len(self._arrivals) > 1 and self._arrivals[0][0] < end_sample:
+            self._arrivals.popleft()
+        if self._arrivals:
+            metrics.LIVE_CUE_DELAY.observe(time.perf_counter() - self._arrivals[0][1])
+        metrics.LIVE_CUES.inc()
+        return {
+            "type": "cue",
+            "index": self.cues,
+            "start": start_ms,
+            "end": end_ms,
+            "text": text,
+            "srt": subtitles.srt_cue(self.cues, sentence),
+        }
+
+
+# 当前连接数
+_connections = 0
+
+metrics.LIVE_CONNECTIONS.set_function(lambda: _connections)
+
+
+async def serve(websocket: WebSocket, model, executor, interval_threshold: int = subtitles.DEFAULT_INTERVAL_THRESHOLD):
+    """
+    处理一个实时识别连接
+
+    协议：
+    1. 客户端发送二进制消息：16kHz单声道16位小端PCM，长度任意
+    2. 客户端发送文本消息 end（或 {"type": "end"}）：识别剩余音频，推送剩余的字幕条目和done后关闭连接
+    3. 服务端推送JSON（时间单位为毫秒）：
+       {"type": "partial", "start", "end", "text"}：当前句子的中间结果
+       {"type": "cue", "index", "start", "end", "text", "srt"}：确定的字幕条目
+       {"type": "done", "cues", "audio_ms"}：识别结束
+       {"type": "error", "code", "message"}：出错，随后关闭连接
+
+    Args:
+        websocket: WebSocket连接
+        model: 流式识别模型，None表示未启用或未就绪
+        executor: 执行识别的线程池
+        interval_threshold: 断句时间间隔阈值（毫秒）
+    """
+    global _connections
+    lang = parse_language(websocket.headers.get("accept-language"))
+    await websocket.accept()
+    if model is None:
+        await _close_with_error(websocket, CustomException(CustomError.MODEL_NOT_READY, detail="live"), lang)
+        return
+    if config.LIVE_MAX_CONNECTIONS > 0 and _connections >= config.LIVE_MAX_CONNECTIONS:
+        await _close_with_error(websocket, CustomException(CustomError.SERVICE_OVERLOADED, detail=f"max {config.LIVE_MAX_CONNECTIONS} live connections"), lang)
+        return
+
+    session = LiveSession(model, chunk_frames=config.LIVE_CHUNK_FRAMES, interval_threshold=interval_threshold,
+                          max_buffer_seconds=config.LIVE_MAX_BUFFER_SECONDS, max_cue_seconds=config.LIVE_MAX_CUE_SECONDS)
+    _connections += 1
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            done = False
+            if message.get("bytes") is not None:
+                samples = _decode_pcm(message["bytes"])
+                events = await loop.run_in_executor(executor, session.feed, samples, time.perf_counter())
+            elif _is_end(message.get("text")):
+                events = await loop.run_in_executor(executor, session.finish)
+                events.append({"type": "done", "cues": session.cues, "audio_ms": session.audio_ms})
+                done = True
+            else:
+                continue
+
+            for event in events:
+                await websocket.send_json(event)
+            if done:
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    except CustomException as e:
+        await _close_with_error(websocket, e, lang)
+    except Exception as e:
+        logger.error(f"Live recognition failed: {str(e)}")
+        await _close_with_error(websocket, CustomException(CustomError.RECOGNIZE_AUDIO_FAILED), lang)
+    finally:
+        _connections -= 1
+        logger.info(f"Live connection closed, cues: {session.cues}, audio_ms: {session.audio_ms}")
+
+def _decode_pcm(data: bytes) -> np.ndarray:
+    """16位小端PCM转为float32音频"""
+    if len(data) % 2:
+        raise CustomException(CustomError.PARAM_VALIDATION_FAILED, detail="PCM message must contain whole 16-bit samples")
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+
+def _is_end(text: str) -> bool:
+    if text is None:
+        return False
+    if text.strip() == "end":
+        return True
+    try:
+        return json.loads(text).get("type") == "end"
+    except (ValueError, AttributeError):
+        return False
+
+async def _close_with_error(websocket: WebSocket, e: CustomException, lang: str):
+    """推送错误消息并关闭连接（连接已断开时忽略）"""
+    try:
+        await websocket.send_json({"type": "error", **e.err.as_dict(detail=e.detail, lang=lang)})
+        if e.err in _RETRY_LATER_ERRORS:
+            code = 1013
+        elif e.err == CustomError.RECOGNIZE_AUDIO_FAILED:
+            code = 1011
+        else:
+            code = 1008
+        await websocket.close(code=code)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
@@ -0,0 +1,163 @@
+import collections
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from logger import logger
+
+
+# 子进程使用的识别模型（fork前设置，子进程以写时复制方式共享权重）
+_worker_model = None
+
+
+def _init_worker(threads: int):
+    """子进程初始化：限制每个进程的torch线程数，避免多进程抢占CPU"""
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+def _recognize_segment(samples: np.ndarray) -> dict:
+    """子进程中识别一个语音片段，返回model.generate结果的第一项"""
+    result = _worker_model.generate(input=samples)
+    if isinstance(result, list) and len(result) > 0:
+        item = result[0]
+        return {"text": item.get("text", ""), "timestamp": item.get("timestamp", [])}
+    return {"text": "", "timestamp": []}
+
+def _noop():
+    return None
+
+
+class LongAudioPipeline:
+    """长音频识别流水线
+    功能：
+    1. 用VAD把音频切分为语音片段，静音部分不参与识别
+    2. 相邻片段合并到不超过max_segment_ms，交给进程池并行识别
+    3. 各片段的时间戳加上片段起始偏移，拼接回全局时间轴
+    4. 记录每个请求的实时率（RTF = 处理耗时 / 音频时长）
+    """
+
+    def __init__(self, asr_model, vad_model, workers: int, worker_threads: int = 1, max_segment_ms: int = 30000, sample_rate: int = 16000):
+        """
+        Args:
+            asr_model: 识别模型（子进程通过fork继承）
+            vad_model: 语音活动检测模型，在主进程中执行
+            workers: 识别进程数
+            worker_threads: 每个识别进程的torch线程数
+            max_segment_ms: 合并后单个片段的最大时长（毫秒）
+            sample_rate: 输入音频采样率
+        """
+        global _worker_model
+        _worker_model = asr_model
+
+        self.vad_model = vad_model
+        self.workers = workers
+        self.max_segment_ms = max_segment_ms
+        self.sample_rate = sample_rate
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(worker_threads,),
+        )
+        # fork上下文下子进程在第一次提交时全部创建，这里提前创建，尽量在其它后台线程启动之前fork
+        self._executor.submit(_noop).result()
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._audio_seconds = 0.0
+        self._elapsed_seconds = 0.0
+        self._recent = collections.deque(maxlen=100)
+
+    def recognize(self, samples: np.ndarray) -> list:
+        """
+        识别长音频
+
+        Args:
+            samples: 16kHz单声道音频数组
+
+        Returns:
+            result: 与model.generate相同格式的识别结果列表（单项）
+        """
+        started = time.perf_counter()
+        duration_ms = len(samples) * 1000 // self.sample_rate
+
+        # 1. VAD切分并合并片段
+        vad_started = time.perf_counter()
+        segments = self.merge_segments(self._detect_speech(samples), self.max_segment_ms)
+        vad_ms = (time.perf_counter() - vad_started) * 1000
+
+        # 2. 并行识别各片段
+        chunks = [samples[start * self.sample_rate // 1000:end * self.sample_rate // 1000] for start, end in segments]
+        results = list(self._executor.map(_recognize_segment, chunks))
+
+        # 3. 时间戳平移到全局时间轴，拼接文本
+        texts = []
+        timestamps = []
+        for (start, _), result in zip(segments, results):
+            if result["text"]:
+                texts.append(result["text"])
+            timestamps.extend([[ts[0] + start, ts[1] + start] + list(ts[2:]) for ts in result["timestamp"]])
+
+        # 4. 记录实时率
+        elapsed = time.perf_counter() - started
+        rtf = elapsed / (duration_ms / 1000) if duration_ms else 0
+        self._record(duration_ms / 1000, elapsed, len(segments), vad_ms, rtf)
+        logger.info(f"Long audio recognized, duration: {duration_ms / 1000:.1f}s, segments: {len(segments)}, "
+                    f"speech: {sum(end - start for start, end in segments) / 1000:.1f}s, elapsed: {elapsed:.2f}s, rtf: {rtf:.3f}")
+
+        return [{"key": "long_audio", "text": " ".join(texts), "timestamp": timestamps}]
+
+    @staticmethod
+    def merge_segments(segments: list, max_segment_ms: int) -> list:
+        """
+        合并相邻的语音片段，合并后的片段时长不超过max_segment_ms（单个超长片段保持原样）
+
+        Args:
+            segments: [[start_ms, end_ms], ...]，按时间排序
+
+        Returns:
+            merged: [(start_ms, end_ms), ...]
+        """
+        merged = []
+        for start, end in segments:
+            if merged and end - merged[-1][0] <= max_segment_ms:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "requests": self._requests,
+                "audio_seconds": round(self._audio_seconds, 2),
+                "avg_rtf": round(self._elapsed_seconds / self._audio_seconds, 4) if self._audio_seconds else 0,
+                "recent": list(self._recent),
+            }
+
+    def _detect_speech(self, samples: np.ndarray) -> list:
+        """VAD检测语音片段，返回[[start_ms, end_ms], ...]"""
+        result = self.vad_model.generate(input=samples)
+        if isinstance(result, list) and len(result) > 0:
+            return [[int(start), int(end)] for start, end in result[0].get("value", []) if end > start]
+        return []
+
+    def _record(self, audio_seconds: float, elapsed: float, segments: int, vad_ms: float, rtf: float):
+        with self._lock:
+            self._requests += 1
+            self._audio_seconds += audio_seconds
+            self._elapsed_seconds += elapsed
+            self._recent.append({
+                "audio_seconds": round(audio_seconds, 2),
+                "segments": segments,
+                "vad_ms": round(vad_ms, 2),
+                "elapsed_ms": round(elapsed * 1000, 2),
+                "rtf": round(rtf, 4),
+            })
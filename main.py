@@ -2,7 +2,12 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 import router
 import service
+import jobs
 import middlewares
+import startup
+import storage
+import config
+from responses import EnvelopeJSONResponse
 from logger import logger
 
 
@@ -13,24 +18,42 @@ async def lifespan(app: FastAPI):
     # await create_db_pool()
     # await start_redis()
     logger.info("✅ app start")
-    # 在应用启动时加载模型
-    service.load_model()
+    # 加载并预热模型（默认在后台线程执行，进程立即可以响应存活检查，就绪状态见/ready）。
+    # 副本池和长音频流水线需要fork子进程，这时在启动任何其它线程之前同步加载，fork时父进程中只有当前线程
+    background = config.STARTUP_BACKGROUND and not service.needs_fork()
+    if config.STARTUP_BACKGROUND and not background:
+        logger.info("Model replicas or long audio workers enabled, load model before starting background threads")
+    startup.start([
+        (startup.STATUS_LOADING, service.load_model),
+        (startup.STATUS_WARMING, service.warmup),
+    ], background=background)
+    # 创建临时目录和输出目录，启动过期文件和存储配额的后台清理
+    storage.start()
+    # 启动异步任务管理器（持久化队列中其它进程遗留的任务也由这些函数执行，模型就绪后才开始领取）
+    jobs.start(handlers={"text": service.asr_text, "srt": service.asr_srt}, ready=startup.wait)
     yield
     # ---------------- 关闭 ----------------
     # await close_db_pool()
     # await stop_redis()
+    jobs.shutdown()
+    startup.shutdown()
+    service.shutdown()
+    storage.shutdown()
     logger.info("❌ app shutdown")
 
 # 2. 创建FastAPI应用
-app = FastAPI(title="AutoSubRT API", description="语音转SRT字幕服务", lifespan=lifespan)
+# 默认响应类直接输出统一格式 {code, message, data}
+app = FastAPI(title="AutoSubRT API", description="语音转SRT字幕服务", lifespan=lifespan, default_response_class=EnvelopeJSONResponse)
 
 # 3. 注册路由
 app.include_router(router.router, prefix="/openapi", tags=["AutoSubRT"])
 
-# 4. 添加中间件
-app.add_middleware(middlewares.PrepareMiddleware)
+# 4. 添加中间件和异常处理器
 # 注册统一响应处理中间件（注意顺序，应该在其他中间件之后注册）
 app.add_middleware(middlewares.ResponseMiddleware)
+# 请求指标中间件最后注册（最外层），统计包含统一响应处理在内的完整耗时
+app.add_middleware(middlewares.MetricsMiddleware, server_timing=config.SERVER_TIMING)
+middlewares.register_exception_handlers(app)
 
 # 5. 打印所有路由
 for r in app.routes:
@@ -0,0 +1,289 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+
+
+# 耗时类直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# 已注册的指标，按注册顺序输出
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类：按标签值缓存子指标，热路径上只做一次字典查找"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        # 无标签的指标在第一次使用前也输出0
+        if not self.labelnames:
+            self.labels()
+        with _registry_lock:
+            _registry.append(self)
+
+    def labels(self, *values):
+        """返回标签值对应的子指标"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _render_child(self, values: tuple, child) -> list:
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """采集时调用function取值（队列长度等状态不需要在热路径上维护）"""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets: tuple):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values: tuple, child) -> list:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_text(self.labelnames, values)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_label_text(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """全部指标的Prometheus文本格式"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------- 服务指标 ----------------
+
+REQUESTS = Counter("autosubrt_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("autosubrt_http_request_duration_seconds", "HTTP request latency", ("route",))
+IN_FLIGHT = Gauge("autosubrt_http_requests_in_flight", "HTTP requests currently being served")
+
+STAGE_SECONDS = Histogram("autosubrt_stage_duration_seconds", "Wall time of each processing stage", ("stage",))
+DOWNLOAD_BYTES = Counter("autosubrt_download_bytes_total", "Bytes downloaded from source URLs")
+DOWNLOAD_THROUGHPUT = Histogram("autosubrt_download_throughput_bytes_per_second", "Download throughput",
+                                buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6, 1e9))
+AUDIO_SECONDS = Histogram("autosubrt_audio_duration_seconds", "Duration of recognized audio",
+                          buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+INFERENCE_RTF = Histogram("autosubrt_inference_rtf", "Inference real-time factor (wall time / audio duration)",
+                          buckets=(0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0))
+
+QUEUE_DEPTH = Gauge("autosubrt_queue_depth", "Items waiting in internal queues", ("queue",))
+ADMISSION_ACTIVE = Gauge("autosubrt_admission_active", "Recognition requests holding an admission slot")
+ADMISSION_REJECTED = Counter("autosubrt_admission_rejected_total", "Recognition requests rejected or dropped by admission control", ("reason",))
+BULK_ITEMS = Counter("autosubrt_bulk_items_total", "Items processed by the bulk recognition endpoint", ("status",))
+LIVE_CONNECTIONS = Gauge("autosubrt_live_connections", "Open live recognition WebSocket connections")
+LIVE_CUES = Counter("autosubrt_live_cues_total", "Subtitle cues finalized by live recognition")
+LIVE_CUE_DELAY = Histogram("autosubrt_live_cue_delay_seconds", "Time from the audio containing a cue's last word arriving to the cue being finalized")
+FILE_RESPONSES = Counter("autosubrt_file_responses_total", "Output file download responses by kind (full/gzip/partial/not_modified/unsatisfiable)", ("result",))
+STORAGE_BYTES = Gauge("autosubrt_storage_bytes", "Disk usage of temp and output files at the last sweep", ("area",))
+STORAGE_FILES = Gauge("autosubrt_storage_files", "Number of temp and output files at the last sweep", ("area",))
+STORAGE_EVICTIONS = Counter("autosubrt_storage_evictions_total", "Files removed by the storage sweeper", ("area", "reason"))
+READY = Gauge("autosubrt_ready", "1 when the model is loaded and warmed up")
+INFERENCE_SLOTS_BUSY = Gauge("autosubrt_inference_slots_busy", "In-process inference slots currently running a model call")
+REPLICAS_ALIVE = Gauge("autosubrt_replicas_alive", "Model replica processes currently alive")
+REPLICA_RESTARTS = Counter("autosubrt_replica_restarts_total", "Model replica processes restarted after a crash or failed health check")
+MODEL_LOAD_SECONDS = Gauge("autosubrt_model_load_seconds", "Time spent loading each model", ("model",))
+
+
+# ---------------- 请求级耗时明细 ----------------
+
+# 当前请求的各阶段耗时（秒），由middlewares.MetricsMiddleware在需要输出Server-Timing时设置
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class stage:
+    """
+    记录一个处理阶段的耗时：写入STAGE_SECONDS直方图，并累加到当前请求的耗时明细
+
+    用法：
+        with metrics.stage("download") as t:
+            ...
+        t.ms  # 阶段耗时（毫秒）
+    """
+
+    __slots__ = ("name", "started", "seconds")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.labels(self.name).observe(self.seconds)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + self.seconds
+        return False
+
+    @property
+    def ms(self) -> float:
+        return round(self.seconds * 1000, 2)
+
+def server_timing(timings: dict) -> str:
+    """耗时明细格式化为Server-Timing响应头"""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
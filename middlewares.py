@@ -1,161 +1,155 @@
-from fastapi import Request
+import json
+import time
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from exceptions import CustomError, CustomException
-from starlette.middleware.base import BaseHTTPMiddleware
+from responses import parse_language, request_language
 from logger import logger
-import json
-import os
-import config
+import metrics
 
 
-class PrepareMiddleware(BaseHTTPMiddleware):
-    """请求前的准备工作中间件
+class ResponseMiddleware:
+    """统一响应处理中间件（纯ASGI实现，不缓冲、不重新解析响应体，流式响应原样透传）
     功能：
-    1. 创建临时目录
-    2. 创建输出目录
+    1. 按Accept-Language设置当前请求的语言，供统一格式响应和异常处理使用
+    2. 兜底处理路由未捕获的异常，返回标准错误格式
+
+    业务正常响应的 {code, message, data} 包装由默认响应类responses.EnvelopeJSONResponse完成，
+    自定义异常、参数校验失败（422）和HTTP错误由register_exception_handlers注册的处理器转换
     """
 
-    async def dispatch(self, request: Request, call_next):
-        # 递归创建目录，如果目录存在，就直接跳过创建
-        os.makedirs(config.TEMP_DIR, exist_ok=True)
-        os.makedirs(config.VIDEO_OUTPUT_DIR, exist_ok=True)
-        os.makedirs(config.SRT_OUTPUT_DIR, exist_ok=True)
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        # 继续处理请求
-        response = await call_next(request)
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        lang = parse_language(_header(scope, b"accept-language"))
+        token = request_language.set(lang)
+        started = False
 
-class ResponseMiddleware(BaseHTTPMiddleware):
-    """统一响应处理中间件
-    功能：
-    1. 统一处理业务正常响应，添加code和message字段
-    2. 统一处理异常，返回标准错误格式
-    """
+        async def send_wrapper(message: Message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
 
-    async def dispatch(self, request: Request, call_next):
         try:
-            lang = self._get_language_from_request(request)
-            response = await call_next(request)
-
-            # 处理非200状态码的响应
-            if response.status_code != 200:
-                return await self._handle_non_200_response(response, lang)
-                
-            # 处理JSON响应
-            if self._is_json_response(response):
-                return await self._process_json_response(response, lang)
-                
-            return response
-            
-        except CustomException as e:
-            return self._handle_custom_exception(e, lang)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            return self._handle_generic_exception(e, lang)
-
-    def _get_language_from_request(self, request: Request) -> str:
-        """从请求头获取语言偏好"""
-        lang = request.headers.get('Accept-Language', 'zh').split(',')[0].split('-')[0]
-        return lang if lang in ['zh', 'en'] else 'zh'
-    
-    def _handle_422_error(self, body_str: str, lang: str) -> JSONResponse:
-        """特殊处理422参数验证错误"""
-        try:
-            # 尝试解析422错误的响应体
-            error_data = json.loads(body_str)
-            
-            # 提取验证错误的详细信息
-            validation_messages = []
-            if "detail" in error_data:
-                for error in error_data["detail"]:
-                    if "loc" in error and "msg" in error:
-                        # 格式化错误信息
-                        field = ".".join(str(part) for part in error["loc"] if part != "body")
-                        message = f"{field}: {error['msg']}"
-                        validation_messages.append(message)
-
-            # 构建统一的422错误响应（不包含data字段）
-            error_message = "; ".join(validation_messages) if validation_messages else ""
-            error_response = CustomError.PARAM_VALIDATION_FAILED.as_dict(detail=error_message, lang=lang)
-            return JSONResponse(status_code=200, content=error_response)
-            
-        except json.JSONDecodeError:
-            logger.warning(f"Failed to parse 422 response body: {body_str}")
-            
-            error_response = CustomError.PARAM_VALIDATION_FAILED.as_dict(detail=body_str, lang=lang)
-            return JSONResponse(status_code=200, content=error_response)
-
-    async def _handle_non_200_response(self, response, lang: str) -> JSONResponse:
-        """处理非200状态码的响应"""
-        body = b""
-        async for chunk in response.body_iterator:
-            body += chunk
-        
-        body_str = body.decode()
-
-        # 特殊处理422错误（参数验证错误）
-        if response.status_code == 422:
-            return self._handle_422_error(body_str, lang)
-        
-        # 其它情况不应该发生，每一个错误都应该在前面被处理
-        logger.error(f"Non-200 response: {response.status_code} - {body_str}")
-        # 其他非200错误处理
-        error_response = {
-            "code": response.status_code,
-            "message": f"HTTP Error {response.status_code}",
-            "data": {"detail": body_str}
-        }
-        
-        return JSONResponse(status_code=200, content=error_response)
-
-    def _is_json_response(self, response) -> bool:
-        """检查是否为JSON响应"""
-        return response.headers.get('content-type') == 'application/json'
-
-    async def _process_json_response(self, response, lang: str):
-        """处理JSON响应并统一格式"""
-        body = [section async for section in response.body_iterator]
-        if not body:
-            return response
-            
-        body_str = b''.join(body).decode()
-        
+            # 响应已经开始发送时无法再改写，只能交给服务器处理
+            if started:
+                raise
+            response = _handle_generic_exception(e, lang)
+            await response(scope, receive, send)
+        finally:
+            request_language.reset(token)
+
+
+class MetricsMiddleware:
+    """请求指标中间件（纯ASGI实现）
+    功能：
+    1. 记录进行中的请求数、按路由和状态码统计请求数和耗时
+    2. 启用server_timing时收集各处理阶段的耗时，通过Server-Timing响应头返回
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timings = {} if self.server_timing else None
+        token = metrics.request_timings.set(timings)
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", metrics.server_timing(timings).encode("latin-1"))
+                    ]
+            await send(message)
+
+        metrics.IN_FLIGHT.inc()
         try:
-            data = json.loads(body_str)
-            
-            # 如果响应已经有统一格式，直接返回
-            if 'code' in data and 'message' in data:
-                return response
-                
-            # 创建统一格式的响应（成功响应保留data字段）
-            unified_response = {
-                'code': CustomError.SUCCESS.code,
-                'message': CustomError.SUCCESS.as_dict(lang=lang)['message'],
-                'data': data
-            }
-            
-            return JSONResponse(
-                status_code=response.status_code,
-                content=unified_response
-            )
-            
-        except json.JSONDecodeError:
-            logger.warning(f"JSON decode error: {body_str}")
-            return response
-
-    def _handle_custom_exception(self, e: CustomException, lang: str) -> JSONResponse:
-        """处理自定义异常（不包含data字段）"""
-        logger.warning(f"Custom exception: {e.err.code} - {e.err.cn_message}" + 
-                    (f" ({e.detail})" if e.detail else ""))
-        
-        # 获取错误信息
-        error_response = e.err.as_dict(detail=e.detail, lang=lang)
-        return JSONResponse(status_code=200, content=error_response)
-
-    def _handle_generic_exception(self, e: Exception, lang: str) -> JSONResponse:
-        """处理通用异常（不包含data字段）"""
-        logger.warning(f"Internal server error: {str(e)}")
-        
-        # 获取错误信息
-        error_response = CustomError.INTERNAL_SERVER_ERROR.as_dict(detail=str(e), lang=lang)
-        return JSONResponse(status_code=200, content=error_response)
\ No newline at end of file
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.IN_FLIGHT.dec()
+            metrics.request_timings.reset(token)
+            # 未匹配路由的请求统一归为unmatched，避免标签基数随URL增长
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.REQUESTS.labels(scope["method"], route, str(status)).inc()
+            metrics.REQUEST_SECONDS.labels(route).observe(time.perf_counter() - started)
+
+
+def register_exception_handlers(app: FastAPI):
+    """注册异常处理器：所有错误统一返回HTTP 200和 {code, message}"""
+    app.add_exception_handler(CustomException, _handle_custom_exception)
+    app.add_exception_handler(RequestValidationError, _handle_validation_error)
+    app.add_exception_handler(StarletteHTTPException, _handle_http_exception)
+
+
+def _header(scope: Scope, name: bytes) -> str:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+def _language(request: Request) -> str:
+    return parse_language(request.headers.get('Accept-Language', 'zh'))
+
+async def _handle_custom_exception(request: Request, e: CustomException) -> JSONResponse:
+    """处理自定义异常（不包含data字段）"""
+    logger.warning(f"Custom exception: {e.err.code} - {e.err.cn_message}" +
+                (f" ({e.detail})" if e.detail else ""))
+
+    # 获取错误信息
+    error_response = e.err.as_dict(detail=e.detail, lang=_language(request))
+    return JSONResponse(status_code=200, content=error_response, headers=e.headers)
+
+async def _handle_validation_error(request: Request, e: RequestValidationError) -> JSONResponse:
+    """特殊处理422参数验证错误（不包含data字段）"""
+    # 提取验证错误的详细信息
+    validation_messages = []
+    for error in e.errors():
+        if "loc" in error and "msg" in error:
+            # 格式化错误信息
+            field = ".".join(str(part) for part in error["loc"] if part != "body")
+            validation_messages.append(f"{field}: {error['msg']}")
+
+    # 构建统一的422错误响应
+    error_message = "; ".join(validation_messages) if validation_messages else ""
+    error_response = CustomError.PARAM_VALIDATION_FAILED.as_dict(detail=error_message, lang=_language(request))
+    return JSONResponse(status_code=200, content=error_response)
+
+async def _handle_http_exception(request: Request, e: StarletteHTTPException) -> JSONResponse:
+    """处理路由不存在、方法不允许等HTTP错误"""
+    body_str = json.dumps({"detail": e.detail}, ensure_ascii=False, separators=(",", ":"))
+    logger.error(f"Non-200 response: {e.status_code} - {body_str}")
+    error_response = {
+        "code": e.status_code,
+        "message": f"HTTP Error {e.status_code}",
+        "data": {"detail": body_str}
+    }
+    return JSONResponse(status_code=200, content=error_response)
+
+def _handle_generic_exception(e: Exception, lang: str) -> JSONResponse:
+    """处理通用异常（不包含data字段）"""
+    logger.warning(f"Internal server error: {str(e)}")
+
+    # 获取错误信息
+    error_response = CustomError.INTERNAL_SERVER_ERROR.as_dict(detail=str(e), lang=lang)
+    return JSONResponse(status_code=200, content=error_response)
@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+
+
+class ProgressiveRecognizer:
+    """分块识别持续到达的音频
+    功能：
+    1. 缓冲的音频达到chunk_seconds后，在末尾search_seconds范围内能量最低处切分，尽量不把词切断
+    2. 每个块立即提交识别，识别与音频的接收（下载、解码）重叠进行
+    3. 各块的时间戳加上块起始偏移，拼接为全局时间轴
+    """
+
+    def __init__(self, recognize_fn, executor, chunk_seconds: float = 30, search_seconds: float = 2, sample_rate: int = 16000):
+        """
+        Args:
+            recognize_fn: 识别函数，输入音频数组，返回与model.generate相同格式的结果列表
+            executor: 执行识别的线程池
+            chunk_seconds: 每个块的最大时长（秒）
+            search_seconds: 在块末尾寻找切分点的范围（秒）
+            sample_rate: 输入音频采样率
+        """
+        self.recognize_fn = recognize_fn
+        self.executor = executor
+        self.sample_rate = sample_rate
+        self.chunk_samples = int(chunk_seconds * sample_rate)
+        self.search_samples = min(int(search_seconds * sample_rate), self.chunk_samples // 2)
+
+        self._buffer = []
+        self._buffered = 0
+        self._offset = 0
+        self._futures = []
+        self._lock = threading.Lock()
+
+    @property
+    def received_seconds(self) -> float:
+        return (self._offset + self._buffered) / self.sample_rate
+
+    def feed(self, samples: np.ndarray):
+        """追加音频，缓冲达到一个块时提交识别"""
+        with self._lock:
+            self._buffer.append(samples)
+            self._buffered += len(samples)
+            while self._buffered >= self.chunk_samples:
+                data = np.concatenate(self._buffer)
+                cut = self._quiet_point(data)
+                self._submit(data[:cut])
+                self._buffer = [data[cut:]]
+                self._buffered = len(data) - cut
+
+    def finish(self) -> list:
+        """
+        提交剩余音频并等待全部块识别完成
+
+        Returns:
+            result: 与model.generate相同格式的识别结果列表（单项）
+        """
+        with self._lock:
+            if self._buffered:
+                self._submit(np.concatenate(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+            futures = list(self._futures)
+
+        texts = []
+        timestamps = []
+        for start_ms, future in futures:
+            result = future.result()
+            item = result[0] if isinstance(result, list) and len(result) > 0 else {}
+            if item.get("text"):
+                texts.append(item["text"])
+            timestamps.extend([[ts[0] + start_ms, ts[1] + start_ms] + list(ts[2:]) for ts in item.get("timestamp", [])])
+        return [{"key": "progressive", "text": " ".join(texts), "timestamp": timestamps}]
+
+    def cancel(self):
+        """取消尚未开始的识别"""
+        with self._lock:
+            for _, future in self._futures:
+                future.cancel()
+            self._buffer = []
+            self._buffered = 0
+
+    def _submit(self, chunk: np.ndarray):
+        start_ms = self._offset * 1000 // self.sample_rate
+        self._futures.append((start_ms, self.executor.submit(self.recognize_fn, chunk)))
+        self._offset += len(chunk)
+
+    def _quiet_point(self, data: np.ndarray) -> int:
+        """在[chunk_samples - search_samples, chunk_samples)范围内按20ms帧找能量最低处"""
+        frame = max(self.sample_rate // 50, 1)
+        window_start = self.chunk_samples - self.search_samples
+        window = data[window_start:self.chunk_samples]
+        frames = len(window) // frame
+        if frames == 0:
+            return self.chunk_samples
+        energies = np.square(window[:frames * frame].reshape(frames, frame)).mean(axis=1)
+        return window_start + int(np.argmin(energies)) * frame + frame // 2
@@ -0,0 +1,298 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from logger import logger
+import metrics
+
+
+# 副本进程使用的识别模型（fork前设置，子进程以写时复制方式共享权重）
+_replica_model = None
+
+
+def _replica_main(conn, threads: int, cpus: list = None):
+    """副本进程主循环：接收 (request_id, inputs, kwargs)，返回 (request_id, ok, result)；inputs为None表示健康检查"""
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            # CPU集合无效时不绑定（副本进程中不写日志）
+            pass
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        request_id, inputs, kwargs = message
+        if inputs is None:
+            conn.send((request_id, True, None))
+            continue
+        try:
+            result = _replica_model.generate(input=inputs, **kwargs)
+            conn.send((request_id, True, result))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {str(e)}"))
+
+
+class ReplicaError(RuntimeError):
+    """副本进程推理失败或退出"""
+
+
+class _Replica:
+    """一个副本进程及其请求管道"""
+
+    def __init__(self, index: int, threads: int, context, cpus: list = None):
+        self.index = index
+        self.restarts = 0
+        self.requests = 0
+        self._threads = threads
+        self._cpus = cpus
+        self._context = context
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._spawn()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+
+    def oldest_seconds(self) -> float:
+        """最早的未完成推理请求已经执行的时间（秒），没有时返回0"""
+        with self._lock:
+            started = [sent for _, sent in self._pending.values() if sent is not None]
+        return time.monotonic() - min(started) if started else 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self._alive and self.process.is_alive()
+
+    def start_reader(self):
+        self._reader = threading.Thread(target=self._read, name=f"asr-replica-{self.index}-reader", daemon=True)
+        self._reader.start()
+
+    def send(self, request_id: int, inputs, kwargs: dict) -> Future:
+        future = Future()
+        with self._lock:
+            if not self._alive:
+                raise ReplicaError(f"replica {self.index} is not alive")
+            # 健康检查不记录发送时间，不计入请求超时
+            self._pending[request_id] = (future, time.monotonic() if inputs is not None else None)
+            try:
+                self.conn.send((request_id, inputs, kwargs))
+            except (BrokenPipeError, OSError) as e:
+                del self._pending[request_id]
+                self._alive = False
+                raise ReplicaError(f"replica {self.index} pipe broken: {str(e)}")
+            if inputs is not None:
+                self.requests += 1
+        return future
+
+    def restart(self):
+        """终止进程（如果还在运行），未完成的请求以ReplicaError结束，然后重新fork；期间副本不可用，请求分发给其它副本"""
+        self.stop(timeout=1.0)
+        self.restarts += 1
+        metrics.REPLICA_RESTARTS.inc()
+        self._spawn()
+        self.start_reader()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            self._alive = False
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self._reader.join(timeout=timeout)
+        self._fail_pending(f"replica {self.index} stopped")
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_replica_main, args=(child_conn, self._threads, self._cpus),
+                                        name=f"asr-replica-{self.index}", daemon=True)
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self.process = process
+            self.conn = parent_conn
+            self._alive = True
+
+    def _read(self):
+        conn = self.conn
+        while True:
+            try:
+                request_id, ok, result = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future, _ = self._pending.pop(request_id, (None, None))
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(ReplicaError(result))
+
+        # 管道关闭：进程已退出或被终止
+        with self._lock:
+            if conn is self.conn:
+                self._alive = False
+        self._fail_pending(f"replica {self.index} exited")
+
+    def _fail_pending(self, reason: str):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(ReplicaError(reason))
+
+
+class ReplicaPool:
+    """多进程模型副本池
+    功能：
+    1. 模型在父进程中加载一次，fork出多个副本进程，权重以写时复制方式共享
+    2. 请求分发给进行中请求最少的副本，接口与model.generate一致
+    3. 后台线程定期检查副本：进程退出、健康检查超时或某个请求执行超过request_timeout（卡住）的副本被终止并重新fork，
+       未完成的请求以ReplicaError结束；重启在锁外进行，期间请求分发给其它副本
+    4. 每个副本的torch线程数和绑定的CPU可配置，避免多个副本抢占CPU
+
+    注意：副本需要在其它后台线程启动之前创建（fork只复制当前线程）；重启副本时父进程中已有其它线程，
+    副本进程只执行推理，不使用日志等可能被其它线程持有锁的组件
+    """
+
+    def __init__(self, model, replicas: int, threads: int = 1, health_interval: float = 5.0, health_timeout: float = 10.0,
+                 cpu_sets: list = None, request_timeout: float = 0):
+        """
+        Args:
+            model: 已加载的识别模型
+            replicas: 副本进程数
+            threads: 每个副本的torch线程数，0表示不设置
+            health_interval: 健康检查间隔（秒）
+            health_timeout: 空闲副本响应健康检查的超时时间（秒）
+            cpu_sets: 每个副本进程绑定的CPU编号列表，None不绑定
+            request_timeout: 单个推理请求的最长执行时间（秒），超过时判定副本卡住并重启，0不限制
+        """
+        global _replica_model
+        _replica_model = model
+
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.request_timeout = request_timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        # 先fork全部副本，再启动父进程中的读取线程
+        context = multiprocessing.get_context("fork")
+        self._replicas = [_Replica(i, threads, context, cpu_sets[i] if cpu_sets else None) for i in range(replicas)]
+        for replica in self._replicas:
+            replica.start_reader()
+
+        self._monitor = threading.Thread(target=self._monitor_loop, name="asr-replica-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(f"Replica pool started, replicas: {replicas}, threads per replica: {threads}, cpu sets: {cpu_sets}")
+
+    @property
+    def size(self) -> int:
+        return len(self._replicas)
+
+    def generate(self, input, **kwargs):
+        """与model.generate一致：在负载最低的副本上执行推理并等待结果"""
+        return self.submit(input, **kwargs).result()
+
+    def submit(self, input, **kwargs) -> Future:
+        """把推理请求分发给进行中请求最少的存活副本"""
+        request_id = next(self._ids)
+        tried = set()
+        while True:
+            with self._lock:
+                candidates = [r for r in self._replicas if r.alive and r.index not in tried]
+                if not candidates:
+                    raise ReplicaError("no replica available")
+                replica = min(candidates, key=lambda r: r.inflight)
+            try:
+                return replica.send(request_id, input, kwargs)
+            except ReplicaError as e:
+                logger.warning(f"Dispatch to replica failed, try next: {str(e)}")
+                tried.add(replica.index)
+
+    def broadcast(self, input, **kwargs) -> list:
+        """在每个存活副本上各执行一次推理（用于预热），返回各副本的结果"""
+        futures = [replica.send(next(self._ids), input, kwargs) for replica in self._replicas if replica.alive]
+        return [future.result() for future in futures]
+
+    def alive_count(self) -> int:
+        return sum(1 for replica in self._replicas if replica.alive)
+
+    def restarts(self) -> int:
+        return sum(replica.restarts for replica in self._replicas)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._monitor.join(timeout=self.health_interval + 1)
+        for replica in self._replicas:
+            replica.stop()
+        logger.info("Replica pool stopped")
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [
+                {
+                    "index": replica.index,
+                    "pid": replica.process.pid,
+                    "alive": replica.alive,
+                    "inflight": replica.inflight,
+                    "requests": replica.requests,
+                    "restarts": replica.restarts,
+                }
+                for replica in self._replicas
+            ],
+            "alive": self.alive_count(),
+            "restarts": self.restarts(),
+        }
+
+    def _monitor_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            # 1. 空闲副本发送健康检查（忙碌的副本正在推理，无法及时响应）
+            pings = {}
+            for replica in self._replicas:
+                if replica.alive and replica.inflight == 0:
+                    try:
+                        pings[replica.index] = (replica.send(next(self._ids), None, None), replica.requests)
+                    except ReplicaError:
+                        pass
+
+            # 2. 进程已退出或健康检查超时的副本重启
+            deadline = time.monotonic() + self.health_timeout
+            for replica in self._replicas:
+                if self._stopped.is_set():
+                    return
+                healthy = replica.alive
+                if healthy and self.request_timeout > 0 and replica.oldest_seconds() > self.request_timeout:
+                    # 忙碌的副本不响应健康检查，按最早的请求执行时间判断是否卡住
+                    logger.warning(f"Replica {replica.index} request running over {self.request_timeout}s, treat as hung")
+                    healthy = False
+                if healthy and replica.index in pings:
+                    ping, requests = pings[replica.index]
+                    try:
+                        ping.result(timeout=max(deadline - time.monotonic(), 0))
+                    except Exception:
+                        # 健康检查之后又分发了请求时，副本可能只是在推理，不判定为异常
+                        healthy = replica.requests != requests
+                if not healthy:
+                    # 不持有池的锁：重启期间该副本不可用（alive为False），其它副本照常接收请求
+                    logger.warning(f"Replica {replica.index} (pid {replica.process.pid}) is unhealthy, restarting")
+                    replica.restart()
@@ -0,0 +1,31 @@
+import contextvars
+from typing import Any
+from fastapi.responses import JSONResponse
+from exceptions import CustomError
+
+
+# 当前请求的语言（由middlewares.ResponseMiddleware按Accept-Language设置）
+request_language = contextvars.ContextVar("request_language", default="zh")
+
+
+def parse_language(accept_language: str) -> str:
+    """从Accept-Language中取首选语言，只支持zh和en"""
+    lang = (accept_language or 'zh').split(',')[0].split('-')[0]
+    return lang if lang in ['zh', 'en'] else 'zh'
+
+
+class EnvelopeJSONResponse(JSONResponse):
+    """统一格式的JSON响应（应用的默认响应类）
+    功能：
+    1. 业务正常响应包装为 {code, message, data}，序列化只执行一次，不需要中间件读回响应体重新解析
+    2. 已经是统一格式（包含code和message）的内容原样输出
+    """
+
+    def render(self, content: Any) -> bytes:
+        if not (isinstance(content, dict) and 'code' in content and 'message' in content):
+            content = {
+                'code': CustomError.SUCCESS.code,
+                'message': CustomError.SUCCESS.as_dict(lang=request_language.get())['message'],
+                'data': content,
+            }
+        return super().render(content)
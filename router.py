@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Request
+import json
+from fastapi import APIRouter, Depends, Request, Query, Response, WebSocket
+from fastapi.responses import StreamingResponse
 from logger import logger
+from exceptions import CustomException, CustomError
+from responses import request_language
+import admission
+import files
+import live
 import schemas
 import service
+import startup
+import metrics
+import subtitles
+import jobs
 
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
-@router.post("/asr/text", response_model=schemas.AsrTextResponse)
+@router.post("/asr/text", response_model=schemas.AsrTextResponse, dependencies=[Depends(admission.admit)])
 def asr_text(asr: schemas.AsrTextRequest):
     """
     语音 -> 纯文本
@@ -19,11 +30,13 @@ def asr_text(asr: schemas.AsrTextRequest):
 
     return schemas.AsrTextResponse(text=text)
 
-@router.post("/asr/srt", response_model=schemas.AsrSrtResponse)
+@router.post("/asr/srt", response_model=schemas.AsrSrtResponse, dependencies=[Depends(admission.admit)])
 def asr_srt(asr: schemas.AsrSrtRequest):
     """
     语音 -> 字幕
     """
+    if asr.inline:
+        return schemas.AsrSrtResponse(**service.asr_srt_inline(audio_url=asr.audio_url))
 
     srt_url = service.asr_srt(
         audio_url=asr.audio_url,
@@ -32,21 +45,155 @@ def asr_srt(asr: schemas.AsrSrtRequest):
     logger.info(f"generate srt: {srt_url}")
     return schemas.AsrSrtResponse(srt_url=srt_url)
 
-@router.post("/asr/embed", response_model=schemas.AsrEmbedResponse)
+@router.post("/asr/bulk")
+def asr_bulk(asr: schemas.AsrBulkRequest, hold: admission.StreamHold = Depends(admission.admit_stream)):
+    """
+    批量语音 -> 字幕/纯文本，下载和识别流水线执行，每一项完成后立即以NDJSON（每行一个JSON）返回
+
+    每一项：{"index", "audio_url", "code", "message", "data": {"srt_url"} 或 {"text"}}，失败的项code为对应的错误码；
+    最后一行为汇总：{"done": true, "total", "succeeded", "failed", "elapsed_ms"}
+
+    整个批量请求在准入控制中占用一个执行位置直到最后一行返回（请求内的并发由BULK_*_CONCURRENCY限制）
+    """
+    lines = service.asr_bulk(audio_urls=asr.audio_urls, output=asr.output, lang=request_language.get())
+
+    return StreamingResponse(
+        hold.wrap(json.dumps(line, ensure_ascii=False) + "\n" for line in lines),
+        media_type="application/x-ndjson",
+    )
+
+@router.websocket("/asr/live")
+async def asr_live(
+    websocket: WebSocket,
+    interval_threshold: int = Query(default=subtitles.DEFAULT_INTERVAL_THRESHOLD, ge=0, description="断句时间间隔阈值（毫秒）"),
+):
+    """
+    实时语音识别（WebSocket）：客户端持续发送16kHz单声道16位PCM，服务端推送中间结果和确定的字幕条目，协议见live.serve
+    """
+    await live.serve(websocket, service.live_model, service.live_executor, interval_threshold)
+
+@router.post("/asr/embed", response_model=schemas.AsrEmbedResponse, dependencies=[Depends(admission.admit)])
 def asr_embed(request: Request, asr: schemas.AsrEmbedRequest):
     """
     视频（提取语音，识别字幕） -> 嵌入字幕
     """
 
     # 调用service层处理业务逻辑
-    embed_url = service.asr_embed(
+    result = service.asr_embed(
         video_url=asr.video_url,
+        burn_in=asr.burn_in,
+        preset=asr.preset,
+        threads=asr.threads,
     )
 
-    return schemas.AsrEmbedResponse(video_url=embed_url)
+    return schemas.AsrEmbedResponse(**result)
 
-# 健康检查端点
+@router.post("/transcripts", response_model=schemas.TranscriptResponse, dependencies=[Depends(admission.admit)])
+def create_transcript(asr: schemas.TranscriptRequest):
+    """
+    语音 -> 结构化识别结果，只识别一次，之后可按ID渲染多种字幕格式
+    """
+    transcript = service.create_transcript(audio_url=str(asr.audio_url))
+
+    return schemas.TranscriptResponse(
+        transcript_id=transcript.transcript_id,
+        text=transcript.text,
+        tokens=len(transcript.timestamps),
+        duration_ms=transcript.duration_ms,
+    )
+
+@router.get("/transcripts/{transcript_id}")
+def render_transcript(
+    transcript_id: str,
+    format: schemas.SubtitleFormat = Query(default="srt", description="字幕格式：srt / vtt / ass / txt / json"),
+    interval_threshold: int = Query(default=subtitles.DEFAULT_INTERVAL_THRESHOLD, ge=0, description="断句时间间隔阈值（毫秒）"),
+):
+    """
+    渲染识别结果为指定格式的字幕（不执行推理），直接返回字幕文件内容
+    """
+    content = service.render_transcript(transcript_id, format, interval_threshold)
+    media_type, extension = subtitles.FORMATS[format]
+
+    return Response(
+        content=content.encode("utf-8"),
+        media_type=media_type,
+        headers={"Content-Disposition": f'inline; filename="{transcript_id}{extension}"'},
+    )
+
+@router.post("/jobs/asr/text", response_model=schemas.JobSubmitResponse)
+def submit_asr_text_job(asr: schemas.AsrTextRequest):
+    """
+    异步任务：语音 -> 纯文本，立即返回任务ID
+
+    不经过准入控制：任务由固定数量（JOB_WORKERS）的工作线程执行，排队的任务数不超过JOB_MAX_PENDING（超过时返回JOB_QUEUE_FULL）
+    """
+    job = jobs.manager.submit("text", service.asr_text, audio_url=asr.audio_url)
+    return schemas.JobSubmitResponse(job_id=job.job_id, status=job.status)
+
+@router.post("/jobs/asr/srt", response_model=schemas.JobSubmitResponse)
+def submit_asr_srt_job(asr: schemas.AsrSrtRequest):
+    """
+    异步任务：语音 -> 字幕，立即返回任务ID
+
+    不经过准入控制：任务由固定数量（JOB_WORKERS）的工作线程执行，排队的任务数不超过JOB_MAX_PENDING（超过时返回JOB_QUEUE_FULL）
+    """
+    job = jobs.manager.submit("srt", service.asr_srt, audio_url=str(asr.audio_url))
+    return schemas.JobSubmitResponse(job_id=job.job_id, status=job.status)
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobStatusResponse)
+def get_job_status(job_id: str):
+    """
+    查询异步任务状态和进度
+    """
+    job = jobs.manager.get(job_id)
+    return schemas.JobStatusResponse(**job.as_dict())
+
+@router.get("/jobs/{job_id}/result", response_model=schemas.JobResultResponse)
+def get_job_result(job_id: str):
+    """
+    获取异步任务结果，任务失败时返回任务的错误码
+    """
+    job = jobs.manager.get(job_id)
+    if job.error is not None:
+        raise job.error
+    if not job.finished:
+        raise CustomException(CustomError.JOB_NOT_FINISHED, detail=job.stage)
+
+    if job.kind == "text":
+        return schemas.JobResultResponse(job_id=job.job_id, text=job.result)
+    return schemas.JobResultResponse(job_id=job.job_id, srt_url=job.result)
+
+@router.get("/files/{kind}/{name}", summary="下载输出文件")
+def download_file(request: Request, kind: str, name: str):
+    """
+    下载生成的字幕（kind=srt）或视频（kind=video）文件，支持ETag/If-None-Match（304）、gzip和Range
+    """
+    return files.serve(request, kind, name)
+
+# 运行统计端点
+@router.get("/stats", summary="运行统计")
+def stats():
+    """查看批处理等组件的运行统计"""
+    return service.stats()
+
+# Prometheus指标端点
+@router.get("/metrics", summary="Prometheus指标")
+def metrics_endpoint():
+    """各处理阶段耗时、下载吞吐、实时率、队列深度等指标（Prometheus文本格式）"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# 健康检查端点（存活检查，进程启动后立即可用）
 @router.get("/health", summary="健康检查")
 def health_check():
     """检查服务是否正常运行"""
-    return {"code": 0, "message": "AutoSubRT Service is running"}
\ No newline at end of file
+    return {"code": 0, "message": "AutoSubRT Service is running"}
+
+# 就绪检查端点
+@router.get("/ready", summary="就绪检查")
+def readiness_check(response: Response):
+    """模型加载和预热完成后返回200，否则返回503；data中包含启动状态（loading/warming/ready/failed）和各步骤耗时"""
+    state = startup.state.snapshot()
+    if state["ready"]:
+        return state
+    response.status_code = 503
+    return {**CustomError.MODEL_NOT_READY.as_dict(detail=state["status"], lang=request_language.get()), "data": state}
\ No newline at end of file
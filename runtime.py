@@ -0,0 +1,224 @@
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logger import logger
+
+
+# CPU绑定方式：不绑定 / 按槽位数平均分配可用CPU
+AFFINITY_NONE = ""
+AFFINITY_AUTO = "auto"
+
+
+class RuntimeSettings:
+    """推理运行时配置（在service.load_model中应用）
+    功能：
+    1. intra_op_threads：每次推理的torch算子内线程数，0使用torch默认值（全部CPU核）
+    2. inter_op_threads：torch算子间并行线程数，0使用默认值（只能在进程第一次并行计算之前设置）
+    3. slots：同时执行推理的槽位数，0不限制（请求线程直接调用模型，多个并发推理各自使用全部CPU核，互相抢占）
+    4. affinity：槽位绑定的CPU，空不绑定，auto按槽位数平均分配可用CPU，或按槽位用分号分隔的CPU列表（如 "0-3;4-7"）
+    """
+
+    def __init__(self, intra_op_threads: int = 0, inter_op_threads: int = 0, slots: int = 0, affinity: str = AFFINITY_NONE):
+        self.intra_op_threads = max(0, int(intra_op_threads))
+        self.inter_op_threads = max(0, int(inter_op_threads))
+        self.slots = max(0, int(slots))
+        self.affinity = (affinity or AFFINITY_NONE).strip()
+
+    @classmethod
+    def from_config(cls) -> "RuntimeSettings":
+        """按环境变量创建，设置了RUNTIME_PROFILE时使用autotune生成的配置"""
+        import config
+        if config.RUNTIME_PROFILE:
+            return cls.load(config.RUNTIME_PROFILE)
+        return cls(config.INFERENCE_INTRA_OP_THREADS, config.INFERENCE_INTER_OP_THREADS, config.INFERENCE_SLOTS, config.INFERENCE_AFFINITY)
+
+    @classmethod
+    def load(cls, path: str) -> "RuntimeSettings":
+        """读取autotune生成的配置文件"""
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        return cls(profile.get("intra_op_threads", 0), profile.get("inter_op_threads", 0),
+                   profile.get("slots", 0), profile.get("affinity", AFFINITY_NONE))
+
+    def save(self, path: str, extra: dict = None):
+        """写入配置文件，extra（例如测量结果）一并保存，读取时忽略"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**self.as_dict(), **(extra or {})}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    def as_dict(self) -> dict:
+        return {
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "slots": self.slots,
+            "affinity": self.affinity,
+        }
+
+    def cpu_sets(self, count: int = None) -> list:
+        """
+        每个槽位（或副本进程）绑定的CPU集合
+
+        Args:
+            count: 槽位数，默认slots
+
+        Returns:
+            cpu_sets: 长度为count的CPU编号列表的列表，不绑定时返回None
+        """
+        count = self.slots if count is None else count
+        if count <= 0 or self.affinity == AFFINITY_NONE:
+            return None
+        if self.affinity == AFFINITY_AUTO:
+            return split_cpus(available_cpus(), count)
+        groups = [sorted(parse_cpu_list(group)) for group in self.affinity.split(";") if group.strip()]
+        # 列表比槽位少时循环使用
+        return [groups[i % len(groups)] for i in range(count)]
+
+    def __repr__(self) -> str:
+        return f"RuntimeSettings({', '.join(f'{key}={value!r}' for key, value in self.as_dict().items())})"
+
+
+def available_cpus() -> list:
+    """当前进程可以使用的CPU编号（容器或taskset限制后的集合）"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def parse_cpu_list(text: str) -> set:
+    """解析CPU列表，格式同taskset -c，如 "0-3,8,10-11" """
+    cpus = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    if not cpus:
+        raise ValueError(f"empty CPU list: {text!r}")
+    return cpus
+
+def split_cpus(cpus: list, count: int) -> list:
+    """CPU按编号顺序分成count组连续的集合（相邻编号通常在同一个物理核/NUMA节点上），CPU比组少时每组一个、循环使用"""
+    if count >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(count)]
+    size, extra = divmod(len(cpus), count)
+    groups, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+def apply_process(settings: RuntimeSettings):
+    """设置进程级的torch线程数，需要在加载模型之前调用"""
+    if not settings.intra_op_threads and not settings.inter_op_threads:
+        return
+    try:
+        import torch
+    except ImportError:
+        logger.warning("torch not installed, inference thread settings ignored")
+        return
+    if settings.intra_op_threads:
+        torch.set_num_threads(settings.intra_op_threads)
+    if settings.inter_op_threads:
+        try:
+            torch.set_interop_threads(settings.inter_op_threads)
+        except RuntimeError as e:
+            # 进程中已经执行过并行计算时不能再修改
+            logger.warning(f"Set torch inter-op threads failed: {str(e)}")
+    logger.info(f"Inference runtime applied: {settings}")
+
+def pin_thread(cpus: list):
+    """当前线程绑定到指定CPU（Linux按线程生效，之后由该线程创建的OpenMP线程继承）"""
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Set CPU affinity {cpus} failed: {str(e)}")
+
+def _init_slot(threads: int, cpus: list):
+    """槽位线程初始化：先绑定CPU，再设置线程数（OpenMP线程数按调用线程生效）"""
+    if cpus:
+        pin_thread(cpus)
+    if threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+class InferenceSlots:
+    """固定数量的推理槽位，限制服务进程内同时执行的推理数
+    功能：
+    1. 每个槽位是一个常驻线程，推理在空闲槽位的线程中执行，调用方等待结果；接口与model.generate一致
+    2. 槽位线程可以绑定到各自的CPU集合，每个槽位的torch线程数默认等于绑定的CPU数，多个推理不再争抢同一批CPU
+    3. 所有槽位都在推理时新请求等待，而不是同时启动更多推理
+    """
+
+    def __init__(self, model, slots: int, threads: int = 0, cpu_sets: list = None):
+        """
+        Args:
+            model: 已加载的识别模型
+            slots: 槽位数
+            threads: 每个槽位的torch线程数，0时绑定CPU的槽位使用绑定的CPU数，否则不设置
+            cpu_sets: 每个槽位绑定的CPU编号列表，None不绑定
+        """
+        self.model = model
+        self._executors = []
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._requests = 0
+        self._cpu_sets = cpu_sets or [None] * slots
+        for i in range(slots):
+            cpus = self._cpu_sets[i]
+            slot_threads = threads or (len(cpus) if cpus else 0)
+            self._executors.append(ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"asr-slot-{i}",
+                                                      initializer=_init_slot, initargs=(slot_threads, cpus)))
+            self._free.put(i)
+        logger.info(f"Inference slots started, slots: {slots}, threads per slot: {threads or 'per cpu set'}, cpu sets: {cpu_sets}")
+
+    @property
+    def size(self) -> int:
+        return len(self._executors)
+
+    def busy(self) -> int:
+        """正在推理的槽位数"""
+        return self._busy
+
+    def generate(self, input, **kwargs):
+        """在空闲槽位中推理，没有空闲槽位时等待"""
+        index = self._free.get()
+        with self._lock:
+            self._busy += 1
+            self._requests += 1
+        try:
+            return self._executors[index].submit(self.model.generate, input=input, **kwargs).result()
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._free.put(index)
+
+    def broadcast(self, input, **kwargs) -> list:
+        """在每个槽位上各执行一次推理（用于预热各槽位线程的算子和线程池），返回各槽位的结果"""
+        futures = [executor.submit(self.model.generate, input=input, **kwargs) for executor in self._executors]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        logger.info("Inference slots stopped")
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.size,
+            "busy": self._busy,
+            "requests": self._requests,
+            "cpu_sets": self._cpu_sets,
+        }
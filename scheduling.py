@@ -0,0 +1,158 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+
+# 调度策略：先来先服务 / 短作业优先（带老化）
+POLICY_FIFO = "fifo"
+POLICY_SJF = "sjf"
+
+# 默认通道（未设置通道或关闭分通道时使用）
+DEFAULT_LANE = "default"
+
+# 当前请求所属的通道（由service按接口设置，例如text/srt）
+request_lane = contextvars.ContextVar("request_lane", default=DEFAULT_LANE)
+
+
+def in_lane(lane: str):
+    """装饰器：函数执行期间提交的推理请求进入指定通道"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            token = request_lane.set(lane)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                request_lane.reset(token)
+        return wrapper
+    return decorator
+
+
+class RequestQueue:
+    """推理请求调度队列（接口与queue.Queue的put/get/qsize一致）
+    功能：
+    1. fifo：按入队顺序出队
+    2. sjf：按作业大小（音频时长，秒）从小到大出队，并按等待时间老化：
+       优先级 = 时长 - aging * 已等待秒数，等价于按 时长 + aging * 入队时间 排序，排序键在入队后不再变化，用堆实现。
+       aging=1时，等待了10秒的请求优先于比它长不到10秒的新请求，长音频不会一直被插队
+    3. 分通道（lanes=True）时每个通道一个队列，通道之间按已调度的音频时长公平分配：总是从已调度时长最少的非空通道出队，
+       一个接口的大量请求（或长音频）不会占满另一个接口的推理时间
+    4. put(None) 表示停止：已入队的请求全部出队后get返回None
+    """
+
+    def __init__(self, policy: str = POLICY_SJF, aging: float = 1.0, lanes: bool = False):
+        """
+        Args:
+            policy: fifo / sjf
+            aging: 每等待1秒抵消的作业时长（秒），只在sjf策略下使用
+            lanes: 是否按通道分别排队、轮流出队
+        """
+        if policy not in (POLICY_FIFO, POLICY_SJF):
+            raise ValueError(f"unknown scheduling policy: {policy}")
+        self.policy = policy
+        self.aging = max(0.0, float(aging))
+        self.lanes = lanes
+
+        self._heaps = {}
+        # 每个通道已调度的音频时长（秒）
+        self._served = {}
+        # 最近一次出队的请求所在的通道（只有一个消费者线程，由它在get之后读取）
+        self.last_lane = None
+        self._size = 0
+        self._closed = False
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def put(self, item, cost: float = None, lane: str = None):
+        """
+        入队
+
+        Args:
+            item: 请求，None表示停止
+            cost: 作业大小（音频时长，秒），未知时按0处理
+            lane: 通道名称，未指定时使用当前请求的通道
+        """
+        with self._condition:
+            if item is None:
+                self._closed = True
+                self._condition.notify_all()
+                return
+
+            sequence = next(self._sequence)
+            if self.policy == POLICY_SJF:
+                key = (cost or 0.0) + self.aging * time.monotonic()
+            else:
+                key = sequence
+            lane = (lane or request_lane.get()) if self.lanes else DEFAULT_LANE
+            heap = self._heaps.setdefault(lane, [])
+            if not heap:
+                # 空闲后重新有请求的通道从当前最少的已调度时长开始计，不累积空闲期间的额度
+                busy = [self._served[name] for name, other in self._heaps.items() if other]
+                self._served[lane] = max(self._served.get(lane, 0.0), min(busy, default=0.0))
+            heapq.heappush(heap, (key, sequence, cost or 0.0, item))
+            self._size += 1
+            self._condition.notify()
+
+    def get(self, timeout: float = None, lane: str = None):
+        """
+        按调度策略出队
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+            lane: 只从指定通道出队（组批时让同一批的请求来自同一个通道），None表示选择已调度时长最少的通道
+
+        Returns:
+            item: 请求；已停止且队列为空时返回None
+
+        Raises:
+            queue.Empty: 超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._available(lane) == 0:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._condition.wait(remaining)
+            return self._pop(lane)
+
+    def get_nowait(self, lane: str = None):
+        return self.get(timeout=0, lane=lane)
+
+    def qsize(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "policy": self.policy,
+                "aging": self.aging,
+                "lanes": {lane: {"queued": len(heap), "served_seconds": round(self._served.get(lane, 0.0), 3)}
+                          for lane, heap in self._heaps.items()},
+            }
+
+    def _available(self, lane: str = None) -> int:
+        if lane is None or not self.lanes:
+            return self._size
+        return len(self._heaps.get(lane, ()))
+
+    def _pop(self, lane: str = None):
+        if lane is None or not self.lanes:
+            busy = [name for name, heap in self._heaps.items() if heap]
+            if not busy:
+                raise queue.Empty
+            lane = min(busy, key=self._served.__getitem__)
+        heap = self._heaps.get(lane)
+        if not heap:
+            raise queue.Empty
+        _, _, cost, item = heapq.heappop(heap)
+        self._served[lane] += cost
+        self._size -= 1
+        self.last_lane = lane
+        return item
@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, Field, HttpUrl
 
 
@@ -12,15 +13,64 @@ class AsrTextResponse(BaseModel):
 class AsrSrtRequest(BaseModel):
     """语音 -> 字幕请求参数"""
     audio_url: HttpUrl = Field(..., description="音频文件URL")
+    inline: bool = Field(default=False, description="是否直接在响应中返回字幕内容（不写文件，不需要再下载），字幕过大时仍返回srt_url")
 
 class AsrSrtResponse(BaseModel):
     """语音 -> 字幕响应参数"""
     srt_url: str = Field(default="", description="字幕文件URL")
+    srt: str = Field(default="", description="字幕内容（inline时）")
+
+class AsrBulkRequest(BaseModel):
+    """批量语音识别请求参数"""
+    audio_urls: list[str] = Field(..., description="音频文件URL列表，单个URL无效只影响对应的一项")
+    output: Literal["srt", "text"] = Field(default="srt", description="每一项的结果：srt（字幕文件URL）/ text（纯文本）")
 
 class AsrEmbedRequest(BaseModel):
     """视频（提取语音，识别字幕） -> 嵌入字幕请求参数"""
     video_url: str = Field(default="", description="视频文件URL")
+    burn_in: bool = Field(default=False, description="是否烧录硬字幕（重新编码，耗时较长），默认封装软字幕")
+    preset: Literal["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"] | None = Field(default=None, description="硬字幕编码预设")
+    threads: int | None = Field(default=None, ge=0, description="硬字幕编码线程数，0表示自动")
 
 class AsrEmbedResponse(BaseModel):
     """视频（提取语音，识别字幕） -> 嵌入字幕响应参数"""
     video_url: str = Field(default="", description="视频文件URL")
+    srt_url: str = Field(default="", description="字幕文件URL")
+    timings: dict[str, float] = Field(default_factory=dict, description="各阶段耗时（毫秒）：download / demux / asr / subtitle / mux或encode / total，边下载边识别时asr为下载完成后剩余的识别耗时")
+
+class JobSubmitResponse(BaseModel):
+    """异步任务提交响应参数"""
+    job_id: str = Field(default="", description="任务ID")
+    status: str = Field(default="", description="任务状态")
+
+class JobStatusResponse(BaseModel):
+    """异步任务状态响应参数"""
+    job_id: str = Field(default="", description="任务ID")
+    kind: str = Field(default="", description="任务类型：text / srt")
+    status: str = Field(default="", description="任务状态：queued / running / succeeded / failed")
+    stage: str = Field(default="", description="处理阶段：queued / downloading / recognizing / writing / succeeded / failed")
+    progress: float = Field(default=0.0, description="处理进度，0~1")
+    created_at: float = Field(default=0.0, description="创建时间（Unix时间戳）")
+    updated_at: float = Field(default=0.0, description="更新时间（Unix时间戳）")
+    finished_at: float | None = Field(default=None, description="完成时间（Unix时间戳）")
+    error_code: int | None = Field(default=None, description="失败时的错误码")
+
+class JobResultResponse(BaseModel):
+    """异步任务结果响应参数"""
+    job_id: str = Field(default="", description="任务ID")
+    text: str = Field(default="", description="纯文本（text任务）")
+    srt_url: str = Field(default="", description="字幕文件URL（srt任务）")
+
+class TranscriptRequest(BaseModel):
+    """语音 -> 结构化识别结果请求参数"""
+    audio_url: HttpUrl = Field(..., description="音频文件URL")
+
+class TranscriptResponse(BaseModel):
+    """语音 -> 结构化识别结果响应参数"""
+    transcript_id: str = Field(default="", description="识别结果ID，用于渲染字幕")
+    text: str = Field(default="", description="纯文本")
+    tokens: int = Field(default=0, description="时间戳（词）数量")
+    duration_ms: int = Field(default=0, description="最后一个词的结束时间（毫秒）")
+
+# 可渲染的字幕格式
+SubtitleFormat = Literal["srt", "vtt", "ass", "txt", "json"]
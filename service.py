@@ -1,22 +1,303 @@
-from funasr import AutoModel
 from logger import logger
 from exceptions import CustomException, CustomError
+import functools
 import traceback
+import time
+from contextlib import contextmanager
+from batcher import BatchScheduler
+from bulk import BulkPipeline
+from cache import ResultCache
+from singleflight import SingleFlight
+from longaudio import LongAudioPipeline
+from replicas import ReplicaPool
+from runtime import InferenceSlots, RuntimeSettings
+from scheduling import in_lane
+from transcripts import Transcript, TranscriptStore
+from progressive import ProgressiveRecognizer
+from concurrent.futures import ThreadPoolExecutor
+import admission
+import audio as audio_decoder
+import backends
+import files
 import helper
+import jobs
+import metrics
+import numpy as np
+import startup
+import storage
 import pysrt
+import runtime
+import subtitles
+import video
 import config
 import os
 
 
+# 模型名称
+MODEL_NAME = "paraformer-zh"
+# 实时识别使用的流式模型名称
+LIVE_MODEL_NAME = "paraformer-zh-streaming"
+# 识别结果缓存键的前缀：不同推理后端的结果可能略有差异，非默认后端单独缓存
+CACHE_KEY_PREFIX = MODEL_NAME if config.INFERENCE_BACKEND == backends.BACKEND_TORCH else f"{MODEL_NAME}.{config.INFERENCE_BACKEND}"
+
 # 加载模型（只加载一次）
 model = None
+# 多进程模型副本池（MODEL_REPLICAS<=0 时不启用，在服务进程内推理）
+replica_pool = None
+# 推理运行时配置（线程数、CPU绑定、槽位数），加载模型时确定
+runtime_settings = None
+# 服务进程内的推理槽位（未启用副本池且INFERENCE_SLOTS>0时启用）
+inference_slots = None
+# 批量推理调度器（BATCH_MAX_SIZE<=1 时不启用）
+batcher = None
+# 识别结果缓存（asr_text和asr_srt共用）
+result_cache = None
+# 长音频VAD切分+多进程并行识别（LONG_AUDIO_WORKERS<=0 时不启用）
+long_audio = None
+# 视频边下载边识别的分块识别线程池（EMBED_STREAM_DEMUX关闭时不启用）
+stream_executor = None
+# 实时识别的流式模型和识别线程池（LIVE_ASR_ENABLED关闭时不启用）
+live_model = None
+live_executor = None
+# 识别结果存储，按ID渲染不同格式的字幕
+transcript_store = TranscriptStore(max_items=config.TRANSCRIPT_MAX_ITEMS, ttl=config.TRANSCRIPT_TTL)
+# 相同URL的下载、相同内容的识别合并执行
+download_flight = SingleFlight("download")
+recognize_flight = SingleFlight("recognize")
+
+# 队列深度在采集/metrics时读取，不在请求路径上维护
+metrics.QUEUE_DEPTH.labels("batcher").set_function(lambda: batcher.qsize() if batcher is not None else 0)
+metrics.QUEUE_DEPTH.labels("jobs").set_function(lambda: jobs.manager.stats()["pending"] if jobs.manager is not None else 0)
+metrics.READY.set_function(lambda: 1 if startup.state.ready else 0)
+metrics.INFERENCE_SLOTS_BUSY.set_function(lambda: inference_slots.busy() if inference_slots is not None else 0)
+metrics.REPLICAS_ALIVE.set_function(lambda: replica_pool.alive_count() if replica_pool is not None else 0)
+
+def download_audio(audio_url: str, timeout: float = None, limit: int = 30*1024*1024, download_timeout: float = 180, memory_limit: int = None) -> helper.DownloadResult:
+    """
+    下载音频文件，相同（规范化后）URL且大小限制相同的并发下载只执行一次
+    （大小限制或内存上限不同的请求各自下载，避免拿到不符合自己限制的结果）
+
+    Args:
+        audio_url: 音频URL
+        timeout: 等待其它请求下载结果的超时时间（秒），默认COALESCE_WAIT_TIMEOUT
+        limit: 文件大小限制（字节），默认30MB
+        download_timeout: 整体下载超时时间（秒），默认3分钟
+        memory_limit: 不超过该大小的文件只保存在内存中，默认AUDIO_INMEMORY_MAX_BYTES
+
+    Returns:
+        DownloadResult: 下载结果（调用方持有一个引用，使用结束后需要release）
+
+    Raises:
+        CustomException: 自定义异常
+    """
+    if memory_limit is None:
+        memory_limit = config.AUDIO_INMEMORY_MAX_BYTES
+    # 合并的下载由多个请求共享，下载超时不按某一个请求的截止时间缩短；各请求等待结果时按自己的截止时间放弃
+    admission.check_deadline("download")
+    with metrics.stage("download"):
+        return download_flight.do(
+            f"{helper.normalize_url(audio_url)}|{limit}|{memory_limit}",
+            lambda: _download_file(audio_url, limit=limit, timeout=download_timeout, memory_limit=memory_limit),
+            timeout=timeout or config.COALESCE_WAIT_TIMEOUT,
+            # 结果发布之前为每个等待的请求各增加一个引用，任何一个请求结束都不会提前删除其它请求正在使用的文件
+            share=lambda result, count: result.acquire(count),
+        )
+
+def _download_file(url: str, **kwargs) -> helper.DownloadResult:
+    """下载文件到TEMP_DIR并记录下载量和吞吐"""
+    started = time.perf_counter()
+    result = helper.download_file(url, config.TEMP_DIR, **kwargs)
+    elapsed = time.perf_counter() - started
+    metrics.DOWNLOAD_BYTES.inc(result.size)
+    if elapsed > 0:
+        metrics.DOWNLOAD_THROUGHPUT.observe(result.size / elapsed)
+    return result
+
+@contextmanager
+def use_audio(audio_url: str, **kwargs):
+    """
+    下载音频并在使用结束后（包括异常）清理临时文件
+
+    Args:
+        audio_url: 音频URL
+        kwargs: 下载参数，见download_audio
+
+    Yields:
+        DownloadResult: 下载结果
+    """
+    # 合并下载时多个请求共享同一个结果，最后一个释放引用的请求删除临时文件
+    audio = download_audio(audio_url, **kwargs)
+    try:
+        yield audio
+    finally:
+        if audio.release() and audio.path and os.path.exists(audio.path):
+            os.remove(audio.path)
+
+def _model_input(audio: helper.DownloadResult):
+    """
+    生成模型输入：内存中的音频解码为16kHz单声道数组，磁盘上的音频直接使用文件路径
+    （启用长音频流水线时同样解码，以便按时长选择识别方式）
+
+    解码失败（例如moov在文件末尾的mp4无法从管道读取）时写入临时文件，交给模型自行读取
+    """
+    if audio.data is None:
+        if long_audio is None:
+            return audio.path
+        try:
+            with metrics.stage("decode"):
+                return audio_decoder.decode_audio(audio.path)
+        except Exception as e:
+            logger.warning(f"Decode audio file failed, error: {str(e)}")
+            return audio.path
+    try:
+        with metrics.stage("decode"):
+            return audio_decoder.decode_audio(audio.data)
+    except Exception as e:
+        logger.warning(f"Decode audio in memory failed, spill to disk, error: {str(e)}")
+        with audio.lock:
+            if audio.path is None:
+                audio.path = helper.spill(audio.data, config.TEMP_DIR)
+        return audio.path
+
+def recognize(audio_input, audio_seconds: float = None):
+    """
+    执行语音识别，启用批处理时通过调度器与其它请求合并推理
+
+    Args:
+        audio_input: 模型输入（音频文件路径或16kHz单声道音频数组）
+        audio_seconds: 音频时长（秒），调度器按它排序（sjf），未知时按文件大小估算
+
+    Returns:
+        result: 与model.generate相同格式的识别结果列表
+    """
+    if batcher is not None:
+        cost = audio_seconds if audio_seconds is not None else _estimate_seconds(audio_input)
+        try:
+            return [batcher.submit(audio_input, deadline=admission.request_deadline.get(), cost=cost)]
+        except TimeoutError:
+            raise CustomException(CustomError.DEADLINE_EXCEEDED, detail="batch")
+    return _engine().generate(input=audio_input)
+
+def recognize_input(audio_input):
+    """
+    执行语音识别，超过LONG_AUDIO_MIN_SECONDS的音频数组走长音频流水线
+
+    Args:
+        audio_input: 模型输入（音频文件路径或16kHz单声道音频数组）
+
+    Returns:
+        result: 与model.generate相同格式的识别结果列表
+    """
+    # 推理之前检查截止时间，已经超时的请求不再占用模型
+    admission.check_deadline("inference")
+    audio_seconds = _input_seconds(audio_input)
+    with metrics.stage("inference") as t:
+        if long_audio is not None and not isinstance(audio_input, str) \
+                and len(audio_input) >= config.LONG_AUDIO_MIN_SECONDS * audio_decoder.SAMPLE_RATE:
+            result = long_audio.recognize(audio_input)
+        else:
+            result = recognize(audio_input, audio_seconds)
+
+    if audio_seconds:
+        metrics.AUDIO_SECONDS.observe(audio_seconds)
+        metrics.INFERENCE_RTF.observe(t.seconds / audio_seconds)
+    return result
+
+def _input_seconds(audio_input) -> float:
+    """模型输入的音频时长（秒）：音频数组直接计算，文件路径从容器头部读取（不解码），无法识别时返回None"""
+    if not isinstance(audio_input, str):
+        return len(audio_input) / audio_decoder.SAMPLE_RATE
+    return audio_decoder.probe_duration(audio_input)
+
+def _estimate_seconds(audio_input) -> float:
+    """时长未知的音频文件按128kbps估算时长（秒）"""
+    try:
+        return os.path.getsize(audio_input) / (128000 / 8)
+    except (OSError, TypeError):
+        return None
+
+def _generate_batch(inputs: list) -> list:
+    """批量推理，一次generate调用处理多个输入"""
+    return _engine().generate(input=inputs, batch_size=len(inputs))
+
+def _engine():
+    """执行推理的对象：启用副本池时为副本池，启用推理槽位时为槽位（接口都与model.generate一致），否则为本进程的模型"""
+    # 后台加载模型期间，请求最多等待MODEL_READY_WAIT_SECONDS
+    if model is None and not startup.wait(config.MODEL_READY_WAIT_SECONDS):
+        raise CustomException(CustomError.MODEL_NOT_READY, detail=startup.state.status)
+    if replica_pool is not None:
+        return replica_pool
+    return inference_slots if inference_slots is not None else model
+
+def recognize_audio(audio: helper.DownloadResult, timeout: float = None):
+    """
+    识别下载的音频，先按内容哈希查结果缓存，未命中才解码并执行推理，
+    相同内容的并发识别只执行一次
+
+    Args:
+        audio: 下载结果
+        timeout: 等待其它请求识别结果的超时时间（秒），默认COALESCE_WAIT_TIMEOUT
+
+    Returns:
+        (text, timestamps)，识别结果为空时返回(None, None)
+    """
+    return recognize_cached(audio.sha256, lambda: _model_input(audio), timeout=timeout)
+
+def recognize_cached(digest: str, make_input, timeout: float = None):
+    """
+    按内容哈希查结果缓存，未命中才生成模型输入并执行推理，相同内容的并发识别只执行一次
 
-def asr_text(audio_url: str) -> str:
+    Args:
+        digest: 输入内容的SHA-256，为空时不使用缓存
+        make_input: 生成模型输入的无参函数（只在需要推理时调用）
+        timeout: 等待其它请求识别结果的超时时间（秒），默认COALESCE_WAIT_TIMEOUT
+
+    Returns:
+        (text, timestamps)，识别结果为空时返回(None, None)
+    """
+    # 1. 查缓存
+    key = f"{CACHE_KEY_PREFIX}-{digest}" if digest else None
+    if key and result_cache is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            logger.info(f"ASR cache hit, key: {key}")
+            return cached
+
+    if key is None:
+        return extract_asr_result(recognize_input(make_input()))
+
+    # 合并的识别在没有截止时间的上下文中执行，推理之前检查的是当前请求自己的截止时间
+    admission.check_deadline("inference")
+
+    def run():
+        # 2. 执行推理
+        text, timestamps = extract_asr_result(recognize_input(make_input()))
+
+        # 3. 写缓存
+        if result_cache is not None and text is not None:
+            result_cache.put(key, text, timestamps)
+        return text, timestamps
+
+    return recognize_flight.do(key, run, timeout=timeout or config.COALESCE_WAIT_TIMEOUT)
+
+# 处理阶段（异步任务通过on_stage回调上报）
+STAGE_DOWNLOADING = "downloading"
+STAGE_RECOGNIZING = "recognizing"
+STAGE_WRITING = "writing"
+
+def _report_stage(on_stage, stage: str, progress: float):
+    """上报处理阶段和进度"""
+    if on_stage is not None:
+        on_stage(stage, progress)
+
+@in_lane("text")
+def asr_text(audio_url: str, on_stage=None) -> str:
     """
     语音 -> 纯文本
     
     Args:
         audio_url: 音频URL
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
     
     Returns:
         text: 纯文本
@@ -26,14 +307,15 @@ def asr_text(audio_url: str) -> str:
     """
     try:
         # 1. 下载音频文件
-        audio_file = helper.download(audio_url, config.TEMP_DIR)
-
-        # 2. 执行音频转文本
-        result = model.generate(input=audio_file)
+        _report_stage(on_stage, STAGE_DOWNLOADING, 0.0)
+        with use_audio(audio_url) as audio:
+            # 2. 执行音频转文本
+            _report_stage(on_stage, STAGE_RECOGNIZING, 0.3)
+            text, _ = recognize_audio(audio)
         
         # 3. 提取文本结果
-        if isinstance(result, list) and len(result) > 0 and "text" in result[0]:
-            text = result[0]["text"]
+        _report_stage(on_stage, STAGE_WRITING, 0.9)
+        if text is not None:
             logger.info(f"ASR text success, text length: {len(text)}")
             return text
         else:
@@ -47,12 +329,14 @@ def asr_text(audio_url: str) -> str:
         logger.error(f"ASR process failed: {str(e)}, detail: {traceback.format_exc()}")
         raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
 
-def asr_srt(audio_url: str) -> str:
+@in_lane("srt")
+def asr_srt(audio_url: str, on_stage=None) -> str:
     """
     语音 -> 字幕（提取视频文案）
     
     Args:
         audio_url: 音频URL
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
     
     Returns:
         srt_url: 字幕URL
@@ -61,51 +345,556 @@ def asr_srt(audio_url: str) -> str:
         CustomException: 自定义异常
     """
     # 1. 下载音频文件
-    audio_file = helper.download(audio_url, config.TEMP_DIR)
+    _report_stage(on_stage, STAGE_DOWNLOADING, 0.0)
+    with use_audio(audio_url) as audio:
+        # 2. 生成srt文件名
+        srt_file = storage.manager.output_path("srt", ".srt")
 
-    # 2. 生成srt文件名
-    srt_file = os.path.join(config.SRT_OUTPUT_DIR, helper.gen_unique_id() + ".srt")
-
-    # 3. 执行音频转srt格式文件
-    process_audio_to_srt(audio_file, srt_file)
+        # 3. 执行音频转srt格式文件
+        _report_stage(on_stage, STAGE_RECOGNIZING, 0.3)
+        process_audio_to_srt(audio, srt_file, on_stage=on_stage)
     logger.info(f"Process audio to srt success, srt_file: {srt_file}")
 
     # 4. 生成下载路径
     return gen_download_url(srt_file)
 
-def asr_embed(video_url: str) -> str:
+@in_lane("srt")
+def asr_srt_inline(audio_url: str, on_stage=None) -> dict:
+    """
+    语音 -> 字幕，字幕内容直接返回（不写文件，客户端不需要再下载）；超过SRT_INLINE_MAX_BYTES时仍写文件返回URL
+
+    Args:
+        audio_url: 音频URL
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
+
+    Returns:
+        result: {"srt": 字幕内容} 或 {"srt_url": 字幕URL}
+
+    Raises:
+        CustomException: 自定义异常
+    """
+    # 1. 下载音频文件
+    _report_stage(on_stage, STAGE_DOWNLOADING, 0.0)
+    with use_audio(audio_url) as audio:
+        # 2. 执行识别并生成字幕内容
+        _report_stage(on_stage, STAGE_RECOGNIZING, 0.3)
+        content = audio_to_srt(audio, on_stage=on_stage) or ""
+
+    # 3. 字幕较小时直接返回
+    data = content.encode("utf-8")
+    if len(data) <= config.SRT_INLINE_MAX_BYTES:
+        logger.info(f"Process audio to inline srt success, bytes: {len(data)}")
+        return {"srt": content}
+
+    srt_file = storage.manager.output_path("srt", ".srt")
+    with metrics.stage("write"), open(srt_file, "wb") as f:
+        f.write(data)
+    files.seal(srt_file, data)
+    logger.info(f"Inline srt too large ({len(data)} bytes), srt_file: {srt_file}")
+    return {"srt_url": gen_download_url(srt_file)}
+
+@in_lane("transcript")
+def create_transcript(audio_url: str, on_stage=None) -> Transcript:
+    """
+    语音 -> 结构化识别结果（只识别一次，之后按ID渲染各种格式）
+
+    Args:
+        audio_url: 音频URL
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
+
+    Returns:
+        transcript: 识别结果
+
+    Raises:
+        CustomException: 自定义异常
+    """
+    try:
+        # 1. 下载音频文件
+        _report_stage(on_stage, STAGE_DOWNLOADING, 0.0)
+        with use_audio(audio_url) as audio:
+            # 2. 执行识别
+            _report_stage(on_stage, STAGE_RECOGNIZING, 0.3)
+            text, timestamps = recognize_audio(audio)
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.error(f"ASR process failed: {str(e)}, detail: {traceback.format_exc()}")
+        raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
+
+    # 3. 保存识别结果
+    _report_stage(on_stage, STAGE_WRITING, 0.9)
+    transcript = transcript_store.add(Transcript(text or "", timestamps or [], sha256=audio.sha256))
+    logger.info(f"Transcript created, transcript_id: {transcript.transcript_id}, text length: {len(transcript.text)}")
+    return transcript
+
+def asr_bulk(audio_urls: list, output: str = "srt", lang: str = "zh"):
+    """
+    批量识别：提前下载后面的音频，同时识别已经下载的音频，每一项完成后立即返回结果
+
+    Args:
+        audio_urls: 音频URL列表
+        output: srt（返回字幕URL）/ text（返回纯文本）
+        lang: 错误信息的语言
+
+    Returns:
+        lines: 生成器，按完成顺序逐项生成 {"index", "audio_url", "code", "message", "data"}，
+               某一项失败时code为该项的错误码；最后生成汇总 {"done", "total", "succeeded", "failed", "elapsed_ms"}
+
+    Raises:
+        CustomException: 列表为空或超过BULK_MAX_ITEMS
+    """
+    if not audio_urls or len(audio_urls) > config.BULK_MAX_ITEMS:
+        raise CustomException(CustomError.PARAM_VALIDATION_FAILED, detail=f"audio_urls must contain 1 to {config.BULK_MAX_ITEMS} items")
+
+    pipeline = BulkPipeline(
+        use_audio,
+        functools.partial(_bulk_process, output),
+        download_concurrency=config.BULK_DOWNLOAD_CONCURRENCY,
+        recognize_concurrency=config.BULK_RECOGNIZE_CONCURRENCY,
+        prefetch=config.BULK_PREFETCH,
+    )
+    return _bulk_lines(pipeline, audio_urls, lang)
+
+def _bulk_lines(pipeline: BulkPipeline, audio_urls: list, lang: str):
+    started = time.perf_counter()
+    succeeded = 0
+    for index, data, error in pipeline.run(audio_urls):
+        line = {"index": index, "audio_url": audio_urls[index]}
+        if error is None:
+            succeeded += 1
+            metrics.BULK_ITEMS.labels("succeeded").inc()
+            line.update(CustomError.SUCCESS.as_dict(lang=lang), data=data)
+        else:
+            metrics.BULK_ITEMS.labels("failed").inc()
+            if not isinstance(error, CustomException):
+                logger.error(f"Bulk item failed: {str(error)}, audio_url: {audio_urls[index]}")
+                error = CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
+            line.update(error.err.as_dict(detail=error.detail, lang=lang))
+        yield line
+
+    logger.info(f"Bulk recognition finished, total: {len(audio_urls)}, succeeded: {succeeded}")
+    yield {
+        "done": True,
+        "total": len(audio_urls),
+        "succeeded": succeeded,
+        "failed": len(audio_urls) - succeeded,
+        "elapsed_ms": _elapsed_ms(started),
+    }
+
+@in_lane("bulk")
+def _bulk_process(output: str, audio_url: str, audio: helper.DownloadResult) -> dict:
+    """识别批量请求中已下载的一项（在识别线程中执行）"""
+    if output == "text":
+        text, _ = recognize_audio(audio)
+        return {"text": text or ""}
+
+    srt_file = storage.manager.output_path("srt", ".srt")
+    process_audio_to_srt(audio, srt_file)
+    return {"srt_url": gen_download_url(srt_file)}
+
+def render_transcript(transcript_id: str, fmt: str, interval_threshold: int = subtitles.DEFAULT_INTERVAL_THRESHOLD) -> str:
+    """
+    按指定格式渲染已保存的识别结果，不执行推理
+
+    Args:
+        transcript_id: 识别结果ID
+        fmt: 字幕格式（srt / vtt / ass / txt / json）
+        interval_threshold: 断句时间间隔阈值（毫秒）
+
+    Returns:
+        content: 字幕内容
+
+    Raises:
+        CustomException: 识别结果不存在或已过期
+    """
+    transcript = transcript_store.get(transcript_id)
+    with metrics.stage("render"):
+        return subtitles.render(fmt, transcript.text, transcript.timestamps, interval_threshold)
+
+@in_lane("embed")
+def asr_embed(video_url: str, burn_in: bool = False, preset: str = None, threads: int = None, on_stage=None) -> dict:
     """
     视频（提取语音，识别字幕） -> 嵌入字幕
+
+    默认封装软字幕（音视频流直接拷贝，不重新编码），burn_in=True时把字幕渲染进画面（重新编码）
     
     Args:
         video_url: 视频URL
+        burn_in: 是否烧录硬字幕
+        preset: 硬字幕编码预设，默认EMBED_BURN_PRESET
+        threads: 硬字幕编码线程数，默认EMBED_BURN_THREADS
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
     
     Returns:
-        embed_url: 嵌入字幕URL
+        result: {"video_url": 嵌入字幕的视频URL, "srt_url": 字幕URL, "timings": 各阶段耗时（毫秒）}
 
     Raises:
         CustomException: 自定义异常
     """
-    print(f"video_url: {video_url}\n")
+    timings = {}
+    started = time.perf_counter()
+
+    # 1. 下载视频文件并识别音轨（音视频封装需要读取文件，视频总是写入磁盘）
+    _report_stage(on_stage, STAGE_DOWNLOADING, 0.0)
+    with use_video(video_url, timings, on_stage) as (source, text, timestamps):
+        # 2. 生成字幕文件
+        _report_stage(on_stage, STAGE_WRITING, 0.7)
+        # 字幕和视频在封装结束之前不会被存储清理删除
+        srt_file = storage.manager.output_path("srt", ".srt")
+        if burn_in:
+            output_file = storage.manager.output_path("video", ".mp4")
+        else:
+            output_file = storage.manager.output_path("video", video.output_extension(source.path))
+        with storage.manager.in_use(srt_file, output_file):
+            with metrics.stage("subtitle") as t:
+                subtitles.write_srt(subtitles.segment(text or "", timestamps or []), srt_file)
+                files.seal(srt_file)
+            timings["subtitle"] = t.ms
+
+            # 3. 封装软字幕或烧录硬字幕
+            if burn_in:
+                with metrics.stage("encode") as t:
+                    video.burn_subtitles(source.path, srt_file, output_file,
+                                         preset=preset or config.EMBED_BURN_PRESET,
+                                         threads=config.EMBED_BURN_THREADS if threads is None else threads)
+                timings["encode"] = t.ms
+            else:
+                with metrics.stage("mux") as t:
+                    video.mux_soft_subtitles(source.path, srt_file, output_file)
+                timings["mux"] = t.ms
+            # 下载接口使用的内容哈希在写入后计算一次，不在第一次下载时计算
+            files.seal(output_file)
+
+    timings["total"] = _elapsed_ms(started)
+    logger.info(f"Embed subtitles success, output_file: {output_file}, burn_in: {burn_in}, timings: {timings}")
+
+    # 4. 生成下载路径
+    return {
+        "video_url": gen_download_url(output_file),
+        "srt_url": gen_download_url(srt_file),
+        "timings": timings,
+    }
+
+@contextmanager
+def use_video(video_url: str, timings: dict, on_stage=None):
+    """
+    下载视频并识别音轨，使用结束后（包括异常）删除视频文件
+
+    启用EMBED_STREAM_DEMUX时边下载边提取音轨并分块识别，识别与下载重叠进行；
+    无法从管道解析的文件（如moov位于末尾的MP4）在下载完成后按文件提取
+
+    Args:
+        video_url: 视频URL
+        timings: 记录各阶段耗时（毫秒）
+        on_stage: 阶段回调 on_stage(stage, progress)，可选
+
+    Yields:
+        (DownloadResult, text, timestamps)
+    """
+    started = time.perf_counter()
+    download_kwargs = dict(limit=config.VIDEO_MAX_BYTES, download_timeout=config.VIDEO_DOWNLOAD_TIMEOUT, memory_limit=0)
+
+    if stream_executor is None:
+        with use_audio(video_url, **download_kwargs) as source:
+            timings["download"] = _elapsed_ms(started)
+            _report_stage(on_stage, STAGE_RECOGNIZING, 0.2)
+            yield (source, *_recognize_video(source, timings))
+        return
+
+    # 1. 边下载边提取音轨，PCM按块提交识别
+    recognizer = ProgressiveRecognizer(recognize, stream_executor, chunk_seconds=config.EMBED_STREAM_CHUNK_SECONDS, sample_rate=audio_decoder.SAMPLE_RATE)
+    demuxer = video.StreamingDemuxer(recognizer.feed, audio_decoder.SAMPLE_RATE)
+    try:
+        with metrics.stage("download"):
+            source = _download_file(video_url, limit=download_kwargs["limit"], timeout=download_kwargs["download_timeout"],
+                                    memory_limit=0, on_chunk=demuxer.feed)
+    except BaseException:
+        demuxer.abort()
+        recognizer.cancel()
+        raise
+    timings["download"] = _elapsed_ms(started)
+
+    # 2. 等待剩余的块识别完成
+    try:
+        _report_stage(on_stage, STAGE_RECOGNIZING, 0.2)
+        yield (source, *_recognize_streamed(source, demuxer, recognizer, timings))
+    finally:
+        if source.path and os.path.exists(source.path):
+            os.remove(source.path)
+
+def _recognize_video(source: helper.DownloadResult, timings: dict):
+    """按文件提取音轨并识别（命中缓存时跳过提取和推理）"""
+    def demux():
+        with metrics.stage("demux") as t:
+            samples = video.extract_audio(source.path, audio_decoder.SAMPLE_RATE)
+        timings["demux"] = t.ms
+        return samples
+
+    asr_started = time.perf_counter()
+    try:
+        text, timestamps = recognize_cached(source.sha256, demux)
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.error(f"ASR process failed: {str(e)}, detail: {traceback.format_exc()}")
+        raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
+    timings["asr"] = round(_elapsed_ms(asr_started) - timings.get("demux", 0), 2)
+    return text, timestamps
+
+def _recognize_streamed(source: helper.DownloadResult, demuxer: video.StreamingDemuxer, recognizer: ProgressiveRecognizer, timings: dict):
+    """收集边下载边识别的结果；流式提取失败时退回按文件提取"""
+    asr_started = time.perf_counter()
+    key = f"{CACHE_KEY_PREFIX}-{source.sha256}"
+    try:
+        if demuxer.finish():
+            audio_seconds = recognizer.received_seconds
+            cached = result_cache.get(key) if result_cache is not None else None
+            if cached is not None:
+                recognizer.cancel()
+                text, timestamps = cached
+            else:
+                text, timestamps = extract_asr_result(recognizer.finish())
+                if result_cache is not None and text is not None:
+                    result_cache.put(key, text, timestamps)
+            # 流式识别与下载重叠，这里只统计下载完成后剩余的识别耗时
+            timings["asr"] = _elapsed_ms(asr_started)
+            logger.info(f"Streaming demux recognized, audio: {audio_seconds:.1f}s, asr after download: {timings['asr']}ms")
+            return text, timestamps
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.error(f"ASR process failed: {str(e)}, detail: {traceback.format_exc()}")
+        raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
+
+    recognizer.cancel()
+    logger.info(f"Streaming demux unavailable, extract audio from file: {source.path}")
+    return _recognize_video(source, timings)
 
-    return ""
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
 
 def load_model():
-    """加载语音识别模型"""
-    global model
-    if model is None:
+    """
+    加载语音识别模型并启动推理相关组件
+
+    推理运行时配置（torch线程数）在加载模型之前应用；识别模型、VAD模型和结果缓存并行初始化；
+    需要fork的副本池和长音频流水线在初始化线程全部结束后再创建，推理槽位在fork之后创建。
+    全部组件启动后才设置全局model，请求不会在fork之前使用本进程的模型推理
+    """
+    global model, runtime_settings, replica_pool, inference_slots, batcher, result_cache, long_audio, stream_executor, live_model, live_executor
+    if runtime_settings is None:
+        runtime_settings = RuntimeSettings.from_config()
+        runtime.apply_process(runtime_settings)
+    need_vad = long_audio is None and config.LONG_AUDIO_WORKERS > 0
+    need_live = live_model is None and config.LIVE_ASR_ENABLED
+    asr_model = model
+    vad_model = None
+    streaming_model = live_model
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="asr-load") as executor:
+        cache_future = executor.submit(_create_result_cache) if result_cache is None else None
+        if asr_model is None or need_vad or need_live:
+            auto_model = _import_funasr()
+            vad_future = executor.submit(_load_auto_model, auto_model, config.VAD_MODEL_DIR or "fsmn-vad", "fsmn-vad") if need_vad else None
+            live_future = executor.submit(_load_auto_model, auto_model, config.LIVE_MODEL_DIR or LIVE_MODEL_NAME, LIVE_MODEL_NAME) if need_live else None
+            if asr_model is None:
+                asr_model = _load_auto_model(auto_model, config.MODEL_DIR or MODEL_NAME, MODEL_NAME, backend=config.INFERENCE_BACKEND)
+            if vad_future is not None:
+                try:
+                    vad_model = vad_future.result()
+                except Exception:
+                    # 长音频流水线不可用时退回整段识别
+                    logger.error("Long audio pipeline disabled: fsmn-vad model load failed")
+            if live_future is not None:
+                try:
+                    streaming_model = live_future.result()
+                except Exception:
+                    # 流式模型不可用时只关闭实时识别，文件识别不受影响
+                    logger.error(f"Live recognition disabled: {LIVE_MODEL_NAME} model load failed")
+        if cache_future is not None:
+            result_cache = cache_future.result()
+
+    # 启动模型副本池（需要在其它后台线程启动之前fork副本进程）
+    if replica_pool is None and config.MODEL_REPLICAS > 0:
         try:
-            logger.info("load paraformer-zh model...")
-            model = AutoModel(model="paraformer-zh", disable_update=True)
-            logger.info("paraformer-zh model load success")
+            replica_pool = ReplicaPool(asr_model, config.MODEL_REPLICAS, threads=config.MODEL_REPLICA_THREADS,
+                                       health_interval=config.REPLICA_HEALTH_INTERVAL, health_timeout=config.REPLICA_HEALTH_TIMEOUT,
+                                       cpu_sets=runtime_settings.cpu_sets(config.MODEL_REPLICAS), request_timeout=config.REPLICA_REQUEST_TIMEOUT)
         except Exception as e:
-            logger.error(f"paraformer-zh model load failed: {str(e)}")
+            # 副本池不可用时在服务进程内推理
+            logger.error(f"Replica pool start failed: {str(e)}")
             logger.error(traceback.format_exc())
-            raise
+
+    # 启动长音频流水线（需要在其它后台线程启动之前fork识别进程）
+    if long_audio is None and vad_model is not None:
+        try:
+            long_audio = LongAudioPipeline(asr_model, vad_model, workers=config.LONG_AUDIO_WORKERS, worker_threads=config.LONG_AUDIO_WORKER_THREADS,
+                                           max_segment_ms=config.LONG_AUDIO_MAX_SEGMENT_SECONDS * 1000)
+            logger.info(f"Long audio pipeline started, workers: {config.LONG_AUDIO_WORKERS}")
+        except Exception as e:
+            # 长音频流水线不可用时退回整段识别
+            logger.error(f"Long audio pipeline start failed: {str(e)}")
+            logger.error(traceback.format_exc())
+
+    # 服务进程内的推理槽位（启用副本池时由副本进程推理，不需要槽位）
+    if inference_slots is None and replica_pool is None and runtime_settings.slots > 0:
+        inference_slots = InferenceSlots(asr_model, runtime_settings.slots, threads=runtime_settings.intra_op_threads,
+                                         cpu_sets=runtime_settings.cpu_sets())
+
+    # 启动批量推理调度器，启用副本池或推理槽位时每个副本/槽位同时执行一批
+    if batcher is None and config.BATCH_MAX_SIZE > 1:
+        batcher = BatchScheduler(_generate_batch, max_batch_size=config.BATCH_MAX_SIZE, max_wait_ms=config.BATCH_MAX_WAIT_MS,
+                                 concurrency=_engine_concurrency(),
+                                 policy=config.SCHEDULER_POLICY, aging=config.SCHEDULER_AGING, lanes=config.SCHEDULER_LANES)
+        batcher.start()
+
+    # 视频边下载边识别的线程池（线程在第一次提交时创建）
+    if stream_executor is None and config.EMBED_STREAM_DEMUX:
+        stream_executor = ThreadPoolExecutor(max_workers=config.EMBED_STREAM_WORKERS, thread_name_prefix="asr-stream")
+
+    # 实时识别的线程池，所有连接的块识别共用
+    if live_executor is None and streaming_model is not None:
+        live_executor = ThreadPoolExecutor(max_workers=max(1, config.LIVE_WORKERS), thread_name_prefix="asr-live")
+    live_model = streaming_model
+
+    model = asr_model
+
+def needs_fork() -> bool:
+    """加载模型时是否会fork子进程（模型副本池或长音频流水线），需要在其它后台线程启动之前加载"""
+    return config.MODEL_REPLICAS > 0 or config.LONG_AUDIO_WORKERS > 0
+
+def _engine_concurrency() -> int:
+    """同时执行推理的数量：副本数或槽位数，都未启用时为1"""
+    if replica_pool is not None:
+        return replica_pool.size
+    return inference_slots.size if inference_slots is not None else 1
+
+def _import_funasr():
+    """延迟导入funasr（连同torch导入耗时较长），进程启动和存活检查不需要等待"""
+    started = time.perf_counter()
+    from funasr import AutoModel
+    startup.state.record("import_funasr", time.perf_counter() - started)
+    return AutoModel
+
+def _load_auto_model(auto_model, source: str, name: str, backend: str = backends.BACKEND_TORCH):
+    """
+    加载funasr模型
+
+    Args:
+        auto_model: funasr.AutoModel
+        source: 模型名称或本地快照目录
+        name: 模型名称，用于日志和指标
+        backend: 推理后端（torch/int8/onnx），见backends
+    """
+    try:
+        logger.info(f"load {name} model from {source}, backend: {backend}...")
+        started = time.perf_counter()
+        loaded = backends.load(auto_model, source, backend, onnx_dir=config.ONNX_MODEL_DIR,
+                               onnx_quantize=config.ONNX_QUANTIZE, onnx_threads=config.ONNX_THREADS or runtime_settings.intra_op_threads)
+        seconds = time.perf_counter() - started
+        metrics.MODEL_LOAD_SECONDS.labels(name).set(seconds)
+        startup.state.record(f"load_{name}", seconds)
+        logger.info(f"{name} model load success")
+        return loaded
+    except Exception as e:
+        logger.error(f"{name} model load failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise
+
+def _create_result_cache() -> ResultCache:
+    started = time.perf_counter()
+    cache = ResultCache(config.CACHE_DIR, memory_items=config.CACHE_MEMORY_ITEMS, disk_max_bytes=config.CACHE_DISK_MAX_BYTES)
+    startup.state.record("result_cache", time.perf_counter() - started)
+    return cache
+
+def warmup(seconds: float = None):
+    """
+    用生成的音频执行推理，预热算子、内存分配和各副本进程，避免第一个请求承担初始化开销
+
+    Args:
+        seconds: 预热音频时长（秒），默认使用WARMUP_SECONDS，<=0时跳过
+    """
+    seconds = config.WARMUP_SECONDS if seconds is None else seconds
+    if seconds <= 0 or model is None:
+        return
+
+    clip = _warmup_clip(seconds)
+    # 单条输入和批处理各执行一次（批处理的输入形状不同）
+    calls = [(clip, {})]
+    if batcher is not None:
+        calls.append(([clip] * batcher.max_batch_size, {"batch_size": batcher.max_batch_size}))
+
+    started = time.perf_counter()
+    for inputs, kwargs in calls:
+        if replica_pool is not None:
+            replica_pool.broadcast(inputs, **kwargs)
+        elif inference_slots is not None:
+            inference_slots.broadcast(inputs, **kwargs)
+        else:
+            model.generate(input=inputs, **kwargs)
+    logger.info(f"Warm-up finished, clip: {seconds}s, elapsed: {_elapsed_ms(started)}ms")
+
+def _warmup_clip(seconds: float) -> np.ndarray:
+    """预热音频：按音节包络调制的谐波信号加少量噪声（16kHz单声道float32）"""
+    rate = audio_decoder.SAMPLE_RATE
+    t = np.arange(int(seconds * rate)) / rate
+    voice = sum(np.sin(2 * np.pi * f0 * t) / (i + 1) for i, f0 in enumerate((150, 300, 450, 600)))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    noise = np.random.default_rng(0).normal(0, 0.01, t.size)
+    return (0.15 * voice * envelope + noise).astype(np.float32)
+
+def shutdown():
+    """释放后台资源"""
+    global replica_pool, inference_slots, batcher, long_audio, stream_executor, live_executor
+    if stream_executor is not None:
+        stream_executor.shutdown(wait=False, cancel_futures=True)
+        stream_executor = None
+    if live_executor is not None:
+        live_executor.shutdown(wait=False, cancel_futures=True)
+        live_executor = None
+    if batcher is not None:
+        batcher.stop()
+        batcher = None
+    if long_audio is not None:
+        long_audio.shutdown()
+        long_audio = None
+    if inference_slots is not None:
+        inference_slots.shutdown()
+        inference_slots = None
+    if replica_pool is not None:
+        replica_pool.shutdown()
+        replica_pool = None
+
+def stats() -> dict:
+    """
+    服务运行统计信息
+
+    Returns:
+        stats: 各组件的统计数据
+    """
+    return {
+        "replicas": replica_pool.stats() if replica_pool is not None else None,
+        "runtime": {
+            "settings": runtime_settings.as_dict() if runtime_settings is not None else None,
+            "slots": inference_slots.stats() if inference_slots is not None else None,
+        },
+        "admission": admission.controller.stats(),
+        "batcher": batcher.stats() if batcher is not None else None,
+        "jobs": jobs.manager.stats() if jobs.manager is not None else None,
+        "cache": result_cache.stats() if result_cache is not None else None,
+        "long_audio": long_audio.stats() if long_audio is not None else None,
+        "transcripts": transcript_store.stats(),
+        "storage": storage.manager.stats(),
+        "download": helper.downloader.stats(),
+        "coalescing": {
+            "download": download_flight.stats(),
+            "recognize": recognize_flight.stats(),
+        },
+    }
 
 def gen_download_url(file_path: str) -> str:
     """
-    生成下载URL，将文件路径中的/app/替换成DOWNLOAD_URL
+    生成下载URL：启用FILES_ROUTE_ENABLED时输出目录中的文件指向内置下载接口，否则将文件路径中的/app/替换成DOWNLOAD_URL
     
     Args:
         file_path: 文件路径
@@ -113,6 +902,10 @@ def gen_download_url(file_path: str) -> str:
     Returns:
         download_url: 下载URL
     """
+    if config.FILES_ROUTE_ENABLED:
+        route_url = files.download_url(file_path)
+        if route_url is not None:
+            return route_url
     # 替换文件路径中的/app/为DOWNLOAD_URL
     download_url = file_path.replace("/app/", config.DOWNLOAD_URL)
     return download_url
@@ -218,25 +1011,42 @@ def create_srt_entries(text, timestamps):
     logger.info(f"Create {len(sentences)} SRT entries")
     return subs
 
-def process_audio_to_srt(audio_path: str, srt_path: str):
-    """处理音频文件并生成SRT字幕"""
+def process_audio_to_srt(audio: helper.DownloadResult, srt_path: str, on_stage=None):
+    """处理下载的音频并生成SRT字幕"""
+    content = audio_to_srt(audio, on_stage=on_stage)
+    if content is None:
+        return
+
     try:
-        # 1. 使用模型生成识别结果
-        result = model.generate(input=audio_path)
-        
-        # 2. 提取ASR结果
-        text, timestamps = extract_asr_result(result)
-        
-        if text is not None:
-            # 3. 创建SRT条目
-            subs = create_srt_entries(text, timestamps)
-            
-            # 4. 保存SRT文件
-            subs.save(srt_path)
-            logger.info(f"SRT file saved: {srt_path}")
-        else:
+        # 保存SRT文件（直接序列化，不构造pysrt对象）
+        data = content.encode("utf-8")
+        with metrics.stage("write"), open(srt_path, "wb") as f:
+            f.write(data)
+        files.seal(srt_path, data)
+        logger.info(f"SRT file saved: {srt_path}")
+    except Exception as e:
+        logger.error(f"Write srt file failed: {str(e)}, detail: {traceback.format_exc()}")
+        raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
+
+def audio_to_srt(audio: helper.DownloadResult, on_stage=None) -> str:
+    """处理下载的音频并生成SRT字幕内容，识别结果为空时返回None"""
+    try:
+        # 1~2. 使用模型生成识别结果（命中缓存时跳过推理）并提取ASR结果
+        text, timestamps = recognize_audio(audio)
+        if text is None:
             logger.warning("Empty result")
-            
+            return None
+
+        _report_stage(on_stage, STAGE_WRITING, 0.9)
+        # 3. 创建SRT条目（向量化分段，输出与create_srt_entries一致）
+        with metrics.stage("segmentation"):
+            sentences = subtitles.segment(text, timestamps)
+        logger.info(f"Create {len(sentences)} SRT entries, len(text): {len(text)}, len(timestamps): {len(timestamps)}")
+        return subtitles.to_srt(sentences)
+
+    except CustomException:
+        # 自定义异常直接抛出
+        raise
     except Exception as e:
         logger.error(f"Handle audio file failed: {str(e)}, detail: {traceback.format_exc()}")
         raise CustomException(err=CustomError.RECOGNIZE_AUDIO_FAILED)
\ No newline at end of file
@@ -0,0 +1,135 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from exceptions import CustomException, CustomError
+import admission
+
+
+# 只属于单个请求的错误（截止时间、等待超时）：follower收到leader的这些错误时不接收，重新执行（成为新的leader）
+_PER_REQUEST_ERRORS = (CustomError.DEADLINE_EXCEEDED, CustomError.REQUEST_TIMEOUT)
+
+
+class _Call:
+    """一次进行中的执行：结果和等待结果的调用方数量（包括leader）"""
+    __slots__ = ("future", "callers")
+
+    def __init__(self):
+        self.future = Future()
+        self.callers = 1
+
+
+class SingleFlight:
+    """相同键的并发调用合并（single-flight）
+    功能：
+    1. 同一个键同时只执行一次fn，第一个调用方（leader）负责执行
+    2. 后到的调用方（follower）等待leader的结果，不会重复执行
+    3. follower可以按自己的超时时间和请求截止时间放弃等待，不影响leader继续执行
+    4. 共享的执行不受leader请求截止时间的限制（执行期间没有截止时间），各调用方只按自己的截止时间放弃等待；
+       leader因截止时间或等待超时失败时，follower重新执行，而不是收到leader的错误
+    5. 结果发布之前（持有锁）按会收到结果的调用方数量调用share，例如为每个调用方增加引用计数，
+       发布之后才能释放的资源不会在某个follower拿到结果之前被其它调用方释放
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+        self._timeouts = 0
+        self._retries = 0
+
+    def do(self, key: str, fn, timeout: float = None, share=None):
+        """
+        执行fn，相同key的并发调用共享同一次执行的结果
+
+        Args:
+            key: 合并键
+            fn: 无参执行函数（在没有请求截止时间的上下文中执行）
+            timeout: follower等待结果的超时时间（秒），None表示一直等待（仍受当前请求的截止时间限制）
+            share: share(result, count)，结果发布之前调用，count为会收到该结果的调用方数量（包括leader），可选
+
+        Returns:
+            fn的返回值
+
+        Raises:
+            CustomException: follower等待超时（REQUEST_TIMEOUT）或超过当前请求的截止时间（DEADLINE_EXCEEDED）
+            fn抛出的其它异常会传递给所有等待中的调用方
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._leaders += 1
+                else:
+                    call.callers += 1
+                    self._coalesced += 1
+            future = call.future
+
+            if leader:
+                return self._lead(key, call, fn, share)
+
+            try:
+                return self._wait(call, timeout)
+            except CustomException as e:
+                # 只有leader抛出的截止时间/超时错误才重新执行，自己等待超时直接抛出
+                if e.err not in _PER_REQUEST_ERRORS or not future.done() or future.exception() is not e:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                admission.check_deadline(self.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self._leaders,
+                "coalesced": self._coalesced,
+                "follower_timeouts": self._timeouts,
+                "follower_retries": self._retries,
+            }
+
+    def _lead(self, key: str, call: _Call, fn, share):
+        # 共享的执行不继承leader的截止时间，否则等待更久（或没有截止时间）的follower会收到leader的超时
+        token = admission.request_deadline.set(None)
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.future.set_exception(e)
+            raise
+        finally:
+            admission.request_deadline.reset(token)
+
+        # 发布结果和统计调用方数量在同一把锁内，之后不会再有调用方加入或放弃这次执行
+        with self._lock:
+            self._calls.pop(key, None)
+            if share is not None:
+                share(result, call.callers)
+            call.future.set_result(result)
+        return result
+
+    def _wait(self, call: _Call, timeout: float):
+        """按timeout和当前请求剩余的时间（取较小值）等待leader的结果"""
+        future = call.future
+        deadline = admission.request_deadline.get()
+        left = None if deadline is None else max(deadline - time.monotonic(), 0)
+        by_deadline = left is not None and (timeout is None or left < timeout)
+        try:
+            return future.result(timeout=left if by_deadline else timeout)
+        except TimeoutError:
+            with self._lock:
+                if not future.done():
+                    # 放弃等待：发布结果时不再计入
+                    call.callers -= 1
+            if future.done():
+                # 超时的同时结果已经发布（已经计入），照常返回；或leader本身抛出的TimeoutError
+                return future.result()
+            with self._lock:
+                self._timeouts += 1
+            if by_deadline:
+                raise CustomException(CustomError.DEADLINE_EXCEEDED, detail=self.name)
+            raise CustomException(CustomError.REQUEST_TIMEOUT, detail=f"{self.name} {timeout}s")
@@ -0,0 +1,112 @@
+import threading
+import time
+import traceback
+from logger import logger
+
+
+# 启动状态
+STATUS_STARTING = "starting"
+STATUS_LOADING = "loading"
+STATUS_WARMING = "warming"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class StartupState:
+    """启动过程状态
+    功能：
+    1. 记录当前所处阶段（starting/loading/warming/ready/failed）和失败原因
+    2. 记录各阶段、各步骤的耗时（秒），供就绪检查端点返回
+    3. 请求可以等待服务就绪
+    """
+
+    def __init__(self):
+        self.status = STATUS_STARTING
+        self.error = None
+        self._timings = {}
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def record(self, name: str, seconds: float):
+        """记录一个步骤的耗时"""
+        with self._lock:
+            self._timings[name] = round(seconds, 3)
+
+    def set_status(self, status: str, error: str = None):
+        with self._lock:
+            self.status = status
+            self.error = error
+        if status == STATUS_READY:
+            self._ready.set()
+        if status in (STATUS_READY, STATUS_FAILED):
+            self._done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待服务就绪，返回是否就绪（启动失败时立即返回False）"""
+        self._done.wait(timeout)
+        return self._ready.is_set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.status,
+                "ready": self._ready.is_set(),
+                "error": self.error,
+                "uptime_seconds": round(time.monotonic() - self._started_at, 3),
+                "timings": dict(self._timings),
+            }
+
+
+# 当前进程的启动状态
+state = StartupState()
+_thread = None
+
+
+def start(steps: list, background: bool = True):
+    """
+    按顺序执行启动步骤，全部完成后标记为就绪
+
+    Args:
+        steps: [(status, fn), ...]，执行fn期间状态为status，耗时记为timings[status]
+        background: 是否在后台线程执行（进程立即可以响应存活检查，请求等待或返回模型未就绪）
+    """
+    global _thread
+    if not background:
+        _run(steps)
+        if state.status == STATUS_FAILED:
+            raise RuntimeError(state.error)
+        return
+    _thread = threading.Thread(target=_run, args=(steps,), name="asr-startup", daemon=True)
+    _thread.start()
+
+def wait(timeout: float = None) -> bool:
+    return state.wait(timeout)
+
+def shutdown(timeout: float = 5.0):
+    """等待后台启动线程结束（加载中的模型无法中断，超时后随进程退出）"""
+    if _thread is not None and _thread.is_alive():
+        _thread.join(timeout=timeout)
+
+def _run(steps: list):
+    started = time.perf_counter()
+    for status, fn in steps:
+        state.set_status(status)
+        step_started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"Startup failed at {status}: {str(e)}")
+            logger.error(traceback.format_exc())
+            state.set_status(STATUS_FAILED, error=f"{status}: {str(e)}")
+            return
+        state.record(status, time.perf_counter() - step_started)
+
+    state.record("total", time.perf_counter() - started)
+    state.set_status(STATUS_READY)
+    logger.info(f"Service ready, startup timings: {state.snapshot()['timings']}")
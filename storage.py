@@ -0,0 +1,331 @@
+import collections
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logger import logger
+import config
+import helper
+import metrics
+
+
+# 存储区域：临时文件和各类输出文件
+AREA_TEMP = "temp"
+# 删除原因
+REASON_TTL = "ttl"
+REASON_QUOTA = "quota"
+REASON_ORPHAN = "orphan"
+# 配额清理时删除到配额的这个比例以下，避免每次清理都只删除刚好超出的部分
+QUOTA_LOW_WATERMARK = 0.9
+# 同一个文件的访问时间最多这么久（秒）更新一次
+TOUCH_INTERVAL = 60
+
+
+class StorageManager:
+    """临时目录和输出目录的生命周期管理
+    功能：
+    1. 启动时创建临时目录和输出目录
+    2. 输出文件按文件名哈希分片存放到子目录（如 output/srt/3f/<文件名>），单个目录中的文件数不会无限增长
+    3. 后台线程定期清理：超过TTL的输出文件；输出总大小超过配额时按最近访问时间（LRU）删除最旧的文件；
+       超过保留时间的临时文件（请求结束时已删除，这里处理进程崩溃等遗留的文件）
+    4. 正在使用的文件（in_use，如正在写入或封装的输出文件）清理时跳过，TTL和配额都不删除
+    5. 统计各区域的文件数、磁盘占用和删除数量
+
+    多个服务进程共用目录时各自清理，同一个文件被其它进程先删除时忽略
+    """
+
+    def __init__(self, temp_dir: str, output_dirs: dict, ttl: float = 0, max_bytes: int = 0, temp_ttl: float = 3600,
+                 sweep_interval: float = 300, shard_chars: int = 2):
+        """
+        Args:
+            temp_dir: 临时目录
+            output_dirs: 输出目录 {类型: 目录}，如 {"srt": ..., "video": ...}
+            ttl: 输出文件保留时间（秒，从创建开始），0不过期
+            max_bytes: 所有输出文件的总大小上限（字节），0不限制
+            temp_ttl: 临时文件保留时间（秒），0不清理
+            sweep_interval: 后台清理间隔（秒）
+            shard_chars: 分片子目录名的长度（十六进制字符数），0不分片
+        """
+        self.temp_dir = temp_dir
+        self.output_dirs = dict(output_dirs)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.temp_ttl = temp_ttl
+        self.sweep_interval = sweep_interval
+        self.shard_chars = shard_chars
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._in_use = collections.Counter()
+        self._usage = {area: {"files": 0, "bytes": 0} for area in (AREA_TEMP, *self.output_dirs)}
+        self._evictions = {}
+        self._sweeps = 0
+        self._last_sweep_ms = 0.0
+
+    def ensure_dirs(self):
+        """创建临时目录和输出目录（已存在时跳过）"""
+        for directory in (self.temp_dir, *self.output_dirs.values()):
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """创建目录，启动后台清理线程"""
+        self.ensure_dirs()
+        if self._thread is not None or self.sweep_interval <= 0:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="storage-sweeper", daemon=True)
+        self._thread.start()
+        logger.info(f"Storage manager started, output ttl: {self.ttl}s, max bytes: {self.max_bytes}, temp ttl: {self.temp_ttl}s")
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def output_path(self, kind: str, extension: str) -> str:
+        """
+        生成一个新输出文件的路径（分片子目录不存在时创建）
+
+        Args:
+            kind: 输出类型（srt / video）
+            extension: 扩展名（包含.）
+
+        Returns:
+            path: 文件路径
+        """
+        name = helper.gen_unique_id() + extension
+        directory = self._shard_dir(kind, name)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def locate(self, kind: str, name: str) -> str:
+        """输出文件名对应的路径：分片目录中不存在时使用输出目录本身（分片之前生成的文件），类型未知时返回None"""
+        if kind not in self.output_dirs:
+            return None
+        path = os.path.join(self._shard_dir(kind, name), name)
+        if self.shard_chars > 0 and not os.path.exists(path):
+            return os.path.join(self.output_dirs[kind], name)
+        return path
+
+    def kind_of(self, path: str) -> str:
+        """文件所属的输出类型（位于输出目录或其分片子目录中），不是输出文件时返回None"""
+        directory = os.path.dirname(os.path.abspath(path))
+        for kind, root in self.output_dirs.items():
+            root = os.path.abspath(root)
+            if directory == root or os.path.dirname(directory) == root:
+                return kind
+        return None
+
+    def touch(self, path: str, stat: os.stat_result = None):
+        """记录输出文件被访问（更新访问时间，配额清理时最近访问的文件最后删除）"""
+        try:
+            stat = stat or os.stat(path)
+            now = time.time()
+            if now - stat.st_atime >= TOUCH_INTERVAL:
+                os.utime(path, ns=(int(now * 1e9), stat.st_mtime_ns))
+        except OSError:
+            pass
+
+    @contextmanager
+    def in_use(self, *paths: str):
+        """使用期间清理时跳过这些文件（同一个文件可以被多处同时使用，全部结束后才可以删除）"""
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            self._in_use.update(paths)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use.subtract(paths)
+                for path in paths:
+                    if self._in_use[path] <= 0:
+                        del self._in_use[path]
+
+    def sweep(self) -> dict:
+        """
+        执行一次清理
+
+        Returns:
+            removed: 本次删除的数量 {"区域/原因": 数量}
+        """
+        started = time.perf_counter()
+        now = time.time()
+        removed = {}
+        usage = {}
+        with self._lock:
+            in_use = set(self._in_use)
+
+        def expired(f, ttl):
+            return now - f[2] > ttl and os.path.abspath(f[0]) not in in_use
+
+        # 1. 临时文件：超过保留时间的视为遗留文件
+        temp_files = self._scan(self.temp_dir)
+        if self.temp_ttl > 0:
+            temp_files = self._remove_where(temp_files, lambda f: expired(f, self.temp_ttl), AREA_TEMP, REASON_ORPHAN, removed)
+        usage[AREA_TEMP] = _summarize(temp_files)
+
+        # 2. 输出文件：先删除过期的
+        outputs = {}
+        for kind, root in self.output_dirs.items():
+            files = self._scan(root)
+            if self.ttl > 0:
+                files = self._remove_where(files, lambda f: expired(f, self.ttl), kind, REASON_TTL, removed)
+            outputs[kind] = files
+
+        # 3. 超过配额时按最近访问时间删除（跳过正在使用的文件），直到低于配额的QUOTA_LOW_WATERMARK
+        total = sum(size for files in outputs.values() for _, size, _, _ in files)
+        if self.max_bytes > 0 and total > self.max_bytes:
+            target = self.max_bytes * QUOTA_LOW_WATERMARK
+            candidates = sorted(((kind, f) for kind, files in outputs.items() for f in files), key=lambda item: item[1][3])
+            evicted = set()
+            for kind, (path, size, _, _) in candidates:
+                if total <= target:
+                    break
+                if os.path.abspath(path) in in_use:
+                    continue
+                if _remove(path):
+                    self._count(removed, kind, REASON_QUOTA)
+                total -= size
+                evicted.add(path)
+            outputs = {kind: [f for f in files if f[0] not in evicted] for kind, files in outputs.items()}
+
+        for kind, files in outputs.items():
+            usage[kind] = _summarize(files)
+        with self._lock:
+            self._usage = usage
+            for key, count in removed.items():
+                self._evictions[key] = self._evictions.get(key, 0) + count
+            self._sweeps += 1
+            self._last_sweep_ms = round((time.perf_counter() - started) * 1000, 2)
+        if removed:
+            logger.info(f"Storage sweep removed files: {removed}, usage: {usage}")
+        return removed
+
+    def usage(self, area: str) -> dict:
+        """区域（temp或输出类型）在最近一次清理时的文件数和字节数"""
+        with self._lock:
+            return dict(self._usage.get(area, {"files": 0, "bytes": 0}))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "usage": {area: dict(value) for area, value in self._usage.items()},
+                "evictions": dict(self._evictions),
+                "sweeps": self._sweeps,
+                "last_sweep_ms": self._last_sweep_ms,
+                "ttl": self.ttl,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _shard_dir(self, kind: str, name: str) -> str:
+        root = self.output_dirs[kind]
+        if self.shard_chars <= 0:
+            return root
+        return os.path.join(root, hashlib.sha1(name.encode("utf-8")).hexdigest()[:self.shard_chars])
+
+    def _scan(self, root: str) -> list:
+        """目录（含一级分片子目录）中的文件：[(路径, 大小, 修改时间, 最近访问时间), ...]"""
+        files = []
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return files
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    files.extend(self._scan_shard(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(_file_info(entry))
+            except OSError:
+                # 扫描期间被其它进程删除
+                continue
+        return files
+
+    def _scan_shard(self, directory: str) -> list:
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        files.append(_file_info(entry))
+                except OSError:
+                    continue
+        return files
+
+    def _remove_where(self, files: list, predicate, area: str, reason: str, removed: dict) -> list:
+        """删除满足条件的文件，返回剩余的文件"""
+        kept = []
+        for f in files:
+            if predicate(f):
+                if _remove(f[0]):
+                    self._count(removed, area, reason)
+            else:
+                kept.append(f)
+        return kept
+
+    @staticmethod
+    def _count(removed: dict, area: str, reason: str):
+        metrics.STORAGE_EVICTIONS.labels(area, reason).inc()
+        key = f"{area}/{reason}"
+        removed[key] = removed.get(key, 0) + 1
+
+    def _sweep_loop(self):
+        # 启动后先清理一次（处理上次运行遗留的文件）
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {str(e)}")
+            if self._stopped.wait(self.sweep_interval):
+                return
+
+
+def _file_info(entry: os.DirEntry) -> tuple:
+    stat = entry.stat(follow_symlinks=False)
+    return entry.path, stat.st_size, stat.st_mtime, max(stat.st_atime, stat.st_mtime)
+
+def _summarize(files: list) -> dict:
+    return {"files": len(files), "bytes": sum(size for _, size, _, _ in files)}
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.warning(f"Remove file failed: {path}, error: {str(e)}")
+        return False
+
+
+def from_config() -> StorageManager:
+    """按当前配置创建存储管理器"""
+    return StorageManager(
+        config.TEMP_DIR,
+        {"srt": config.SRT_OUTPUT_DIR, "video": config.VIDEO_OUTPUT_DIR},
+        ttl=config.OUTPUT_TTL,
+        max_bytes=config.OUTPUT_MAX_BYTES,
+        temp_ttl=config.TEMP_FILE_TTL,
+        sweep_interval=config.STORAGE_SWEEP_INTERVAL,
+        shard_chars=config.OUTPUT_SHARD_CHARS,
+    )
+
+
+# 全局存储管理器（目录在start时创建）
+manager = from_config()
+
+for _area in (AREA_TEMP, *manager.output_dirs):
+    metrics.STORAGE_BYTES.labels(_area).set_function(lambda area=_area: manager.usage(area)["bytes"])
+    metrics.STORAGE_FILES.labels(_area).set_function(lambda area=_area: manager.usage(area)["files"])
+
+
+def start():
+    """创建目录并启动后台清理"""
+    manager.start()
+
+def shutdown():
+    manager.shutdown()
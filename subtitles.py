@@ -0,0 +1,236 @@
+import itertools
+import json
+import os
+import numpy as np
+
+
+# 默认的断句时间间隔阈值（毫秒），与segment_sentences_by_intervals保持一致
+DEFAULT_INTERVAL_THRESHOLD = 250
+# 没有可用时间戳时，整段文本作为一条字幕的默认时长（毫秒）
+FALLBACK_DURATION_MS = 30000
+
+
+def segment(text: str, timestamps: list, interval_threshold: int = DEFAULT_INTERVAL_THRESHOLD) -> list:
+    """
+    根据时间戳间隔把识别文本切分为字幕条目（向量化实现，结果与service.split_text_by_timestamp一致）
+
+    1. 有效时间戳转为整数数组
+    2. 一次diff计算相邻词之间的间隔，超过阈值的位置作为断句点
+    3. 按断句点切分单词列表
+
+    Args:
+        text: 识别文本（以空格分隔的词）
+        timestamps: [[start_ms, end_ms], ...]
+        interval_threshold: 断句时间间隔阈值（毫秒）
+
+    Returns:
+        sentences: [(start_ms, end_ms, sentence_text), ...]
+    """
+    # 1. 过滤有效时间戳（至少包含开始和结束时间）
+    spans = _spans(timestamps)
+    if len(spans) == 0:
+        return [(0, FALLBACK_DURATION_MS, text)]
+
+    starts = spans[:, 0]
+    ends = spans[:, 1]
+
+    # 2. 间隔超过阈值的位置即为新句子的起点
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] > interval_threshold) + 1
+    bounds = np.concatenate(([0], breaks, [len(spans)]))
+
+    # 3. 按断句点生成字幕条目
+    words = text.split()
+    cue_starts = starts[bounds[:-1]].tolist()
+    cue_ends = ends[bounds[1:] - 1].tolist()
+    bounds = bounds.tolist()
+    # 最后一条包含剩余的全部词：词数多于有效时间戳时多出的词不丢弃（与add_remaining_sentence一致）
+    texts = [''.join(words[bounds[i]:bounds[i + 1]]) for i in range(len(cue_starts) - 1)]
+    texts.append(''.join(words[bounds[-2]:]))
+    return list(zip(cue_starts, cue_ends, texts))
+
+def _spans(timestamps: list) -> np.ndarray:
+    """时间戳列表转为(n, 2)整数数组（毫秒，小数部分截断），丢弃不完整的时间戳"""
+    if timestamps and set(map(len, timestamps)) == {2} and isinstance(timestamps[0][0], (int, np.integer)):
+        # 常见情况：全部是[start, end]整数对，直接展平读入，避免逐个构造小数组
+        flat = np.fromiter(itertools.chain.from_iterable(timestamps), dtype=np.int64, count=2 * len(timestamps))
+        return flat.reshape(-1, 2)
+    valid = [ts[:2] for ts in timestamps if len(ts) >= 2]
+    return np.trunc(np.asarray(valid, dtype=np.float64)).astype(np.int64).reshape(-1, 2)
+
+def subrip_ordinals(ms) -> np.ndarray:
+    """
+    毫秒转为字幕时间（整数毫秒），取整方式与service.ms_to_subrip_time完全一致：
+    整秒部分截断，小数部分按浮点运算乘1000后截断，负数按0处理
+
+    Args:
+        ms: 毫秒数组
+
+    Returns:
+        ordinals: int64数组
+    """
+    seconds = np.asarray(ms, dtype=np.float64) / 1000
+    whole = np.trunc(seconds)
+    ordinals = (whole * 1000).astype(np.int64) + np.trunc((seconds - whole) * 1000).astype(np.int64)
+    return np.maximum(ordinals, 0)
+
+def _format_times(ordinals: np.ndarray, separator: str) -> list:
+    """整数毫秒格式化为 HH:MM:SS,mmm（separator为毫秒分隔符）"""
+    hours, rest = np.divmod(ordinals, 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    seconds, millis = np.divmod(rest, 1000)
+    pattern = f"%02d:%02d:%02d{separator}%03d"
+    return [pattern % parts for parts in zip(hours.tolist(), minutes.tolist(), seconds.tolist(), millis.tolist())]
+
+def _cue_times(sentences: list, separator: str):
+    starts = subrip_ordinals([s[0] for s in sentences])
+    ends = subrip_ordinals([s[1] for s in sentences])
+    return _format_times(starts, separator), _format_times(ends, separator)
+
+def to_srt(sentences: list, eol: str = None) -> str:
+    """
+    生成SRT字幕内容（输出与pysrt.SubRipFile.save逐字节一致）
+
+    Args:
+        sentences: [(start_ms, end_ms, text), ...]
+        eol: 换行符，默认os.linesep（与pysrt一致）
+
+    Returns:
+        content: SRT文本
+    """
+    eol = eol or os.linesep
+    if not sentences:
+        return ""
+
+    starts, ends = _cue_times(sentences, ",")
+    parts = []
+    for i, (start, end, (_, _, text)) in enumerate(zip(starts, ends, sentences), 1):
+        item = f"{i}\n{start} --> {end}\n{text}\n"
+        if eol != "\n":
+            item = item.replace("\n", eol)
+        parts.append(item)
+        if not item.endswith(2 * eol):
+            parts.append(eol)
+    return "".join(parts)
+
+def srt_cue(index: int, sentence: tuple) -> str:
+    """单条SRT字幕条目（实时识别逐条推送时使用），格式与to_srt中的条目一致（换行符为\\n）"""
+    starts, ends = _cue_times([sentence], ",")
+    return f"{index}\n{starts[0]} --> {ends[0]}\n{sentence[2]}\n"
+
+def to_vtt(sentences: list) -> str:
+    """
+    生成WebVTT字幕内容
+
+    Args:
+        sentences: [(start_ms, end_ms, text), ...]
+
+    Returns:
+        content: WebVTT文本
+    """
+    parts = ["WEBVTT\n\n"]
+    if sentences:
+        starts, ends = _cue_times(sentences, ".")
+        for start, end, (_, _, text) in zip(starts, ends, sentences):
+            parts.append(f"{start} --> {end}\n{text}\n\n")
+    return "".join(parts)
+
+def write_srt(sentences: list, path: str):
+    """将字幕条目写入SRT文件（UTF-8）"""
+    with open(path, "wb") as f:
+        f.write(to_srt(sentences).encode("utf-8"))
+
+def write_vtt(sentences: list, path: str):
+    """将字幕条目写入WebVTT文件（UTF-8）"""
+    with open(path, "wb") as f:
+        f.write(to_vtt(sentences).encode("utf-8"))
+
+def to_ass(sentences: list, title: str = "AutoSubRT") -> str:
+    """
+    生成ASS字幕内容（时间精度为百分之一秒）
+
+    Args:
+        sentences: [(start_ms, end_ms, text), ...]
+        title: 字幕标题
+
+    Returns:
+        content: ASS文本
+    """
+    parts = [
+        "[Script Info]\n",
+        f"Title: {title}\n",
+        "ScriptType: v4.00+\n",
+        "WrapStyle: 0\n",
+        "ScaledBorderAndShadow: yes\n",
+        "PlayResX: 1920\n",
+        "PlayResY: 1080\n",
+        "\n",
+        "[V4+ Styles]\n",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+        "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+        "MarginL, MarginR, MarginV, Encoding\n",
+        "Style: Default,Arial,64,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,1,2,60,60,50,1\n",
+        "\n",
+        "[Events]\n",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n",
+    ]
+    if sentences:
+        starts = subrip_ordinals([s[0] for s in sentences]) // 10
+        ends = subrip_ordinals([s[1] for s in sentences]) // 10
+        for start, end, (_, _, text) in zip(starts.tolist(), ends.tolist(), sentences):
+            text = text.replace("\n", "\\N")
+            parts.append(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{text}\n")
+    return "".join(parts)
+
+def _ass_time(centiseconds: int) -> str:
+    hours, rest = divmod(centiseconds, 360000)
+    minutes, rest = divmod(rest, 6000)
+    seconds, cs = divmod(rest, 100)
+    return "%d:%02d:%02d.%02d" % (hours, minutes, seconds, cs)
+
+def to_text(sentences: list) -> str:
+    """生成纯文本，每条字幕一行"""
+    return "".join(f"{text}\n" for _, _, text in sentences)
+
+def to_json(text: str, timestamps: list, sentences: list) -> str:
+    """生成包含原始词、时间戳和分段结果的JSON"""
+    return json.dumps({
+        "text": text,
+        "tokens": text.split(),
+        "timestamps": timestamps,
+        "segments": [{"start_ms": start, "end_ms": end, "text": sentence} for start, end, sentence in sentences],
+    }, ensure_ascii=False)
+
+# 支持的字幕格式：格式 -> (Content-Type, 文件扩展名)
+FORMATS = {
+    "srt": ("application/x-subrip; charset=utf-8", ".srt"),
+    "vtt": ("text/vtt; charset=utf-8", ".vtt"),
+    "ass": ("text/x-ssa; charset=utf-8", ".ass"),
+    "txt": ("text/plain; charset=utf-8", ".txt"),
+    "json": ("application/json; charset=utf-8", ".json"),
+}
+
+def render(fmt: str, text: str, timestamps: list, interval_threshold: int = DEFAULT_INTERVAL_THRESHOLD) -> str:
+    """
+    按指定格式渲染识别结果（只做分段和序列化，不涉及模型推理）
+
+    Args:
+        fmt: 格式，见FORMATS
+        text: 识别文本
+        timestamps: 时间戳
+        interval_threshold: 断句时间间隔阈值（毫秒）
+
+    Returns:
+        content: 字幕内容
+    """
+    sentences = segment(text, timestamps, interval_threshold)
+    if fmt == "srt":
+        return to_srt(sentences)
+    if fmt == "vtt":
+        return to_vtt(sentences)
+    if fmt == "ass":
+        return to_ass(sentences)
+    if fmt == "txt":
+        return to_text(sentences)
+    if fmt == "json":
+        return to_json(text, timestamps, sentences)
+    raise ValueError(f"unsupported subtitle format: {fmt}")
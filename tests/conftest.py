@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# 测试在项目根目录之外运行时也能导入服务模块和benchmarks中的桩模型
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+# 临时目录和输出目录放到临时目录中，不写入项目目录（在导入storage等模块之前设置）
+_workdir = tempfile.TemporaryDirectory()
+config.TEMP_DIR = os.path.join(_workdir.name, "temp")
+config.VIDEO_OUTPUT_DIR = os.path.join(_workdir.name, "output", "video")
+config.SRT_OUTPUT_DIR = os.path.join(_workdir.name, "output", "srt")
+config.CACHE_DIR = os.path.join(_workdir.name, "cache")
+config.JOB_DB_PATH = os.path.join(_workdir.name, "data", "jobs.db")
+
+
+def pytest_unconfigure(config):
+    _workdir.cleanup()
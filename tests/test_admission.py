@@ -0,0 +1,149 @@
+"""准入控制：队列满和客户端并发超限时拒绝、排队超时和推理前过期的请求被丢弃、批量接口占用执行位置"""
+import asyncio
+import time
+import numpy as np
+import pytest
+from benchmarks.stub_model import StubModel
+from exceptions import CustomError, CustomException
+import admission
+import config
+
+
+def test_full_queue_rejected_with_retry_after():
+    async def run():
+        controller = admission.AdmissionController(max_active=1, max_queue=1)
+        await controller.acquire("a")
+        queued = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+
+        with pytest.raises(CustomException) as e:
+            await controller.acquire("c")
+        assert e.value.err == CustomError.SERVICE_OVERLOADED
+        assert 1 <= int(e.value.headers["Retry-After"]) <= config.ADMISSION_MAX_RETRY_AFTER
+
+        # 归还执行位置后排队的请求获得执行位置
+        controller.release("a", 0.1)
+        await asyncio.wait_for(queued, 1)
+        assert controller.active == 1 and controller.queued == 0
+        assert controller.stats()["rejected"] == {"queue_full": 1}
+
+    asyncio.run(run())
+
+
+def test_per_client_limit():
+    async def run():
+        controller = admission.AdmissionController(max_active=4, max_queue=4, per_client=1)
+        await controller.acquire("a")
+        with pytest.raises(CustomException) as e:
+            await controller.acquire("a")
+        assert e.value.err == CustomError.CLIENT_CONCURRENCY_EXCEEDED
+        assert "Retry-After" in e.value.headers
+
+        # 其它客户端不受影响，归还后同一个客户端可以再次进入
+        await controller.acquire("b")
+        controller.release("a")
+        await controller.acquire("a")
+        assert controller.active == 2
+
+    asyncio.run(run())
+
+
+def test_queued_request_dropped_at_deadline():
+    async def run():
+        controller = admission.AdmissionController(max_active=1, max_queue=4)
+        await controller.acquire("a")
+        with pytest.raises(CustomException) as e:
+            await controller.acquire("b", deadline=time.monotonic() + 0.05)
+        assert e.value.err == CustomError.DEADLINE_EXCEEDED
+        assert controller.queued == 0
+
+        # 超时出队的请求不会在归还时获得执行位置
+        controller.release("a")
+        assert controller.active == 0
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    import service
+    model = StubModel(fixed_ms=0, per_item_ms=0)
+    monkeypatch.setattr(service, "model", model)
+    monkeypatch.setattr(service, "batcher", None)
+    monkeypatch.setattr(service, "replica_pool", None)
+    monkeypatch.setattr(service, "inference_slots", None)
+    monkeypatch.setattr(service, "long_audio", None)
+    return model
+
+
+def test_expired_request_skips_inference(stub_model):
+    import service
+    audio = np.zeros(16000, dtype=np.float32)
+
+    token = admission.request_deadline.set(time.monotonic() - 1)
+    try:
+        with pytest.raises(CustomException) as e:
+            service.recognize_input(audio)
+    finally:
+        admission.request_deadline.reset(token)
+    assert e.value.err == CustomError.DEADLINE_EXCEEDED
+    assert stub_model.calls == 0
+
+    token = admission.request_deadline.set(time.monotonic() + 60)
+    try:
+        service.recognize_input(audio)
+    finally:
+        admission.request_deadline.reset(token)
+    assert stub_model.calls == 1
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = admission.AdmissionController(max_active=1, max_queue=0)
+    monkeypatch.setattr(admission, "controller", controller)
+    return controller
+
+
+def test_bulk_holds_slot_until_stream_ends(controller, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    import service
+
+    active = []
+
+    def asr_bulk(audio_urls, output, lang):
+        for index, url in enumerate(audio_urls):
+            active.append(controller.active)
+            yield {"index": index, "audio_url": url}
+
+    monkeypatch.setattr(service, "asr_bulk", asr_bulk)
+    client = TestClient(main.app)
+    response = client.post("/openapi/v1/asr/bulk", json={"audio_urls": ["a", "b"]})
+    assert len(response.text.splitlines()) == 2
+    assert active == [1, 1]
+    assert controller.active == 0
+
+
+def test_bulk_rejected_when_full(controller):
+    from fastapi.testclient import TestClient
+    import main
+
+    asyncio.run(controller.acquire("other"))
+    response = TestClient(main.app).post("/openapi/v1/asr/bulk", json={"audio_urls": ["a"]})
+    assert response.json()["code"] == CustomError.SERVICE_OVERLOADED.code
+    assert "retry-after" in response.headers
+
+
+def test_bulk_releases_slot_on_error(controller, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    import service
+
+    def asr_bulk(audio_urls, output, lang):
+        raise CustomException(CustomError.PARAM_VALIDATION_FAILED)
+
+    monkeypatch.setattr(service, "asr_bulk", asr_bulk)
+    response = TestClient(main.app).post("/openapi/v1/asr/bulk", json={"audio_urls": ["a"]})
+    assert response.json()["code"] == CustomError.PARAM_VALIDATION_FAILED.code
+    assert controller.active == 0
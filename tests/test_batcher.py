@@ -0,0 +1,117 @@
+"""批处理调度器：组批、整批失败后逐个重试、结果数量不一致、截止时间和停止时处理完队列"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from batcher import BatchScheduler
+
+
+class StubGenerate:
+    """桩推理函数：输入为字符串，返回 "<输入>-ok"；包含bad的批整体失败，short为True时多个输入的批少返回一个结果"""
+
+    def __init__(self, short: bool = False):
+        self.short = short
+        self.batches = []
+
+    def __call__(self, inputs: list) -> list:
+        self.batches.append(list(inputs))
+        if "bad" in inputs:
+            raise ValueError("corrupt input")
+        results = [f"{item}-ok" for item in inputs]
+        return results[:-1] if self.short and len(results) > 1 else results
+
+
+def _queued(scheduler: BatchScheduler, inputs: list, pool: ThreadPoolExecutor, **kwargs) -> list:
+    """在调度器启动之前提交请求并等待全部入队，启动后按入队顺序组批"""
+    futures = [pool.submit(scheduler.submit, item, 5, **kwargs) for item in inputs]
+    started = time.monotonic()
+    while scheduler.qsize() < len(inputs):
+        assert time.monotonic() - started < 5, "requests not queued"
+        time.sleep(0.001)
+    return futures
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        yield pool
+
+
+def test_results_dispatched_in_one_batch(pool):
+    generate = StubGenerate()
+    scheduler = BatchScheduler(generate, max_batch_size=4, max_wait_ms=50)
+    futures = _queued(scheduler, ["a", "b", "c"], pool)
+    scheduler.start()
+    try:
+        assert [f.result(5) for f in futures] == ["a-ok", "b-ok", "c-ok"]
+    finally:
+        scheduler.stop()
+    assert generate.batches == [["a", "b", "c"]]
+    assert scheduler.stats()["items"] == 3
+
+
+def test_failed_batch_retried_item_by_item(pool):
+    generate = StubGenerate()
+    scheduler = BatchScheduler(generate, max_batch_size=4, max_wait_ms=50)
+    futures = _queued(scheduler, ["a", "bad", "c"], pool)
+    scheduler.start()
+    try:
+        assert futures[0].result(5) == "a-ok"
+        with pytest.raises(ValueError):
+            futures[1].result(5)
+        assert futures[2].result(5) == "c-ok"
+    finally:
+        scheduler.stop()
+    assert generate.batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    stats = scheduler.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["retried_items"] == 3
+    assert stats["items"] == 2
+
+
+def test_result_count_mismatch(pool):
+    # 多个输入的批结果数量不一致时逐个重新推理
+    generate = StubGenerate(short=True)
+    scheduler = BatchScheduler(generate, max_batch_size=4, max_wait_ms=50)
+    futures = _queued(scheduler, ["a", "b"], pool)
+    scheduler.start()
+    try:
+        assert [f.result(5) for f in futures] == ["a-ok", "b-ok"]
+    finally:
+        scheduler.stop()
+    assert generate.batches == [["a", "b"], ["a"], ["b"]]
+
+    # 单个输入没有返回结果时以异常结束
+    scheduler = BatchScheduler(lambda inputs: [], max_batch_size=4, max_wait_ms=0)
+    scheduler.start()
+    try:
+        with pytest.raises(RuntimeError, match="size mismatch"):
+            scheduler.submit("a", timeout=5)
+    finally:
+        scheduler.stop()
+
+
+def test_expired_items_skip_inference(pool):
+    generate = StubGenerate()
+    scheduler = BatchScheduler(generate, max_batch_size=4, max_wait_ms=50)
+    expired = _queued(scheduler, ["late"], pool, deadline=time.monotonic() - 1)
+    live = _queued(scheduler, ["a", "b"], pool, deadline=time.monotonic() + 60)
+    scheduler.start()
+    try:
+        with pytest.raises(TimeoutError):
+            expired[0].result(5)
+        assert [f.result(5) for f in live] == ["a-ok", "b-ok"]
+    finally:
+        scheduler.stop()
+    assert generate.batches == [["a", "b"]]
+    assert scheduler.stats()["expired_items"] == 1
+
+
+def test_stop_drains_queue(pool):
+    generate = StubGenerate()
+    scheduler = BatchScheduler(generate, max_batch_size=2, max_wait_ms=0)
+    futures = _queued(scheduler, [str(i) for i in range(5)], pool)
+    scheduler.start()
+    scheduler.stop()
+    assert [f.result(0) for f in futures] == [f"{i}-ok" for i in range(5)]
+    assert [len(batch) for batch in generate.batches] == [2, 2, 1]
+    assert scheduler.qsize() == 0
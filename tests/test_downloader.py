@@ -0,0 +1,96 @@
+"""下载器：对本地文件服务器（benchmarks.fileserver）下载，覆盖大小限制、不完整的响应和并行分段下载"""
+import hashlib
+import os
+import time
+import pytest
+from benchmarks import fileserver
+from benchmarks.fileserver import LocalFileServer
+from downloader import Downloader
+from exceptions import CustomError, CustomException
+
+SIZE = 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def origin(tmp_path_factory):
+    """源站目录：1MB随机内容的音频文件"""
+    directory = tmp_path_factory.mktemp("origin")
+    with open(directory / "audio.wav", "wb") as f:
+        f.write(os.urandom(SIZE))
+    return directory
+
+
+def _source(origin) -> bytes:
+    with open(origin / "audio.wav", "rb") as f:
+        return f.read()
+
+
+def _download(server, tmp_path, limit: int, range_threshold: int = 8 * SIZE, **kwargs):
+    downloader = Downloader(range_threshold=range_threshold, range_parts=4)
+    result = downloader.download(server.url("audio.wav"), str(tmp_path / "audio"), limit=limit, timeout=30, **kwargs)
+    return downloader, result
+
+
+def _read(result) -> bytes:
+    if result.data is not None:
+        return result.data
+    with open(result.path, "rb") as f:
+        return f.read()
+
+
+def test_declared_size_over_limit_rejected_before_body(origin, tmp_path):
+    # 源站发送响应头后等待5秒才发送响应体，超限时应在此之前返回
+    with LocalFileServer(origin, delay=5) as server:
+        started = time.monotonic()
+        with pytest.raises(CustomException) as e:
+            _download(server, tmp_path, limit=SIZE // 2)
+        elapsed = time.monotonic() - started
+    assert e.value.err == CustomError.FILE_SIZE_LIMIT_EXCEEDED
+    assert elapsed < 2
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("length", [fileserver.LENGTH_OMIT, fileserver.LENGTH_UNDERSTATE])
+def test_stream_past_limit_rejected(origin, tmp_path, length):
+    # 没有声明大小或声明的大小在限制内，实际发送的内容超过限制
+    with LocalFileServer(origin, length=length) as server:
+        downloader = Downloader()
+        with pytest.raises(CustomException) as e:
+            downloader.download(server.url("audio.wav"), str(tmp_path / "audio"), limit=SIZE * 3 // 4, timeout=30)
+    assert e.value.err == CustomError.FILE_SIZE_LIMIT_EXCEEDED
+    assert downloader.stats()["rejected_oversize"] == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_undeclared_size_within_limit(origin, tmp_path):
+    with LocalFileServer(origin, length=fileserver.LENGTH_OMIT) as server:
+        _, result = _download(server, tmp_path, limit=2 * SIZE)
+    assert _read(result) == _source(origin)
+
+
+def test_truncated_body_fails(origin, tmp_path):
+    with LocalFileServer(origin, length=fileserver.LENGTH_TRUNCATE) as server:
+        with pytest.raises(CustomException) as e:
+            _download(server, tmp_path, limit=2 * SIZE)
+    assert e.value.err == CustomError.DOWNLOAD_FILE_FAILED
+    assert os.listdir(tmp_path) == []
+
+
+def test_ranged_download_byte_identical(origin, tmp_path):
+    with LocalFileServer(origin) as server:
+        downloader, result = _download(server, tmp_path, limit=2 * SIZE, range_threshold=SIZE // 4)
+    source = _source(origin)
+    assert downloader.stats()["range_downloads"] == 1
+    assert result.size == SIZE
+    assert result.sha256 == hashlib.sha256(source).hexdigest()
+    assert _read(result) == source
+
+
+def test_ignored_range_falls_back_to_single_stream(origin, tmp_path):
+    # 源站声明支持Range，但对Range请求返回200和完整文件
+    with LocalFileServer(origin, ignore_ranges=True) as server:
+        downloader, result = _download(server, tmp_path, limit=2 * SIZE, range_threshold=SIZE // 4)
+    source = _source(origin)
+    assert downloader.stats()["range_downloads"] == 0
+    assert result.sha256 == hashlib.sha256(source).hexdigest()
+    assert _read(result) == source
@@ -0,0 +1,130 @@
+"""输出文件下载接口：ETag/304、gzip、单区间Range（206）和无法满足的区间（416）"""
+import gzip
+import hashlib
+import os
+import pytest
+from exceptions import CustomError
+import config
+import files
+import storage
+
+CONTENT = "".join(f"{i}\n00:00:{i % 60:02d},000 --> 00:00:{i % 60:02d},500\n多谢请入席吧\n\n" for i in range(1, 200)).encode("utf-8")
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def srt(monkeypatch):
+    """写入输出目录并在扩展属性中保存内容哈希的字幕文件，返回文件名"""
+    monkeypatch.setattr(config, "FILES_ROUTE_ENABLED", True)
+    storage.manager.ensure_dirs()
+    path = storage.manager.output_path("srt", ".srt")
+    with open(path, "wb") as f:
+        f.write(CONTENT)
+    files.seal(path, CONTENT)
+    yield os.path.basename(path)
+    os.remove(path)
+
+
+def _url(name: str) -> str:
+    return f"/openapi/v1/files/srt/{name}"
+
+
+def _etag(name: str) -> str:
+    path = storage.manager.locate("srt", name)
+    return f'"{files._digest(path, os.stat(path))}"'
+
+
+def test_etag_is_content_hash(client, srt):
+    if not hasattr(os, "setxattr"):
+        pytest.skip("extended attributes not supported")
+    response = client.get(_url(srt), headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+    assert response.headers["content-type"] == files.MEDIA_TYPES[".srt"]
+
+
+def test_etag_falls_back_to_size_and_mtime(client, srt):
+    path = storage.manager.locate("srt", srt)
+    # 文件修改后保存的哈希不再匹配
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    response = client.get(_url(srt), headers={"Accept-Encoding": "identity"})
+    assert response.headers["etag"] == f'"{stat.st_size:x}-{stat.st_mtime_ns + 1000:x}"'
+
+
+def test_if_none_match_returns_304(client, srt):
+    etag = _etag(srt)
+    for tag in (etag, f"W/{etag}", f'"{etag[1:-1]}-gzip"', f'"other", {etag}'):
+        response = client.get(_url(srt), headers={"If-None-Match": tag})
+        assert response.status_code == 304, tag
+        assert response.content == b""
+    assert client.get(_url(srt), headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_gzip(client, srt):
+    response = client.get(_url(srt), headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{_etag(srt)[1:-1]}-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    # TestClient自动解压
+    assert response.content == CONTENT
+    assert int(response.headers["content-length"]) < len(CONTENT)
+
+    # 没有解压的响应体是gzip格式
+    with client.stream("GET", _url(srt), headers={"Accept-Encoding": "gzip"}) as response:
+        assert gzip.decompress(b"".join(response.iter_raw())) == CONTENT
+
+    response = client.get(_url(srt), headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=-5", len(CONTENT) - 5, len(CONTENT) - 1),
+    ("bytes=100-", 100, len(CONTENT) - 1),
+    (f"bytes=100-{len(CONTENT) * 2}", 100, len(CONTENT) - 1),
+])
+def test_single_range(client, srt, header, start, end):
+    response = client.get(_url(srt), headers={"Range": header, "Accept-Encoding": "gzip"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert "content-encoding" not in response.headers
+    assert response.content == CONTENT[start:end + 1]
+
+
+def test_range_ignored_when_if_range_differs(client, srt):
+    response = client.get(_url(srt), headers={"Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+    response = client.get(_url(srt), headers={"Range": "bytes=10-19", "If-Range": _etag(srt)})
+    assert response.status_code == 206
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1", "bytes=a-b"])
+def test_unsupported_range_returns_full_file(client, srt, header):
+    response = client.get(_url(srt), headers={"Range": header, "Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("header", [f"bytes={len(CONTENT)}-", "bytes=20-10", "bytes=-0"])
+def test_unsatisfiable_range(client, srt, header):
+    response = client.get(_url(srt), headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.parametrize("name", ["missing.srt", ".hidden", "..\\config.py"])
+def test_missing_file(client, srt, name):
+    response = client.get(_url(name))
+    assert response.json()["code"] == CustomError.OUTPUT_FILE_NOT_FOUND.code
@@ -0,0 +1,128 @@
+"""异步任务：持久化任务队列的租约接管、执行次数上限和重启后恢复"""
+import time
+import pytest
+from exceptions import CustomError, CustomException
+from jobstore import TaskStore
+import jobs
+
+KINDS = ("text",)
+
+
+def _wait_for(condition, timeout: float = 5):
+    started = time.monotonic()
+    while not condition():
+        assert time.monotonic() - started < timeout, "condition not met"
+        time.sleep(0.01)
+
+
+class StubHandler:
+    """桩任务执行函数，记录执行次数"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, on_stage, audio_url: str):
+        self.calls.append(audio_url)
+        on_stage("recognizing", 0.5)
+        return f"text of {audio_url}"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TaskStore(str(tmp_path / "jobs.db"))
+
+
+def _manager(store: TaskStore, handler, **kwargs) -> jobs.DurableJobManager:
+    options = dict(max_workers=1, max_pending=10, ttl=60, lease_seconds=5, heartbeat_seconds=0.05, poll_seconds=0.05, max_attempts=3)
+    options.update(kwargs)
+    return jobs.DurableJobManager(store, {"text": handler}, **options)
+
+
+def test_expired_lease_taken_over(store):
+    # 另一个进程领取任务后崩溃（不再心跳），租约过期后由本进程重新执行
+    store.enqueue("job-1", "text", {"audio_url": "a"})
+    assert store.claim("crashed", KINDS, lease_seconds=0.1)["attempts"] == 1
+
+    handler = StubHandler()
+    manager = _manager(store, handler)
+    try:
+        _wait_for(lambda: manager.get("job-1").finished)
+    finally:
+        manager.shutdown()
+
+    job = manager.get("job-1")
+    assert job.status == jobs.STATUS_SUCCEEDED
+    assert job.result == "text of a"
+    assert handler.calls == ["a"]
+    assert store.get("job-1")["attempts"] == 2
+    # 崩溃的进程恢复后写入的结果无效
+    assert not store.finish("job-1", "crashed", result="stale")
+    assert manager.get("job-1").result == "text of a"
+
+
+def test_live_lease_not_taken_over(store):
+    store.enqueue("job-1", "text", {"audio_url": "a"})
+    store.claim("other", KINDS, lease_seconds=60)
+    assert store.claim("mine", KINDS, lease_seconds=60) is None
+
+
+def test_abandoned_after_max_attempts(store):
+    # 每次执行都让进程崩溃的任务：执行次数达到上限后标记为失败，不再领取
+    store.enqueue("job-1", "text", {"audio_url": "poison"})
+    for attempt in range(3):
+        assert store.claim(f"crashed-{attempt}", KINDS, lease_seconds=0.01, max_attempts=3) is not None
+        time.sleep(0.02)
+    assert store.claim("next", KINDS, lease_seconds=60, max_attempts=3) is None
+
+    handler = StubHandler()
+    manager = _manager(store, handler, max_attempts=3)
+    try:
+        _wait_for(lambda: manager.get("job-1").finished)
+    finally:
+        manager.shutdown()
+
+    job = manager.get("job-1")
+    assert job.status == jobs.STATUS_FAILED
+    assert job.error.err == CustomError.JOB_ABANDONED
+    assert handler.calls == []
+
+
+def test_queued_jobs_recovered_after_restart(store):
+    # 第一个进程在就绪之前提交任务后退出，任务留在数据库中
+    handler = StubHandler()
+    first = _manager(store, handler, ready=lambda timeout: False)
+    try:
+        submitted = [first.submit("text", handler, audio_url=url) for url in ("a", "b")]
+        time.sleep(0.2)
+        assert all(first.get(job.job_id).status == jobs.STATUS_QUEUED for job in submitted)
+    finally:
+        first.shutdown()
+    assert handler.calls == []
+
+    # 重启后（新的任务管理器，同一个数据库）执行遗留的任务
+    second = _manager(TaskStore(store.path), handler)
+    try:
+        _wait_for(lambda: all(second.get(job.job_id).finished for job in submitted))
+    finally:
+        second.shutdown()
+    assert sorted(handler.calls) == ["a", "b"]
+    assert [second.get(job.job_id).result for job in submitted] == ["text of a", "text of b"]
+
+
+def test_finished_jobs_purged_without_new_submissions():
+    # 内存任务管理器：过期任务在查询和统计时删除，不依赖提交新任务
+    manager = jobs.JobManager(max_workers=1, max_pending=10, ttl=0.1)
+    handler = StubHandler()
+    try:
+        submitted = [manager.submit("text", handler, audio_url=url) for url in ("a", "b")]
+        _wait_for(lambda: all(job.finished for job in submitted))
+        assert manager.get(submitted[0].job_id).result == "text of a"
+        assert manager.stats()["stored"] == 2
+
+        time.sleep(0.2)
+        assert manager.stats()["stored"] == 0
+        with pytest.raises(CustomException) as e:
+            manager.get(submitted[1].job_id)
+        assert e.value.err == CustomError.JOB_NOT_FOUND
+    finally:
+        manager.shutdown()
@@ -0,0 +1,62 @@
+"""实时识别（/asr/live）：桩流式模型下字幕条目的延迟"""
+import numpy as np
+from benchmarks.bench_live import stream
+from benchmarks.stub_model import StubModel, StubStreamingModel
+from benchmarks.synthetic import speech_like
+import config
+import live
+
+# 每条WebSocket消息的音频时长（毫秒）
+MESSAGE_MS = 100
+
+
+def _chunk_ms(chunk_frames: int) -> int:
+    return chunk_frames * live.FRAME_SAMPLES * 1000 // 16000
+
+
+def test_cue_confirmed_within_one_chunk_after_pause():
+    """语音结束后最多再识别 interval_threshold + 一个块 的音频就确定字幕条目"""
+    session = live.LiveSession(StubStreamingModel(fixed_ms=0, per_second_ms=0), chunk_frames=10)
+    samples = speech_like(20)
+    step = 16000 * MESSAGE_MS // 1000
+
+    cues = []
+    for offset in range(0, len(samples), step):
+        for event in session.feed(samples[offset:offset + step]):
+            if event["type"] == "cue":
+                # 条目确定时已识别的音频与条目结束时刻之差即音频时间上的延迟
+                cues.append((event, session.audio_ms - event["end"]))
+    final = [event for event in session.finish() if event["type"] == "cue"]
+
+    assert len(cues) >= 3
+    bound = session.interval_threshold + _chunk_ms(10)
+    for event, delay_ms in cues:
+        assert delay_ms <= bound, event
+    # 条目按顺序编号，时间不重叠
+    events = [event for event, _ in cues] + final
+    assert [event["index"] for event in events] == list(range(1, len(events) + 1))
+    assert all(a["end"] <= b["start"] for a, b in zip(events, events[1:]))
+
+
+def test_cue_latency_over_websocket():
+    """按实时速度通过WebSocket发送合成语音，字幕条目的p95延迟不超过断句阈值 + 一个块 + 识别开销"""
+    from fastapi.testclient import TestClient
+    import main
+    import service
+    import startup
+
+    config.LIVE_CHUNK_FRAMES = 10
+    # 模型已设置时load_model不会再加载模型
+    service.model = StubModel()
+    service.live_model = StubStreamingModel(per_second_ms=20)
+
+    with TestClient(main.app) as client:
+        assert startup.wait(30)
+        result = stream(client, speech_like(8), MESSAGE_MS)
+
+    assert result["last"]["type"] == "done", result["last"]
+    assert result["last"]["cues"] == len(result["cues"]) >= 2
+    latencies = sorted(result["cues"])
+    p95 = latencies[int(np.ceil(len(latencies) * 0.95)) - 1]
+    bound = live.subtitles.DEFAULT_INTERVAL_THRESHOLD + _chunk_ms(config.LIVE_CHUNK_FRAMES) + MESSAGE_MS + 500
+    assert p95 <= bound, latencies
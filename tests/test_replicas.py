@@ -0,0 +1,26 @@
+"""模型副本：重启计数导出为Prometheus计数器"""
+import multiprocessing
+import pytest
+import metrics
+import replicas
+
+
+@pytest.fixture
+def replica():
+    replica = replicas._Replica(0, threads=0, context=multiprocessing.get_context("fork"))
+    replica.start_reader()
+    yield replica
+    replica.stop(timeout=1.0)
+
+
+def test_restart_increments_counter(replica):
+    before = metrics.REPLICA_RESTARTS.labels().get()
+    replica.restart()
+    replica.restart()
+    assert replica.restarts == 2
+    assert replica.alive
+    assert metrics.REPLICA_RESTARTS.labels().get() == before + 2
+
+    text = metrics.render()
+    assert "# TYPE autosubrt_replica_restarts_total counter" in text
+    assert f"autosubrt_replica_restarts_total {metrics._format_value(before + 2)}" in text.splitlines()
@@ -0,0 +1,142 @@
+"""下载合并：相同URL的并发下载只执行一次、共享结果按引用计数删除临时文件、leader的异常传递给所有follower"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from downloader import DownloadResult
+from exceptions import CustomError, CustomException
+from singleflight import SingleFlight
+import service
+
+URL = "http://origin.test/audio.wav"
+CALLERS = 4
+
+
+class StubDownload:
+    """桩下载：等到release后才返回（或抛出error），期间所有调用方都能加入同一次执行"""
+
+    def __init__(self, directory, error: Exception = None):
+        self.directory = directory
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, url: str, **kwargs) -> DownloadResult:
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        path = os.path.join(self.directory, f"download-{self.calls}.wav")
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        return DownloadResult(path=path, sha256="0" * 64, size=4)
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    flight = SingleFlight("download")
+    monkeypatch.setattr(service, "download_flight", flight)
+    return flight
+
+
+def _stub(monkeypatch, tmp_path, **kwargs) -> StubDownload:
+    stub = StubDownload(str(tmp_path), **kwargs)
+    monkeypatch.setattr(service, "_download_file", stub)
+    return stub
+
+
+def _wait_coalesced(flight: SingleFlight, followers: int):
+    started = time.monotonic()
+    while flight.stats()["coalesced"] < followers:
+        assert time.monotonic() - started < 5, "callers did not join the flight"
+        time.sleep(0.001)
+
+
+def test_concurrent_downloads_coalesced(flight, monkeypatch, tmp_path):
+    stub = _stub(monkeypatch, tmp_path)
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        futures = [pool.submit(service.download_audio, URL) for _ in range(CALLERS)]
+        _wait_coalesced(flight, CALLERS - 1)
+        stub.release.set()
+        results = [f.result(5) for f in futures]
+
+    assert stub.calls == 1
+    assert all(result is results[0] for result in results)
+    # 每个调用方各持有一个引用
+    assert results[0].refs == CALLERS
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": CALLERS - 1, "follower_timeouts": 0, "follower_retries": 0}
+
+
+def test_shared_file_removed_after_last_user(flight, monkeypatch, tmp_path):
+    stub = _stub(monkeypatch, tmp_path)
+    entered = []
+    lock = threading.Lock()
+    done = [threading.Event() for _ in range(CALLERS)]
+
+    def use(i):
+        with service.use_audio(URL) as audio:
+            with lock:
+                entered.append(audio)
+            done[i].wait(5)
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        futures = [pool.submit(use, i) for i in range(CALLERS)]
+        _wait_coalesced(flight, CALLERS - 1)
+        stub.release.set()
+        while len(entered) < CALLERS:
+            time.sleep(0.001)
+        path = entered[0].path
+
+        # 前几个调用方结束时文件仍在使用，不删除
+        for i in range(CALLERS - 1):
+            done[i].set()
+            futures[i].result(5)
+            assert os.path.exists(path)
+        done[-1].set()
+        futures[-1].result(5)
+
+    assert stub.calls == 1
+    assert not os.path.exists(path)
+
+
+def test_leader_error_reaches_every_follower(flight, monkeypatch, tmp_path):
+    stub = _stub(monkeypatch, tmp_path, error=CustomException(CustomError.DOWNLOAD_FILE_FAILED))
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        futures = [pool.submit(service.download_audio, URL) for _ in range(CALLERS)]
+        _wait_coalesced(flight, CALLERS - 1)
+        stub.release.set()
+        errors = [f.exception(5) for f in futures]
+
+    assert stub.calls == 1
+    assert all(isinstance(e, CustomException) and e.err == CustomError.DOWNLOAD_FILE_FAILED for e in errors)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_follower_timeout_not_counted_in_share():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    shared = []
+
+    def fn():
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fn, None, lambda result, count: shared.append(count))
+        _wait_leader(flight)
+        with pytest.raises(CustomException) as e:
+            flight.do("key", fn, timeout=0.01)
+        assert e.value.err == CustomError.REQUEST_TIMEOUT
+        release.set()
+        assert leader.result(5) == "result"
+
+    # 放弃等待的follower不计入，只有leader持有结果
+    assert shared == [1]
+
+
+def _wait_leader(flight: SingleFlight):
+    started = time.monotonic()
+    while flight.stats()["in_flight"] < 1:
+        assert time.monotonic() - started < 5
+        time.sleep(0.001)
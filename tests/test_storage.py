@@ -0,0 +1,123 @@
+"""存储清理：临时文件和输出文件按TTL过期、超过配额时按最近访问时间删除最旧的文件、正在使用的文件不删除"""
+import os
+import shutil
+import time
+import pytest
+from storage import StorageManager
+import config
+
+NOW = time.time()
+
+
+@pytest.fixture
+def manager():
+    """使用conftest中设置的临时目录和输出目录，每个用例开始和结束时清空"""
+    dirs = (config.TEMP_DIR, config.SRT_OUTPUT_DIR, config.VIDEO_OUTPUT_DIR)
+    for directory in dirs:
+        shutil.rmtree(directory, ignore_errors=True)
+    manager = StorageManager(config.TEMP_DIR, {"srt": config.SRT_OUTPUT_DIR, "video": config.VIDEO_OUTPUT_DIR},
+                             ttl=0, max_bytes=0, temp_ttl=0, sweep_interval=0)
+    manager.ensure_dirs()
+    yield manager
+    for directory in dirs:
+        shutil.rmtree(directory, ignore_errors=True)
+    manager.ensure_dirs()
+
+
+def _output(manager: StorageManager, kind: str, size: int = 100, age: float = 0, accessed: float = None) -> str:
+    """写入一个输出文件，修改时间为age秒之前，最近访问时间为accessed秒之前（默认与修改时间相同）"""
+    path = manager.output_path(kind, ".srt" if kind == "srt" else ".mp4")
+    with open(path, "wb") as f:
+        f.write(b"0" * size)
+    accessed = age if accessed is None else accessed
+    os.utime(path, (NOW - accessed, NOW - age))
+    return path
+
+
+def _temp(manager: StorageManager, name: str, age: float = 0) -> str:
+    path = os.path.join(manager.temp_dir, name)
+    with open(path, "wb") as f:
+        f.write(b"0")
+    os.utime(path, (NOW - age, NOW - age))
+    return path
+
+
+def test_expired_outputs_removed(manager):
+    manager.ttl = 3600
+    old_srt = _output(manager, "srt", age=7200)
+    old_video = _output(manager, "video", age=7200)
+    fresh = _output(manager, "srt", age=60)
+
+    assert manager.sweep() == {"srt/ttl": 1, "video/ttl": 1}
+    assert not os.path.exists(old_srt) and not os.path.exists(old_video)
+    assert os.path.exists(fresh)
+    assert manager.usage("srt") == {"files": 1, "bytes": 100}
+    assert manager.stats()["evictions"] == {"srt/ttl": 1, "video/ttl": 1}
+
+
+def test_ttl_counts_from_creation(manager):
+    # 最近访问过的文件同样按创建（修改）时间过期
+    manager.ttl = 3600
+    path = _output(manager, "srt", age=7200, accessed=0)
+    assert manager.sweep() == {"srt/ttl": 1}
+    assert not os.path.exists(path)
+
+
+def test_orphaned_temp_files_removed(manager):
+    manager.temp_ttl = 3600
+    orphan = _temp(manager, "orphan.wav", age=7200)
+    live = _temp(manager, "live.wav", age=60)
+    assert manager.sweep() == {"temp/orphan": 1}
+    assert not os.path.exists(orphan)
+    assert os.path.exists(live)
+
+
+def test_quota_evicts_least_recently_accessed_first(manager):
+    manager.max_bytes = 800
+    # 修改时间最新但最久未访问的文件最先删除；删除到配额的90%以下
+    paths = [
+        _output(manager, "srt", size=300, age=500, accessed=10),
+        _output(manager, "video", size=300, age=50, accessed=400),
+        _output(manager, "srt", size=300, age=50, accessed=300),
+        _output(manager, "video", size=300, age=50, accessed=20),
+    ]
+    assert manager.sweep() == {"video/quota": 1, "srt/quota": 1}
+    assert [os.path.exists(path) for path in paths] == [True, False, False, True]
+    assert manager.usage("srt")["bytes"] + manager.usage("video")["bytes"] == 600
+
+    # 低于配额时不删除
+    assert manager.sweep() == {}
+
+
+def test_files_in_use_skipped(manager):
+    manager.ttl = 3600
+    manager.temp_ttl = 3600
+    expired = _output(manager, "srt", age=7200)
+    temp = _temp(manager, "downloading.wav", age=7200)
+    with manager.in_use(expired, temp):
+        # 同一个文件被多处使用时，全部结束后才可以删除
+        with manager.in_use(expired):
+            pass
+        assert manager.sweep() == {}
+        assert os.path.exists(expired) and os.path.exists(temp)
+    assert manager.sweep() == {"srt/ttl": 1, "temp/orphan": 1}
+
+
+def test_quota_skips_files_in_use(manager):
+    manager.max_bytes = 1000
+    oldest = _output(manager, "video", size=400, age=300)
+    older = _output(manager, "srt", size=400, age=200)
+    newest = _output(manager, "srt", size=400, age=100)
+    with manager.in_use(oldest):
+        assert manager.sweep() == {"srt/quota": 1}
+    assert os.path.exists(oldest) and os.path.exists(newest)
+    assert not os.path.exists(older)
+
+
+def test_relative_paths_match_in_use(manager, monkeypatch):
+    manager.ttl = 3600
+    path = _output(manager, "srt", age=7200)
+    monkeypatch.chdir(os.path.dirname(path))
+    with manager.in_use(os.path.basename(path)):
+        assert manager.sweep() == {}
+    assert manager.sweep() == {"srt/ttl": 1}
@@ -0,0 +1,61 @@
+"""字幕生成：subtitles.segment + to_srt 与原pysrt路径（create_srt_entries + SubRipFile）输出逐字节一致"""
+import io
+import os
+import pytest
+from benchmarks.synthetic import transcript
+import service
+import subtitles
+
+EDGE_CASES = [
+    ("", []),
+    ("多 谢", []),
+    ("多 谢", [[0]]),
+    ("", [[10, 20], [900, 1000]]),
+    ("多 谢 请", [[1001, 1002], [3599999, 3600001], [7199999, 360000000]]),
+    ("多 谢 请 入", [[0, 250], [500, 750], [1000, 1250], [1251, 1300]]),
+    ("多 谢", [[-500, 20], [900, 1000]]),
+    # 词数多于有效时间戳：多出的词归入最后一条
+    ("多 谢 请", [[0, 10], [20, 30]]),
+    ("多 谢 请 入", [[0, 10], [900, 1000]]),
+    # 只有一个元素的时间戳被丢弃
+    ("多 谢 请", [[0, 10], [20], [30, 40]]),
+    ("多 谢 请 入", [[0, 10], [500], [900, 1000], [1100, 1200]]),
+    # 词数少于时间戳
+    ("多", [[0, 10], [900, 1000]]),
+    # 浮点时间戳
+    ("多 谢", [[0.0, 10.0], [900.0, 1000.0]]),
+]
+# 随机生成的识别结果（1~200个词，约10%的词之后有超过断句阈值的停顿）
+RANDOM_CASES = [transcript(tokens, seed=seed) for seed, tokens in enumerate(range(1, 201))]
+
+
+def pysrt_srt(text: str, timestamps: list, eol: str = None) -> str:
+    buffer = io.StringIO()
+    service.create_srt_entries(text, timestamps).write_into(buffer, eol=eol)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("text, timestamps", EDGE_CASES + RANDOM_CASES)
+def test_to_srt_matches_pysrt(text, timestamps):
+    assert subtitles.to_srt(subtitles.segment(text, timestamps)) == pysrt_srt(text, timestamps)
+
+
+def test_segment_returns_integer_times():
+    sentences = subtitles.segment("多 谢 请", [[0.0, 10.0], [900.0, 1000.7], [1100.2, 1200.0]])
+    assert sentences == [(0, 10, "多"), (900, 1200, "谢请")]
+    assert all(type(value) is int for start, end, _ in sentences for value in (start, end))
+
+
+@pytest.mark.parametrize("eol", ["\n", "\r\n"])
+def test_to_srt_matches_pysrt_line_endings(eol):
+    text, timestamps = RANDOM_CASES[-1]
+    assert subtitles.to_srt(subtitles.segment(text, timestamps), eol=eol) == pysrt_srt(text, timestamps, eol=eol)
+
+
+def test_write_srt_matches_pysrt_save(tmp_path):
+    text, timestamps = RANDOM_CASES[-1]
+    expected, actual = os.path.join(tmp_path, "pysrt.srt"), os.path.join(tmp_path, "fast.srt")
+    service.create_srt_entries(text, timestamps).save(expected, encoding="utf-8")
+    subtitles.write_srt(subtitles.segment(text, timestamps), actual)
+    with open(expected, "rb") as f1, open(actual, "rb") as f2:
+        assert f2.read() == f1.read()
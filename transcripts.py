@@ -0,0 +1,62 @@
+import collections
+import threading
+import time
+from exceptions import CustomException, CustomError
+import helper
+
+
+class Transcript:
+    """一次识别的结构化结果，可按不同格式和分段参数反复渲染"""
+
+    def __init__(self, text: str, timestamps: list, sha256: str = None):
+        self.transcript_id = helper.gen_unique_id()
+        self.text = text
+        self.timestamps = timestamps
+        self.sha256 = sha256
+        self.created_at = time.time()
+
+    @property
+    def duration_ms(self) -> int:
+        valid = [ts for ts in self.timestamps if len(ts) >= 2]
+        return int(valid[-1][1]) if valid else 0
+
+
+class TranscriptStore:
+    """识别结果存储
+    功能：
+    1. 按ID保存识别结果，渲染字幕时不需要重新推理
+    2. 超过TTL的结果失效，条目数超过上限时淘汰最早创建的结果
+    """
+
+    def __init__(self, max_items: int = 1000, ttl: int = 86400):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, transcript: Transcript) -> Transcript:
+        with self._lock:
+            self._items[transcript.transcript_id] = transcript
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return transcript
+
+    def get(self, transcript_id: str) -> Transcript:
+        """
+        查询识别结果
+
+        Raises:
+            CustomException: 结果不存在或已过期
+        """
+        with self._lock:
+            transcript = self._items.get(transcript_id)
+            if transcript is not None and transcript.created_at + self.ttl < time.time():
+                del self._items[transcript_id]
+                transcript = None
+        if transcript is None:
+            raise CustomException(CustomError.TRANSCRIPT_NOT_FOUND, detail=transcript_id)
+        return transcript
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"stored": len(self._items), "max_items": self.max_items}
@@ -0,0 +1,243 @@
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import numpy as np
+from logger import logger
+from exceptions import CustomException, CustomError
+import config
+
+
+# 软字幕封装：容器扩展名 -> 字幕编码（mp4/mov只支持mov_text，其它容器统一输出mkv）
+SOFT_SUBTITLE_CODECS = {
+    ".mp4": "mov_text",
+    ".m4v": "mov_text",
+    ".mov": "mov_text",
+    ".mkv": "srt",
+}
+
+
+def _run(cmd: list, stage: str, input: bytes = None) -> bytes:
+    """执行ffmpeg命令，失败时抛出VIDEO_PROCESS_FAILED"""
+    try:
+        proc = subprocess.run(cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        logger.error(f"ffmpeg not found: {cmd[0]}")
+        raise CustomException(CustomError.VIDEO_PROCESS_FAILED, detail=stage)
+    if proc.returncode != 0:
+        logger.error(f"ffmpeg {stage} failed: {proc.stderr.decode(errors='ignore').strip()[-2000:]}")
+        raise CustomException(CustomError.VIDEO_PROCESS_FAILED, detail=stage)
+    return proc.stdout
+
+def extract_audio(video_path: str, sample_rate: int = 16000) -> np.ndarray:
+    """
+    提取视频的第一条音轨，解码为单声道PCM（不解码视频流，不写临时文件）
+
+    Args:
+        video_path: 视频文件路径
+        sample_rate: 输出采样率
+
+    Returns:
+        samples: float32音频数组
+    """
+    cmd = [
+        config.FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", video_path,
+        "-vn", "-sn", "-dn", "-map", "0:a:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    return np.frombuffer(_run(cmd, "demux"), dtype=np.float32).copy()
+
+def output_extension(video_path: str) -> str:
+    """软字幕封装的输出容器扩展名"""
+    extension = os.path.splitext(video_path)[1].lower()
+    return extension if extension in SOFT_SUBTITLE_CODECS else ".mkv"
+
+def mux_soft_subtitles(video_path: str, srt_path: str, output_path: str, language: str = "chi"):
+    """
+    封装软字幕：音视频流直接拷贝，不重新编码
+
+    Args:
+        video_path: 视频文件路径
+        srt_path: SRT字幕路径
+        output_path: 输出路径，扩展名决定容器和字幕编码
+        language: 字幕语言标记
+    """
+    codec = SOFT_SUBTITLE_CODECS.get(os.path.splitext(output_path)[1].lower(), "srt")
+    cmd = [
+        config.FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", video_path, "-i", srt_path,
+        "-map", "0:v?", "-map", "0:a?", "-map", "1:0",
+        "-c:v", "copy", "-c:a", "copy", "-c:s", codec,
+        "-metadata:s:s:0", f"language={language}",
+        output_path,
+    ]
+    _run(cmd, "mux")
+
+def burn_subtitles(video_path: str, srt_path: str, output_path: str, preset: str = "veryfast", threads: int = 0, crf: int = 23):
+    """
+    硬字幕：字幕渲染进画面，视频重新编码（H.264），音频直接拷贝
+
+    Args:
+        video_path: 视频文件路径
+        srt_path: SRT字幕路径
+        output_path: 输出路径（mp4）
+        preset: x264编码预设，越快体积越大
+        threads: 编码线程数，0表示由ffmpeg自动选择
+        crf: 画质参数
+    """
+    # subtitles滤镜参数中的特殊字符需要转义
+    escaped = srt_path.replace("\\", "\\\\").replace(":", "\\:").replace("'", "\\'")
+    cmd = [
+        config.FFMPEG_BIN, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", video_path,
+        "-vf", f"subtitles='{escaped}'",
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", str(threads),
+        "-c:a", "copy", "-movflags", "+faststart",
+        output_path,
+    ]
+    _run(cmd, "encode")
+
+def moov_before_mdat(head: bytes):
+    """
+    根据文件开头的内容判断MP4/MOV的moov（索引）是否位于mdat（数据）之前
+
+    moov位于文件末尾时，从管道读取无法解析，只能等文件下载完成后按文件提取
+
+    Args:
+        head: 文件开头的内容
+
+    Returns:
+        True / False，不是MP4/MOV或内容不足以判断时返回None
+    """
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box_type = struct.unpack(">I4s", head[offset:offset + 8])
+        if offset == 0 and box_type != b"ftyp":
+            return None
+        if box_type == b"moov":
+            return True
+        if box_type == b"mdat":
+            return False
+        if size == 1:
+            if offset + 16 > len(head):
+                return None
+            size = struct.unpack(">Q", head[offset + 8:offset + 16])[0]
+        if size < 8:
+            return None
+        offset += size
+    return None
+
+
+class StreamingDemuxer:
+    """边下载边提取音轨
+    功能：
+    1. 下载的数据块经stdin写入ffmpeg，ffmpeg从管道解析容器并输出16kHz单声道PCM
+    2. 读取线程按block_seconds把PCM交给回调，识别可以在下载完成之前开始
+    3. 管道无法解析的文件（如moov位于末尾的MP4）标记为失败，由调用方在下载完成后按文件提取
+    """
+
+    def __init__(self, on_samples, sample_rate: int = 16000, block_seconds: float = 1.0):
+        """
+        Args:
+            on_samples: 接收PCM的回调 on_samples(samples)，在读取线程中调用
+            sample_rate: 输出采样率
+            block_seconds: 每次回调的音频时长（秒）
+        """
+        self._on_samples = on_samples
+        self._block_bytes = max(int(sample_rate * block_seconds), 1) * 4
+        self._fed = 0
+        self._failed = False
+        self._stderr = tempfile.TemporaryFile()
+
+        cmd = [
+            config.FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn", "-sn", "-dn", "-map", "0:a:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(sample_rate),
+            "pipe:1",
+        ]
+        try:
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self._stderr)
+        except FileNotFoundError:
+            logger.error(f"ffmpeg not found: {cmd[0]}")
+            self._proc = None
+            self._failed = True
+            return
+
+        self._reader = threading.Thread(target=self._read, name="video-demux", daemon=True)
+        self._reader.start()
+
+    @property
+    def failed(self) -> bool:
+        return self._failed
+
+    def feed(self, chunk: bytes):
+        """写入下载的数据块（按文件顺序），失败后忽略后续数据"""
+        if self._failed:
+            return
+        if self._fed == 0 and moov_before_mdat(chunk) is False:
+            logger.info("MP4 index (moov) is at the end of file, streaming demux disabled")
+            self.abort()
+            return
+        self._fed += len(chunk)
+        try:
+            self._proc.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            self._failed = True
+
+    def finish(self) -> bool:
+        """
+        数据写入完毕，等待ffmpeg输出剩余的PCM
+
+        Returns:
+            ok: 全部音频已交给回调时返回True，失败时返回False
+        """
+        if self._proc is None:
+            return False
+        self._close_stdin()
+        self._proc.wait()
+        self._reader.join()
+        if self._proc.returncode != 0 and not self._failed:
+            self._stderr.seek(0)
+            logger.warning(f"ffmpeg streaming demux failed: {self._stderr.read().decode(errors='ignore').strip()[-2000:]}")
+            self._failed = True
+        self._stderr.close()
+        return not self._failed
+
+    def abort(self):
+        """终止ffmpeg（下载失败或确定无法流式解析时调用）"""
+        self._failed = True
+        if self._proc is None:
+            return
+        self._proc.kill()
+        self._close_stdin()
+        self._proc.wait()
+        self._reader.join()
+        self._stderr.close()
+
+    def _close_stdin(self):
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _read(self):
+        pending = b""
+        while True:
+            data = self._proc.stdout.read(self._block_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if self._failed or not usable:
+                continue
+            try:
+                self._on_samples(np.frombuffer(data[:usable], dtype=np.float32).copy())
+            except Exception as e:
+                logger.warning(f"Streaming demux consumer failed: {str(e)}")
+                self._failed = True
+        self._proc.stdout.close()